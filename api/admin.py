@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Destination, Hotel, Booking
+from .models import Destination, Hotel, Booking, MongoOutbox
 
 
 @admin.register(Destination)
@@ -21,3 +21,9 @@ class BookingAdmin(admin.ModelAdmin):
     list_display = ['user', 'booking_type', 'total_price', 'booking_status', 'created_at']
     search_fields = ['user__username', 'booking_type']
     list_filter = ['booking_type', 'booking_status']
+
+
+@admin.register(MongoOutbox)
+class MongoOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'collection', 'operation', 'status', 'attempts', 'next_attempt_at', 'created_at']
+    list_filter = ['status', 'collection', 'operation']
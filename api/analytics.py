@@ -0,0 +1,196 @@
+"""
+Booking and revenue rollups in the MongoDB analytics database.
+
+Every booking change is turned into ``$inc`` upserts on one hourly and one
+daily bucket document (keyed by the bucket start in ``_id``), queued on the
+outbox with the ORM write. Reads then touch one small document per bucket
+instead of scanning bookings.
+
+Bucket document::
+
+    {"_id": <bucket start>, "bookings": 3, "revenue": 4500.0,
+     "cancellations": 1, "cancelled_revenue": 1500.0,
+     "by_type": {"hotel": {...same counters...}},
+     "by_destination": {"<destination id>": {...same counters...}}}
+"""
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+
+from .db import connection
+from .outbox import enqueue_many, update_entry
+
+HOURLY = 'booking_rollups_hourly'
+DAILY = 'booking_rollups_daily'
+GRANULARITIES = {
+    'hour': (HOURLY, timedelta(hours=1)),
+    'day': (DAILY, timedelta(days=1)),
+}
+COUNTERS = ('bookings', 'revenue', 'cancellations', 'cancelled_revenue')
+MAX_BUCKETS = 24 * 93
+
+
+def database_name():
+    return settings.MONGODB_NAME
+
+
+def bucket_start(moment, granularity):
+    """Naive UTC start of the hour/day containing ``moment``"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(dt_timezone.utc).replace(tzinfo=None)
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def bucket_end(moment, granularity):
+    """Naive UTC boundary at or after ``moment``: the next bucket start unless already on one"""
+    start = bucket_start(moment, granularity)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(dt_timezone.utc).replace(tzinfo=None)
+    return start if start == moment else start + GRANULARITIES[granularity][1]
+
+
+# ==================== WRITE PATH ====================
+def snapshot(booking):
+    """The booking fields the rollups depend on, taken before/after a change"""
+    return {
+        'created_at': booking.created_at,
+        'booking_type': booking.booking_type,
+        'destination_id': str(booking.destination_id) if booking.destination_id else None,
+        'final_amount': float(booking.final_amount or 0),
+        'cancelled': booking.booking_status == 'cancelled',
+    }
+
+
+def _contribution(state):
+    if state is None:
+        return {}
+    amount = state['final_amount']
+    counters = {
+        'bookings': 1,
+        'revenue': amount,
+        'cancellations': 1 if state['cancelled'] else 0,
+        'cancelled_revenue': amount if state['cancelled'] else 0,
+    }
+    prefixes = ['', f"by_type.{state['booking_type']}."]
+    if state['destination_id']:
+        prefixes.append(f"by_destination.{state['destination_id']}.")
+    return {prefix + name: value for prefix in prefixes for name, value in counters.items()}
+
+
+def record_booking(before, after):
+    """
+    Queue the rollup deltas for a booking going from ``before`` to ``after``.
+
+    Both are ``snapshot()`` dicts, ``None`` for a create (``before``) or a
+    delete (``after``). Must run in the transaction that changes the booking.
+    """
+    enqueue_many(rollup_entries([(before, after)]))
+
+
+def rollup_entries(changes):
+    """
+    Unsaved outbox updates for several ``(before, after)`` booking changes,
+    with the deltas that land in the same bucket merged into one ``$inc``.
+    """
+    buckets = {}
+    for before, after in changes:
+        old, new = _contribution(before), _contribution(after)
+        delta = {path: new.get(path, 0) - old.get(path, 0) for path in set(old) | set(new)}
+        delta = {path: value for path, value in delta.items() if value}
+        if not delta:
+            continue
+        created_at = (after or before)['created_at']
+        for granularity in GRANULARITIES:
+            merged = buckets.setdefault((granularity, bucket_start(created_at, granularity)), {})
+            for path, value in delta.items():
+                merged[path] = merged.get(path, 0) + value
+
+    return [
+        update_entry(GRANULARITIES[granularity][0], {"_id": bucket}, {"$inc": delta},
+                     upsert=True, database=database_name())
+        for (granularity, bucket), delta in buckets.items()
+    ]
+
+
+# ==================== READ PATH ====================
+def _merge(total, document):
+    for name in COUNTERS:
+        total[name] = total.get(name, 0) + document.get(name, 0)
+    for group in ('by_type', 'by_destination'):
+        for key, counters in document.get(group, {}).items():
+            _merge(total.setdefault(group, {}).setdefault(key, {}), counters)
+    return total
+
+
+def booking_rollups(start, end, granularity='day'):
+    """
+    Totals and per-bucket counters for bookings created in ``[start, end)``.
+
+    ``start`` is rounded down and ``end`` up to bucket boundaries, so the
+    buckets holding either end are included. Reads one rollup document per
+    bucket, so the cost depends only on the number of buckets in the range.
+    """
+    collection, step = GRANULARITIES[granularity]
+    start, end = bucket_start(start, granularity), bucket_end(end, granularity)
+    if start >= end:
+        raise ValueError('start must be before end')
+    if (end - start) / step > MAX_BUCKETS:
+        raise ValueError(f'Range too large for {granularity} buckets (max {MAX_BUCKETS})')
+
+    documents = connection.database(database_name())[collection].find(
+        {"_id": {"$gte": start, "$lt": end}}
+    ).sort("_id", 1)
+
+    buckets, totals = [], dict.fromkeys(COUNTERS, 0)
+    for document in documents:
+        bucket = document.pop("_id")
+        _merge(totals, document)
+        buckets.append({'bucket': bucket.replace(tzinfo=dt_timezone.utc).isoformat(), **document})
+
+    return {
+        'granularity': granularity,
+        'start': start.replace(tzinfo=dt_timezone.utc).isoformat(),
+        'end': end.replace(tzinfo=dt_timezone.utc).isoformat(),
+        'totals': totals,
+        'buckets': buckets,
+    }
+
+
+# ==================== REBUILD ====================
+def _add(document, contribution):
+    for path, value in contribution.items():
+        node = document
+        *parents, leaf = path.split('.')
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = node.get(leaf, 0) + value
+
+
+def rebuild_booking_rollups(states):
+    """
+    Recompute every bucket from ``states`` (``snapshot()`` dicts for all
+    bookings) and swap the rebuilt collections in. Repairs rollups after
+    at-least-once outbox delivery applied an increment twice.
+    """
+    buckets = {granularity: {} for granularity in GRANULARITIES}
+    for state in states:
+        contribution = _contribution(state)
+        for granularity, documents in buckets.items():
+            _add(documents.setdefault(bucket_start(state['created_at'], granularity), {}), contribution)
+
+    database = connection.database(database_name())
+    written = {}
+    for granularity, (collection, _) in GRANULARITIES.items():
+        documents = buckets[granularity]
+        staging = database[f'{collection}_rebuild']
+        staging.drop()
+        if documents:
+            staging.insert_many([{"_id": bucket, **document} for bucket, document in documents.items()])
+            staging.rename(collection, dropTarget=True)
+        else:
+            database[collection].drop()
+        written[collection] = len(documents)
+    return written
@@ -0,0 +1,283 @@
+"""
+Invoices, itineraries and QR tickets generated off the request path.
+
+Confirming a booking (or saving a confirmed one) only marks its
+``BookingArtefact`` rows pending, inside the same transaction.
+``manage.py generate_artefacts --loop`` then builds each artefact's input
+from the booking and compares its hash with the one last rendered, so
+unrelated saves cost no rendering. Changed PDFs are rendered in a process
+pool whose workers compile the text templates (``templates/artefacts/``)
+and load the fonts once. The results are stored content-addressed
+(``artefacts/<kind>/<sha256>.pdf``), so identical output is never stored
+twice. Tickets need no rendering: the booking's ``qr_code`` is set to a
+signed token from ``tickets``.
+
+A single generator is expected to run at a time, like the outbox flusher.
+"""
+import hashlib
+import json
+import logging
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import tickets
+from .models import Booking, BookingArtefact
+
+logger = logging.getLogger(__name__)
+
+RENDERED = [BookingArtefact.INVOICE, BookingArtefact.ITINERARY]
+PAGE_SIZE = (827, 1169)     # A4 at 100 dpi
+MARGIN = 60
+WRAP_CHARACTERS = 90
+STYLES = {'title': (26, 18), 'heading': (16, 12), 'body': (13, 6)}   # font size, space after
+
+
+def _str(value):
+    return str(value) if value is not None else ''
+
+
+# ==================== INPUTS ====================
+def invoice_number(booking):
+    return f'INV-{booking.created_at:%Y%m%d}-{booking.booking_reference}'
+
+
+def _common(booking):
+    user = booking.user
+    return {
+        'reference': booking.booking_reference,
+        'customer': user.get_full_name() or user.username,
+        'booking_type': booking.get_booking_type_display(),
+        'check_in': _str(booking.check_in_date),
+        'check_out': _str(booking.check_out_date),
+        'travel_date': _str(booking.travel_date),
+        'guests': booking.number_of_guests,
+        'rooms': booking.number_of_rooms,
+    }
+
+
+def invoice_input(booking):
+    item = booking.hotel or booking.destination
+    return {
+        **_common(booking),
+        'invoice_number': invoice_number(booking),
+        'issued': _str(booking.created_at.date()),
+        'email': booking.user.email,
+        'item': item.name if item else booking.get_booking_type_display(),
+        'currency': booking.currency,
+        'total_price': _str(booking.total_price),
+        'discount': _str(booking.discount),
+        'tax_amount': _str(booking.tax_amount),
+        'final_amount': _str(booking.final_amount),
+        'payment_status': booking.get_payment_status_display(),
+    }
+
+
+def itinerary_input(booking):
+    hotel = booking.hotel
+    guests = booking.guest_details if isinstance(booking.guest_details, list) else []
+    return {
+        **_common(booking),
+        'destination': booking.destination.name if booking.destination else '',
+        'hotel': {
+            'name': hotel.name,
+            'address': hotel.address,
+            'city': hotel.city,
+            'phone': hotel.phone,
+            'check_in_time': _str(hotel.check_in_time),
+            'check_out_time': _str(hotel.check_out_time),
+        } if hotel else None,
+        'guest_names': [_str(guest.get('name') if isinstance(guest, dict) else guest) for guest in guests],
+        'special_requests': booking.special_requests,
+    }
+
+
+def ticket_input(booking):
+    return {
+        'booking': str(booking.pk),
+        'travel_date': _str(booking.travel_date),
+        'check_in': _str(booking.check_in_date),
+        'check_out': _str(booking.check_out_date),
+    }
+
+
+INPUTS = {
+    BookingArtefact.INVOICE: invoice_input,
+    BookingArtefact.ITINERARY: itinerary_input,
+    BookingArtefact.TICKET: ticket_input,
+}
+
+
+def source_hash(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+# ==================== QUEUEING ====================
+def queue(*bookings):
+    """Mark the bookings' artefacts pending (call inside the transaction that saves them)"""
+    now = timezone.now()
+    BookingArtefact.objects.bulk_create(
+        [BookingArtefact(booking=booking, kind=kind, queued_at=now) for booking in bookings for kind in INPUTS],
+        update_conflicts=True,
+        unique_fields=['booking', 'kind'],
+        update_fields=['status', 'queued_at', 'attempts'],
+    )
+
+
+# ==================== RENDERING (pool workers) ====================
+@lru_cache(maxsize=None)
+def _template(kind):
+    return get_template(f'artefacts/{kind}.txt')
+
+
+@lru_cache(maxsize=None)
+def _font(size):
+    from PIL import ImageFont
+    if settings.ARTEFACT_FONT:
+        return ImageFont.truetype(settings.ARTEFACT_FONT, size)
+    return ImageFont.load_default(size=size)
+
+
+def _lines(text):
+    """``(style, text)`` per output line; ``# ``/``## `` mark titles and headings, ``---`` a rule"""
+    for raw in text.splitlines():
+        raw = raw.rstrip()
+        if raw == '---':
+            yield 'rule', ''
+        elif raw.startswith('# '):
+            yield 'title', raw[2:]
+        elif raw.startswith('## '):
+            yield 'heading', raw[3:]
+        else:
+            for line in textwrap.wrap(raw, WRAP_CHARACTERS) or ['']:
+                yield 'body', line
+
+
+def _pdf(text):
+    from PIL import Image, ImageDraw
+    pages, draw, y = [], None, PAGE_SIZE[1]
+    for style, line in _lines(text):
+        size, after = STYLES.get(style, STYLES['body'])
+        if y + size + after > PAGE_SIZE[1] - MARGIN:
+            page = Image.new('L', PAGE_SIZE, 255)
+            draw, y = ImageDraw.Draw(page), MARGIN
+            pages.append(page)
+        if style == 'rule':
+            draw.line([(MARGIN, y + size // 2), (PAGE_SIZE[0] - MARGIN, y + size // 2)], fill=160, width=1)
+        else:
+            draw.text((MARGIN, y), line, font=_font(size), fill=0)
+        y += size + after
+    output = BytesIO()
+    pages[0].save(output, format='PDF', save_all=True, append_images=pages[1:], resolution=100.0)
+    return output.getvalue()
+
+
+def render(kind, data):
+    """The PDF for ``kind`` from its input dict; runs in a pool worker"""
+    return _pdf(_template(kind).render(data))
+
+
+def _warm_up():
+    """Pool initializer: compile the templates and load the fonts once per process"""
+    import django
+    django.setup()
+    for kind in RENDERED:
+        _template(kind)
+    for size, _ in STYLES.values():
+        _font(size)
+
+
+def pool(workers=None):
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+    return ProcessPoolExecutor(max_workers=workers or settings.ARTEFACT_WORKERS, initializer=_warm_up)
+
+
+# ==================== GENERATION ====================
+@lru_cache(maxsize=None)
+def storage():
+    return import_string(settings.ARTEFACT_STORAGE)() if settings.ARTEFACT_STORAGE else default_storage
+
+
+def _store(kind, content):
+    digest = hashlib.sha256(content).hexdigest()
+    path = f'artefacts/{kind}/{digest}.pdf'
+    if not storage().exists(path):
+        path = storage().save(path, ContentFile(content))
+    return digest, path
+
+
+def _finish(artefact, digest, **changes):
+    changes.update(status=BookingArtefact.READY, source_hash=digest, last_error='', generated_at=timezone.now())
+    # Only if it was not queued again meanwhile; a requeue is picked up next round
+    BookingArtefact.objects.filter(pk=artefact.pk, queued_at=artefact.queued_at).update(**changes)
+
+
+def _fail(artefact, error):
+    attempts = artefact.attempts + 1
+    status = BookingArtefact.FAILED if attempts >= settings.ARTEFACT_MAX_ATTEMPTS else BookingArtefact.PENDING
+    logger.warning("Generating %s failed (attempt %s): %s", artefact, attempts, error)
+    BookingArtefact.objects.filter(pk=artefact.pk, queued_at=artefact.queued_at).update(
+        attempts=attempts, status=status, last_error=str(error)[:2000],
+    )
+
+
+def _issue_ticket(booking, artefact):
+    with transaction.atomic():
+        ticket = tickets.reissue(booking) if artefact.source_hash else tickets.ticket_for(booking)
+        Booking.objects.filter(pk=booking.pk).update(qr_code=ticket.qr_code)
+
+
+def generate(executor, limit=None):
+    """Generate up to ``limit`` pending artefacts; returns ``(generated, unchanged, failed)``"""
+    pending = list(
+        BookingArtefact.objects.filter(status=BookingArtefact.PENDING)
+        .select_related('booking__user', 'booking__hotel', 'booking__destination')
+        .order_by('queued_at')[:limit or settings.ARTEFACT_BATCH_SIZE]
+    )
+    generated = unchanged = failed = 0
+    renders = []
+    for artefact in pending:
+        booking = artefact.booking
+        try:
+            data = INPUTS[artefact.kind](booking)
+            digest = source_hash(data)
+            if digest == artefact.source_hash and (artefact.path or artefact.kind == BookingArtefact.TICKET):
+                _finish(artefact, digest)
+                unchanged += 1
+            elif artefact.kind == BookingArtefact.TICKET:
+                _issue_ticket(booking, artefact)
+                _finish(artefact, digest)
+                generated += 1
+            else:
+                renders.append((artefact, digest, executor.submit(render, artefact.kind, data)))
+        except Exception as e:
+            _fail(artefact, e)
+            failed += 1
+
+    for artefact, digest, future in renders:
+        try:
+            content_hash, path = _store(artefact.kind, future.result())
+            _finish(artefact, digest, content_hash=content_hash, path=path)
+            if artefact.kind == BookingArtefact.INVOICE:
+                Booking.objects.filter(pk=artefact.booking_id).update(
+                    invoice_number=invoice_number(artefact.booking), invoice_generated=True,
+                )
+            generated += 1
+        except Exception as e:
+            _fail(artefact, e)
+            failed += 1
+    return generated, unchanged, failed
+
+
+def url(artefact):
+    return storage().url(artefact.path) if artefact.path else None
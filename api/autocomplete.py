@@ -0,0 +1,253 @@
+"""
+In-process autocomplete over destination, hotel and city names.
+
+Each worker holds an ``AutocompleteIndex``:
+
+* a prefix index: a sorted array of ``(term, entry)`` pairs, one per word
+  suffix of every name ("the taj hotel", "taj hotel", "hotel"). A prefix
+  query is a bisect plus a short scan, which is what a trie gives, at a
+  fraction of the memory of per-character nodes in Python;
+* a trigram map (``trigram -> set of entries``) used for typo tolerance
+  when the prefix pass finds too few matches.
+
+The index is held by a ``LocalIndex`` (see ``local_index.py``): writes in
+this process update it directly from the model signals, other workers pick
+up the changed rows shortly after.
+"""
+import bisect
+import logging
+import threading
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+
+from .local_index import LocalIndex
+from .models import Destination, Hotel
+
+logger = logging.getLogger(__name__)
+
+MAX_LABEL_LENGTH = 100
+PREFIX_SCAN_LIMIT = 200
+TRIGRAM_POSTING_LIMIT = 5000
+MIN_SIMILARITY = 0.5
+MODELS = {'destination': Destination, 'hotel': Hotel}
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse whitespace"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.casefold().split())
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AutocompleteIndex:
+    """Prefix + trigram index over short labels, bounded to ``max_entries``"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._next_id = 0
+        self._ids = {}          # key -> entry id
+        self._entries = {}      # entry id -> (label, kind, object_id, score, normalized)
+        self._terms = []        # sorted [(term, entry id)]
+        self._pending = None    # unsorted terms during a bulk load
+        self._trigrams = {}     # trigram -> {entry id}
+        self._city_refs = Counter()
+        self._city_of = {}      # (kind, object_id) -> normalized city
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ---------- entries ----------
+    def begin_bulk(self):
+        """Collect prefix terms unsorted until ``end_bulk``, which sorts them once"""
+        with self._lock:
+            self._pending = []
+
+    def end_bulk(self):
+        with self._lock:
+            self._terms.extend(self._pending)
+            self._terms.sort()
+            self._pending = None
+
+    def _insert(self, key, label, kind, object_id, score):
+        label = label[:MAX_LABEL_LENGTH]
+        normalized = normalize(label)
+        if not normalized:
+            return
+        entry_id = self._ids.get(key)
+        if entry_id is not None:
+            self._delete(key)
+        elif len(self._entries) >= self.max_entries:
+            logger.warning("Autocomplete index full (%s entries), skipping %s", self.max_entries, key)
+            return
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self._ids[key] = entry_id
+        self._entries[entry_id] = (label, kind, object_id, score, normalized)
+        words = normalized.split(' ')
+        for i in range(len(words)):
+            if self._pending is not None:
+                self._pending.append((' '.join(words[i:]), entry_id))
+            else:
+                bisect.insort(self._terms, (' '.join(words[i:]), entry_id))
+        for gram in trigrams(normalized):
+            self._trigrams.setdefault(gram, set()).add(entry_id)
+
+    def _delete(self, key):
+        entry_id = self._ids.pop(key, None)
+        if entry_id is None:
+            return
+        normalized = self._entries.pop(entry_id)[4]
+        if self._pending is not None:
+            self._pending = [term for term in self._pending if term[1] != entry_id]
+        words = normalized.split(' ')
+        for i in range(len(words)):
+            pos = bisect.bisect_left(self._terms, (' '.join(words[i:]), entry_id))
+            if pos < len(self._terms) and self._terms[pos][1] == entry_id:
+                del self._terms[pos]
+        for gram in trigrams(normalized):
+            posting = self._trigrams.get(gram)
+            if posting is not None:
+                posting.discard(entry_id)
+                if not posting:
+                    del self._trigrams[gram]
+
+    def _add_city(self, city):
+        if city:
+            self._city_refs[city] += 1
+            if self._city_refs[city] == 1:
+                self._insert(('city', city), city.title(), 'city', None, 0)
+
+    def _drop_city(self, city):
+        if city and self._city_refs[city]:
+            self._city_refs[city] -= 1
+            if not self._city_refs[city]:
+                del self._city_refs[city]
+                self._delete(('city', city))
+
+    def upsert(self, kind, object_id, name, city, score):
+        """Add or refresh a destination/hotel and the city it sits in"""
+        object_id = str(object_id)
+        city = normalize(city)
+        with self._lock:
+            self._insert((kind, object_id), name, kind, object_id, score or 0)
+            previous = self._city_of.get((kind, object_id))
+            if previous != city:
+                self._drop_city(previous)
+                self._add_city(city)
+                self._city_of[(kind, object_id)] = city
+
+    def remove(self, kind, object_id):
+        object_id = str(object_id)
+        with self._lock:
+            self._delete((kind, object_id))
+            self._drop_city(self._city_of.pop((kind, object_id), None))
+
+    # ---------- queries ----------
+    def _result(self, entry_id):
+        label, kind, object_id, _, _ = self._entries[entry_id]
+        return {'label': label, 'type': kind, 'id': object_id}
+
+    def _rank(self, entry_id):
+        label, _, _, score, _ = self._entries[entry_id]
+        return (-score, len(label))
+
+    def suggest(self, query, limit=10):
+        q = normalize(query)
+        if not q:
+            return []
+        with self._lock:
+            matches = []
+            seen = set()
+            pos = bisect.bisect_left(self._terms, (q,))
+            while pos < len(self._terms) and len(seen) < PREFIX_SCAN_LIMIT:
+                term, entry_id = self._terms[pos]
+                if not term.startswith(q):
+                    break
+                if entry_id not in seen:
+                    seen.add(entry_id)
+                    matches.append(entry_id)
+                pos += 1
+            matches.sort(key=self._rank)
+            results = matches[:limit]
+
+            if len(results) < limit and len(q) >= 3:
+                results += self._fuzzy(q, limit - len(results), exclude=seen)
+            return [self._result(entry_id) for entry_id in results]
+
+    def _fuzzy(self, q, limit, exclude):
+        grams = trigrams(q)
+        shared = Counter()
+        for gram in grams:
+            posting = self._trigrams.get(gram)
+            if posting and len(posting) <= TRIGRAM_POSTING_LIMIT:
+                shared.update(posting)
+        scored = []
+        for entry_id, common in shared.items():
+            if entry_id in exclude:
+                continue
+            # Share of the query's trigrams found in the label, so long names aren't penalised
+            similarity = common / len(grams)
+            if similarity >= MIN_SIMILARITY:
+                scored.append((-similarity, self._rank(entry_id), entry_id))
+        scored.sort()
+        return [entry_id for _, _, entry_id in scored[:limit]]
+
+
+# ==================== PROCESS-WIDE INDEX ====================
+def _catalog_rows(since=None):
+    for kind, model in MODELS.items():
+        queryset = model.objects.order_by()
+        if since is not None:
+            queryset = queryset.filter(updated_at__gte=since)
+        fields = ('id', 'name', 'city', 'rating', 'is_active')
+        for object_id, name, city, rating, is_active in queryset.values_list(*fields).iterator(chunk_size=5000):
+            yield kind, object_id, name, city, rating, is_active
+
+
+def _apply(index, rows):
+    for kind, object_id, name, city, rating, is_active in rows:
+        if is_active:
+            index.upsert(kind, object_id, name, city, rating)
+        else:
+            index.remove(kind, object_id)
+
+
+def build_index():
+    """Load every active destination and hotel, highest rated first"""
+    index = AutocompleteIndex(settings.AUTOCOMPLETE_MAX_ENTRIES)
+    index.begin_bulk()
+    _apply(index, sorted(_catalog_rows(), key=lambda row: -(row[4] or 0)))
+    index.end_bulk()
+    return index
+
+
+local_index = LocalIndex('autocomplete', build_index, lambda index, since: _apply(index, _catalog_rows(since)))
+
+
+def suggest(query, limit=10):
+    return local_index.get().suggest(query, limit)
+
+
+def catalog_saved(instance):
+    """Apply a committed save to this worker's index and tell the others"""
+    index = local_index.current()
+    if index is not None:
+        _apply(index, [(instance._meta.model_name, instance.pk, instance.name, instance.city,
+                        instance.rating, instance.is_active)])
+    local_index.bump_version()
+
+
+def catalog_deleted(kind, object_id):
+    index = local_index.current()
+    if index is not None:
+        index.remove(kind, object_id)
+    local_index.bump_version()
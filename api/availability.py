@@ -0,0 +1,180 @@
+"""
+Date-range availability search across hotels.
+
+Each worker holds the free rooms of every room type of every active hotel
+for the next ``AVAILABILITY_HORIZON_DAYS`` nights as one row of a NumPy
+matrix, plus a sparse table over it: level ``k`` holds the minimum of each
+run of ``2**k`` nights. The fewest free rooms over any stay is the smaller
+of two overlapping runs from one level, so a search is two array lookups
+per candidate row, whatever the length of the stay. Candidates come from
+a per-city or per-destination bucket rather than from every hotel. Levels
+stop at the longest bookable stay (``INVENTORY_MAX_NIGHTS``), which keeps
+the table to a few KB per room type.
+
+Nights without a ``RoomInventory`` row have the room type's full capacity.
+Reservations and hotel edits bump the index version, and workers then pull
+the inventory rows whose ``updated_at`` moved (hotel edits reload the whole
+index). Results are a search hint: the hold or booking itself is what
+takes the rooms.
+"""
+import threading
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from . import inventory
+from .local_index import LocalIndex
+from .models import Hotel, RoomInventory
+
+GUESTS_PER_ROOM = 2
+MAX_FREE = np.iinfo(np.int16).max
+
+
+def _key(text):
+    return ' '.join(str(text or '').split()).casefold()
+
+
+def _guests(room_types):
+    """Guests per room, per room type (``room_types`` entries with a ``guests`` count)"""
+    guests = {}
+    for entry in room_types or []:
+        if isinstance(entry, dict) and entry.get('name') and isinstance(entry.get('guests'), int):
+            guests[str(entry['name'])[:50]] = max(entry['guests'], 1)
+    return guests
+
+
+class AvailabilityIndex:
+    """Free rooms per (hotel, room type) and night, with range-minimum levels"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        start = timezone.now().date()
+        days = max(settings.AVAILABILITY_HORIZON_DAYS, 1)
+        hotels = (Hotel.objects.filter(is_active=True).order_by('-rating', 'id')
+                  .values_list('id', 'city', 'destination_id', 'room_types', 'total_rooms'))
+
+        hotel_ids, rows, row_hotel, totals, guests = [], {}, [], [], []
+        cities, destinations = {}, {}
+        for position, (hotel_id, city, destination_id, room_types, total_rooms) in enumerate(hotels):
+            hotel_ids.append(str(hotel_id))
+            per_room = _guests(room_types)
+            for room_type, total in inventory.room_capacity(room_types, total_rooms).items():
+                row = len(row_hotel)
+                rows[(hotel_id, room_type)] = row
+                row_hotel.append(position)
+                totals.append(min(total, MAX_FREE))
+                guests.append(per_room.get(room_type, GUESTS_PER_ROOM))
+                cities.setdefault(_key(city), []).append(row)
+                if destination_id is not None:
+                    destinations.setdefault(str(destination_id), []).append(row)
+
+        free = np.repeat(np.array(totals, dtype=np.int16).reshape(-1, 1), days, axis=1)
+        stored = (RoomInventory.objects.filter(night__gte=start, night__lt=start + timedelta(days=days))
+                  .order_by().values_list('hotel_id', 'room_type', 'night', 'total', 'held', 'booked'))
+        for hotel_id, room_type, night, total, held, booked in stored.iterator(chunk_size=10000):
+            row = rows.get((hotel_id, room_type))
+            if row is not None:
+                free[row, (night - start).days] = min(max(total - held - booked, 0), MAX_FREE)
+
+        with self._lock:
+            self.start, self.days = start, days
+            self.hotel_ids = hotel_ids
+            self.rows = rows
+            self.row_hotel = np.array(row_hotel, dtype=np.int64)
+            self.guests = np.array(guests, dtype=np.int64)
+            self.room_types = [room_type for _, room_type in rows]
+            self.all_rows = np.arange(len(row_hotel))
+            self.cities = {key: np.array(found) for key, found in cities.items()}
+            self.destinations = {key: np.array(found) for key, found in destinations.items()}
+            self.levels = [free]
+            self._fill_levels()
+
+    def _fill_levels(self, rows=None):
+        """(Re)compute the levels above 0, for ``rows`` only if given"""
+        top = min(max(settings.INVENTORY_MAX_NIGHTS, 1), self.days).bit_length() - 1
+        level = self.levels[0] if rows is None else self.levels[0][rows]
+        width = 1
+        for k in range(1, top + 1):
+            level = np.minimum(level[:, :-width], level[:, width:])
+            if rows is None:
+                self.levels[k:k + 1] = [level]
+            else:
+                self.levels[k][rows] = level
+            width *= 2
+
+    def apply(self, changed):
+        """Apply ``(hotel_id, room_type, night, total, held, booked)`` rows"""
+        with self._lock:
+            touched = set()
+            for hotel_id, room_type, night, total, held, booked in changed:
+                row = self.rows.get((hotel_id, room_type))
+                offset = (night - self.start).days
+                if row is None or not 0 <= offset < self.days:
+                    continue
+                self.levels[0][row, offset] = min(max(total - held - booked, 0), MAX_FREE)
+                touched.add(row)
+            if touched:
+                self._fill_levels(np.array(sorted(touched)))
+
+    def search(self, check_in, check_out, rooms=1, guests=1, city=None, destination_id=None,
+               offset=0, limit=20):
+        """
+        Hotels with ``rooms`` rooms of one type free on every night of the
+        stay, holding ``guests`` between them, best rated first. Returns
+        ``(hotel ids for the page, total matches, {hotel id: {room type: free}})``.
+        """
+        with self._lock:
+            first = (check_in - self.start).days
+            end = (check_out - self.start).days
+            if first < 0 or end > self.days:
+                raise inventory.InventoryError(
+                    f'Availability is searchable from {self.start} to {self.start + timedelta(days=self.days)}'
+                )
+            k = (end - first).bit_length() - 1
+            candidates = self.all_rows
+            if city:
+                candidates = self.cities.get(_key(city), candidates[:0])
+            if destination_id:
+                candidates = np.intersect1d(candidates, self.destinations.get(str(destination_id), candidates[:0]))
+
+            level = self.levels[k]
+            free = np.minimum(level[candidates, first], level[candidates, end - (1 << k)])
+            fits = (free >= rooms) & (self.guests[candidates] * rooms >= guests)
+            matched, free = candidates[fits], free[fits]
+
+            positions = np.unique(self.row_hotel[matched])
+            page = positions[offset:offset + limit]
+            ids = [self.hotel_ids[position] for position in page]
+            found = {hotel_id: {} for hotel_id in ids}
+            on_page = np.isin(self.row_hotel[matched], page)
+            for row, count in zip(matched[on_page].tolist(), free[on_page].tolist()):
+                found[self.hotel_ids[self.row_hotel[row]]][self.room_types[row]] = count
+            return ids, len(positions), found
+
+
+# ==================== PROCESS-WIDE INDEX ====================
+def _update(index, since):
+    if index.start != timezone.now().date() or Hotel.objects.filter(updated_at__gte=since).exists():
+        index.load()
+        return
+    changed = (RoomInventory.objects.filter(updated_at__gte=since, night__gte=index.start,
+                                            night__lt=index.start + timedelta(days=index.days))
+               .order_by().values_list('hotel_id', 'room_type', 'night', 'total', 'held', 'booked'))
+    index.apply(changed.iterator(chunk_size=10000))
+
+
+local_index = LocalIndex('availability', AvailabilityIndex, _update)
+
+
+def search(check_in, check_out, rooms=1, guests=1, city=None, destination_id=None, offset=0, limit=20):
+    inventory.stay_nights(check_in, check_out)
+    if check_in < timezone.now().date():
+        raise inventory.InventoryError('check_in cannot be in the past')
+    if rooms < 1 or guests < 1:
+        raise inventory.InventoryError('rooms and guests must be at least 1')
+    return local_index.get().search(check_in, check_out, rooms, guests, city, destination_id, offset, limit)
@@ -0,0 +1,47 @@
+"""
+Creating several bookings at once, e.g. the hotel, cab and guide of a trip.
+
+All the rows go in with one ``bulk_create``; their ids and
+``booking_reference``s are generated in Python beforehand, so nothing has
+to be read back. Hotel legs then take their rooms from inventory, and the
+Mongo mirror documents and analytics increments for the whole batch are
+queued with a single outbox insert. Bulk inserts send no ``post_save``, so
+legs created already confirmed queue their artefacts here.
+"""
+import uuid
+
+from . import analytics, artefacts, inventory, mirror, outbox
+from .models import Booking
+
+REFERENCE_PREFIX = 'TG'
+
+
+def new_reference():
+    return f'{REFERENCE_PREFIX}{uuid.uuid4().hex[:12].upper()}'
+
+
+def create_many(user, items):
+    """
+    Create bookings from validated ``items`` (which may carry ``hold_id`` and
+    ``room_type`` for hotel legs); call inside a transaction so a leg that
+    fails rolls back the others.
+    """
+    created, legs = [], []
+    for item in items:
+        item = dict(item)
+        hold_id, room_type = item.pop('hold_id', None), item.pop('room_type', None)
+        booking = Booking(user=user, booking_reference=new_reference(), **item)
+        created.append(booking)
+        legs.append((booking, hold_id, room_type))
+
+    Booking.objects.bulk_create(created)
+    for booking, hold_id, room_type in legs:
+        inventory.take_for_booking(booking, hold_id, room_type)
+    confirmed = [booking for booking in created if booking.booking_status == 'confirmed']
+    if confirmed:
+        artefacts.queue(*confirmed)
+    outbox.enqueue_many(
+        mirror.insert_entries(created)
+        + analytics.rollup_entries([(None, analytics.snapshot(booking)) for booking in created])
+    )
+    return created
@@ -1,48 +1,170 @@
 import os
-from pymongo import MongoClient
+import threading
+import time
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient
+from pymongo.errors import PyMongoError
 from dotenv import load_dotenv
 from bson import ObjectId
 from datetime import datetime
 
 load_dotenv()
 
-# MongoDB Connection
+# MongoDB Connection settings (nothing connects until first use)
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
-client = MongoClient(MONGODB_URI)
-db = client["tour"]
+MONGODB_DB = os.getenv("MONGODB_DB", "tour")
+MONGODB_CLIENT_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", 50)),
+    "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", 0)),
+    "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", 60000)),
+    "connectTimeoutMS": int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", 2000)),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 2000)),
+    "socketTimeoutMS": int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", 5000)),
+}
+
+
+class MongoConnection:
+    """
+    Process-wide, lazily created MongoClient.
+
+    The client is built on first use (with ``connect=False`` so even that
+    does no network I/O) and rebuilt in a forked child, since a MongoClient
+    must never be shared across a fork.
+    """
+
+    def __init__(self, uri, default_db, **options):
+        self.uri = uri
+        self.default_db = default_db
+        self.options = options
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        client = self._client
+        if client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    self._client = MongoClient(self.uri, connect=False, **self.options)
+                    self._pid = os.getpid()
+                client = self._client
+        return client
+
+    def database(self, name=None):
+        return self.client[name or self.default_db]
+
+    def reset(self):
+        """Forget the client without closing it (its sockets belong to the parent)"""
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+
+    def ping(self):
+        """Health probe: round trip to the server, returns (ok, latency_ms, error)"""
+        started = time.perf_counter()
+        try:
+            self.client.admin.command("ping")
+        except PyMongoError as e:
+            return False, None, str(e)
+        return True, (time.perf_counter() - started) * 1000, None
+
+
+connection = MongoConnection(MONGODB_URI, MONGODB_DB, **MONGODB_CLIENT_OPTIONS)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=connection.reset)
+
+
+class LazyDatabase:
+    """Stand-in for a pymongo Database that resolves on first attribute access"""
+
+    def __init__(self, name=None):
+        self._name = name
+
+    def __getitem__(self, collection):
+        return connection.database(self._name)[collection]
+
+    def __getattr__(self, attr):
+        return getattr(connection.database(self._name), attr)
+
+
+class LazyCollection:
+    """Stand-in for a pymongo Collection that resolves on first attribute access"""
+
+    def __init__(self, name, database=None):
+        self._name = name
+        self._database = database
+
+    def __getattr__(self, attr):
+        return getattr(connection.database(self._database)[self._name], attr)
+
+
+db = LazyDatabase()
 
 # Collection references
-tours_collection = db["tours"]
-users_collection = db["users"]
-bookings_collection = db["bookings"]
-reviews_collection = db["reviews"]
-payments_collection = db["payments"]
-
-# Index creation for better query performance
-def create_indexes():
-    """Create indexes for production-level performance"""
-    try:
-        # Tours collection indexes
-        tours_collection.create_index("destination")
-        tours_collection.create_index("rating")
-        tours_collection.create_index([("created_at", -1)])
-        
-        # Users collection indexes
-        users_collection.create_index("email", unique=True)
-        users_collection.create_index("phone")
-        
-        # Bookings collection indexes
-        bookings_collection.create_index("user_id")
-        bookings_collection.create_index("tour_id")
-        bookings_collection.create_index([("created_at", -1)])
-        
-        # Reviews collection indexes
-        reviews_collection.create_index("tour_id")
-        reviews_collection.create_index("user_id")
-        
-        print("MongoDB indexes created successfully")
-    except Exception as e:
-        print(f"Error creating indexes: {e}")
+tours_collection = LazyCollection("tours")
+users_collection = LazyCollection("users")
+bookings_collection = LazyCollection("bookings")
+reviews_collection = LazyCollection("reviews")
+payments_collection = LazyCollection("payments")
+
+# Indexes for production-level performance, applied by `manage.py mongo_indexes`
+INDEXES = {
+    "tours": [
+        IndexModel([("type", ASCENDING), ("django_id", ASCENDING)]),
+        IndexModel("destination"),
+        IndexModel("rating"),
+        IndexModel([("created_at", DESCENDING)]),
+    ],
+    "users": [
+        IndexModel("user_id"),
+        IndexModel("email", unique=True),
+        IndexModel("phone"),
+    ],
+    "bookings": [
+        IndexModel("django_booking_id"),
+        IndexModel("user_id"),
+        IndexModel("tour_id"),
+        IndexModel([("created_at", DESCENDING)]),
+    ],
+    "reviews": [
+        IndexModel("tour_id"),
+        IndexModel("user_id"),
+    ],
+}
+
+
+def missing_indexes(indexes=None, database=None):
+    """Return ``[(collection, index_name), ...]`` for indexes not yet built"""
+    database = database or db
+    missing = []
+    for name, models in (indexes or INDEXES).items():
+        existing = database[name].index_information()
+        for model in models:
+            index_name = model.document["name"]
+            if index_name not in existing:
+                missing.append((name, index_name))
+    return missing
+
+
+def create_indexes(indexes=None, database=None):
+    """Build any missing indexes; safe to re-run. Returns what was created."""
+    database = database or db
+    missing = missing_indexes(indexes, database)
+    wanted = set(missing)
+    for name, models in (indexes or INDEXES).items():
+        todo = [model for model in models if (name, model.document["name"]) in wanted]
+        if todo:
+            database[name].create_indexes(todo)
+    return missing
+
 
 # MongoDB utility functions
 def sanitize_document(doc):
@@ -62,6 +184,3 @@ def get_object_id(id_str):
         return ObjectId(id_str)
     except:
         return None
-
-# Initialize indexes on module load
-create_indexes()
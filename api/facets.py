@@ -0,0 +1,275 @@
+"""
+Faceted filtering and facet counts for destinations and hotels.
+
+Each worker keeps a ``FacetIndex`` per catalog kind. Every active row gets
+a slot number, and every facet value holds a bitmap (a Python ``int``) of
+the slots that have it. A request is then a handful of bitwise ANDs/ORs,
+and a facet count is ``(matches & bitmap).bit_count()``, so no GROUP BY
+runs per request. Counts for an OR facet ignore that facet's own selection,
+so the other values stay selectable; amenities are ANDed, so their counts
+narrow as tags are picked.
+
+The indexes are held by ``LocalIndex`` and updated from the model signals.
+"""
+import heapq
+import threading
+
+from .local_index import LocalIndex
+from .models import Destination, Hotel
+
+# (lower bound, upper bound or None); labels look like "1000-2500", "10000+"
+PRICE_BUCKETS = [(0, 1000), (1000, 2500), (2500, 5000), (5000, 10000), (10000, None)]
+RATING_BUCKETS = [4, 3, 2, 1]
+FACET_VALUE_LIMIT = 50
+
+
+def _text(value):
+    label = ' '.join(str(value or '').split())
+    return [(label.casefold(), label)] if label else []
+
+
+def _price(value):
+    value = float(value or 0)
+    for low, high in PRICE_BUCKETS:
+        if high is None or value < high:
+            label = f'{low}+' if high is None else f'{low}-{high}'
+            return [(label, label)]
+    return []
+
+
+def _rating(value):
+    # Cumulative buckets: a 4.5 hotel is in "4+", "3+", ...
+    return [(f'{floor}+', f'{floor}+') for floor in RATING_BUCKETS if (value or 0) >= floor]
+
+
+def _tags(value):
+    return [pair for tag in value or [] for pair in _text(tag)]
+
+
+def _available(value):
+    return [('yes', 'yes')] if (value or 0) > 0 else [('no', 'no')]
+
+
+class Kind:
+    """How one model maps onto facets and sort keys"""
+
+    def __init__(self, model, facets, sort_fields, match_all=()):
+        self.model = model
+        self.facets = facets            # facet name -> (field, values function)
+        self.sort_fields = sort_fields  # ordering name -> field
+        self.match_all = set(match_all)  # facets whose selected values are ANDed
+
+    @property
+    def fields(self):
+        fields = {'id', 'is_active'}
+        fields.update(field for field, _ in self.facets.values())
+        fields.update(self.sort_fields.values())
+        return sorted(fields)
+
+
+KINDS = {
+    'destination': Kind(
+        Destination,
+        facets={
+            'country': ('country', _text),
+            'state': ('state', _text),
+            'price': ('average_cost', _price),
+            'rating': ('rating', _rating),
+        },
+        sort_fields={'rating': 'rating', 'price': 'average_cost', 'created_at': 'created_at'},
+    ),
+    'hotel': Kind(
+        Hotel,
+        facets={
+            'city': ('city', _text),
+            'state': ('state', _text),
+            'country': ('country', _text),
+            'price': ('price_per_night', _price),
+            'rating': ('rating', _rating),
+            'amenities': ('amenities', _tags),
+            'available': ('available_rooms', _available),
+        },
+        sort_fields={'rating': 'rating', 'price': 'price_per_night', 'created_at': 'created_at'},
+        match_all=['amenities'],
+    ),
+}
+
+
+def _slots_of(bitmap):
+    bits = bin(bitmap)[:1:-1]
+    slot = bits.find('1')
+    while slot != -1:
+        yield slot
+        slot = bits.find('1', slot + 1)
+
+
+class FacetIndex:
+    """Slot-numbered bitmaps per facet value for one catalog kind"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self._lock = threading.RLock()
+        self._slots = {}       # object id -> slot
+        self._objects = []     # slot -> object id (None when free)
+        self._sort_keys = []   # slot -> {ordering name: value}
+        self._values = []      # slot -> [(facet, key)]
+        self._free = []
+        self._live = 0
+        self._bitmaps = {facet: {} for facet in kind.facets}
+        self._labels = {facet: {} for facet in kind.facets}
+        self._refs = {facet: {} for facet in kind.facets}
+
+    def __len__(self):
+        return len(self._slots)
+
+    # ---------- updates ----------
+    def upsert(self, row):
+        """Index a ``values()`` row of ``kind.fields``; inactive rows are removed"""
+        object_id = str(row['id'])
+        if not row['is_active']:
+            self.remove(object_id)
+            return
+        with self._lock:
+            slot = self._slots.get(object_id)
+            if slot is None:
+                slot = self._free.pop() if self._free else len(self._objects)
+                if slot == len(self._objects):
+                    self._objects.append(None)
+                    self._sort_keys.append(None)
+                    self._values.append(())
+                self._slots[object_id] = slot
+                self._objects[slot] = object_id
+                self._live |= 1 << slot
+            else:
+                self._clear(slot)
+
+            bit = 1 << slot
+            values = []
+            for facet, (field, extract) in self.kind.facets.items():
+                for key, label in dict(extract(row[field])).items():
+                    bitmaps = self._bitmaps[facet]
+                    bitmaps[key] = bitmaps.get(key, 0) | bit
+                    self._labels[facet].setdefault(key, label)
+                    self._refs[facet][key] = self._refs[facet].get(key, 0) + 1
+                    values.append((facet, key))
+            self._values[slot] = values
+            self._sort_keys[slot] = {
+                name: row[field].timestamp() if hasattr(row[field], 'timestamp') else float(row[field] or 0)
+                for name, field in self.kind.sort_fields.items()
+            }
+
+    def remove(self, object_id):
+        with self._lock:
+            slot = self._slots.pop(str(object_id), None)
+            if slot is None:
+                return
+            self._clear(slot)
+            self._objects[slot] = None
+            self._sort_keys[slot] = None
+            self._live &= ~(1 << slot)
+            self._free.append(slot)
+
+    def _clear(self, slot):
+        mask = ~(1 << slot)
+        for facet, key in self._values[slot]:
+            self._bitmaps[facet][key] &= mask
+            self._refs[facet][key] -= 1
+            if not self._refs[facet][key]:
+                del self._bitmaps[facet][key], self._refs[facet][key], self._labels[facet][key]
+        self._values[slot] = ()
+
+    # ---------- queries ----------
+    def _selection(self, facet, keys):
+        bitmaps = self._bitmaps[facet]
+        if facet in self.kind.match_all:
+            result = self._live
+            for key in keys:
+                result &= bitmaps.get(key, 0)
+            return result
+        result = 0
+        for key in keys:
+            result |= bitmaps.get(key, 0)
+        return result
+
+    def search(self, filters, ordering='-rating', offset=0, limit=20):
+        """
+        ``filters`` maps facet name to selected keys. Returns
+        ``(object ids for the page, total matches, facet counts)``.
+        """
+        with self._lock:
+            selections = {facet: self._selection(facet, keys) for facet, keys in filters.items() if keys}
+            matches = self._live
+            for bitmap in selections.values():
+                matches &= bitmap
+
+            counts = {}
+            for facet in self.kind.facets:
+                base = self._live
+                for other, bitmap in selections.items():
+                    if other != facet or facet in self.kind.match_all:
+                        base &= bitmap
+                values = [
+                    {'value': key, 'label': self._labels[facet][key], 'count': (base & bitmap).bit_count()}
+                    for key, bitmap in self._bitmaps[facet].items()
+                ]
+                values = [value for value in values if value['count']]
+                values.sort(key=lambda value: (-value['count'], value['label']))
+                counts[facet] = values[:FACET_VALUE_LIMIT]
+
+            name = ordering.lstrip('-')
+            sign = -1 if ordering.startswith('-') else 1
+            page = heapq.nsmallest(offset + limit, _slots_of(matches),
+                                   key=lambda slot: sign * self._sort_keys[slot][name])
+            ids = [self._objects[slot] for slot in page[offset:]]
+            return ids, matches.bit_count(), counts
+
+
+# ==================== PROCESS-WIDE INDEXES ====================
+def _rows(kind, since=None):
+    queryset = KINDS[kind].model.objects.order_by()
+    if since is not None:
+        queryset = queryset.filter(updated_at__gte=since)
+    return queryset.values(*KINDS[kind].fields).iterator(chunk_size=5000)
+
+
+def _build(kind):
+    index = FacetIndex(KINDS[kind])
+    for row in _rows(kind):
+        index.upsert(row)
+    return index
+
+
+def _update(kind, index, since):
+    for row in _rows(kind, since):
+        index.upsert(row)
+
+
+local_indexes = {
+    kind: LocalIndex(f'facets:{kind}', lambda kind=kind: _build(kind),
+                     lambda index, since, kind=kind: _update(kind, index, since))
+    for kind in KINDS
+}
+
+
+def orderings(kind):
+    return [prefix + name for name in KINDS[kind].sort_fields for prefix in ('-', '')]
+
+
+def search(kind, filters, ordering='-rating', offset=0, limit=20):
+    filters = {facet: [key for value in values for key, _ in _text(value)] for facet, values in filters.items()}
+    return local_indexes[kind].get().search(filters, ordering, offset, limit)
+
+
+def catalog_saved(instance):
+    kind = instance._meta.model_name
+    index = local_indexes[kind].current()
+    if index is not None:
+        index.upsert({field: getattr(instance, field) for field in KINDS[kind].fields})
+    local_indexes[kind].bump_version()
+
+
+def catalog_deleted(kind, object_id):
+    index = local_indexes[kind].current()
+    if index is not None:
+        index.remove(object_id)
+    local_indexes[kind].bump_version()
@@ -0,0 +1,349 @@
+"""
+Fast read-only path for catalogue list endpoints.
+
+``FastListMixin.list`` reads the page with ``values_list()`` instead of
+model instances and converts each column with a converter picked once per
+serializer class and requested fieldset (most columns need none). JSON
+columns are fetched as text and parsed with ``orjson``, which also renders
+the response when it is installed. The count and page queries are compiled
+to SQL once per query string (``list_cache_key``) and reused, so a request
+costs two database round trips and little ORM work.
+
+The response is byte for byte what the serializer and ``JSONRenderer``
+produce. Anything the converters do not cover (nested or computed fields,
+a non-JSON or indented renderer, floats ``orjson`` would format
+differently) takes the regular path. ``FAST_LISTS=False`` turns it off;
+``manage.py benchmark_lists`` compares the two.
+"""
+import json
+import math
+import threading
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.db import connections, models
+from django.db.models import ExpressionWrapper, F
+from django.http import HttpResponse
+from rest_framework import ISO_8601, fields as drf_fields, relations
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from .fieldsets import requested
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MAX_PLANS = 256
+
+DIGITS_AS_ZERO = bytes.maketrans(b'123456789', b'000000000')
+EXPONENTS = (b'0e0', b'0e-')   # after DIGITS_AS_ZERO
+
+_plans = {}   # (serializer class, requested fieldsets) -> plan()
+_statements = threading.local()   # .compiled: (view class, list_cache_key()) -> _Compiled, per connection
+
+
+class Unsupported(Exception):
+    """A value needs the regular serializer path"""
+
+
+# ==================== CONVERTERS ====================
+# Each factory takes the serializer field and model field and returns a
+# function of the request giving the column's converter (None: as is).
+def _as_is(field, model_field):
+    return lambda request: None
+
+
+def _float(value):
+    value = float(value)
+    if not math.isfinite(value):
+        raise Unsupported(value)
+    return value
+
+
+def _json(text):
+    """What ``JSONField.from_db_value`` returns for the column's text"""
+    if not isinstance(text, str):
+        return text
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass   # NaN, huge integers: leave them to json
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def _datetime(field, model_field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return lambda request: field.to_representation
+
+    def bind(request):
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if value.tzinfo is None:
+                return field.to_representation(value)
+            value = value.astimezone(field_timezone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return convert
+    return bind
+
+
+def _file(field, model_field):
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return lambda request: lambda name: name or None
+
+    def bind(request):
+        urls = {}
+
+        def convert(name):
+            if not name:
+                return None
+            if name not in urls:
+                url = model_field.storage.url(name)
+                urls[name] = request.build_absolute_uri(url) if request is not None else url
+            return urls[name]
+        return convert
+    return bind
+
+
+def _converter(field, model_field):
+    """``(column, converter factory)`` for a serializer field, or ``None`` if it is not a plain column"""
+    if isinstance(field, relations.PrimaryKeyRelatedField):
+        if field.pk_field is not None or not (model_field.many_to_one and model_field.target_field.primary_key):
+            return None
+        return model_field.attname, _as_is(field, model_field)
+    if model_field.is_relation:
+        return None
+    if isinstance(field, drf_fields.FileField):
+        return model_field.attname, _file(field, model_field)
+    if isinstance(field, drf_fields.DateTimeField):
+        return model_field.attname, _datetime(field, model_field)
+    if isinstance(field, drf_fields.FloatField):
+        return model_field.attname, lambda request: _float
+    if isinstance(field, drf_fields.UUIDField) and field.uuid_format == 'hex_verbose':
+        return model_field.attname, lambda request: str
+    if isinstance(field, drf_fields.JSONField) and isinstance(model_field, models.JSONField):
+        if field.binary or model_field.decoder is not None:
+            return None
+        return ExpressionWrapper(F(model_field.attname), output_field=models.TextField()), lambda request: _json
+    if isinstance(field, (drf_fields.ChoiceField, drf_fields.DecimalField, drf_fields.DateField,
+                          drf_fields.TimeField, drf_fields.DurationField)):
+        return model_field.attname, lambda request: field.to_representation
+    if isinstance(field, (drf_fields.CharField, drf_fields.IntegerField, drf_fields.BooleanField,
+                          drf_fields.ReadOnlyField)):
+        return model_field.attname, _as_is(field, model_field)
+    return None
+
+
+def plan(serializer, model):
+    """``(names, columns, [(name, converter factory)])`` for the serializer's fields, or ``None``"""
+    names, columns, converters, seen = [], [], [], set()
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if field.source == '*' or '.' in field.source:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.attname in seen:
+            return None
+        found = _converter(field, model_field)
+        if found is None:
+            return None
+        seen.add(model_field.attname)
+        names.append(name)
+        columns.append(found[0])
+        converters.append((name, found[1]))
+    if not names:
+        return None
+    return names, columns, converters
+
+
+def rows(found, values, request):
+    names, _, factories = found
+    converters = []
+    for name, factory in factories:
+        convert = factory(request)
+        if convert is not None:
+            converters.append((name, convert))
+    results = []
+    for row in values:
+        item = dict(zip(names, row))
+        for name, convert in converters:
+            value = item[name]
+            if value is not None:
+                item[name] = convert(value)
+        results.append(item)
+    return results
+
+
+# ==================== RENDERING ====================
+def _like_json(content):
+    """
+    False if ``orjson`` may have written a float unlike ``json.dumps``
+    (1e-05 as 0.00001, 1e+16 as 1e16); look-alikes inside strings only
+    cost the regular render.
+    """
+    if b'0.0000' in content:
+        return False
+    digits = content.translate(DIGITS_AS_ZERO)
+    for exponent in EXPONENTS:
+        at = digits.find(exponent)
+        while at != -1:
+            # A number, not part of a string like a UUID, if only digits lead back to a delimiter
+            before = content[max(at - 32, 0):at].rstrip(b'0123456789.-')
+            if before[-1:] in (b':', b',', b'['):
+                return False
+            at = digits.find(exponent, at + 1)
+    return True
+
+
+def render(data, request, view):
+    """``data`` as the view's ``JSONRenderer`` renders it"""
+    renderer = request.accepted_renderer
+    if orjson is not None and renderer.compact and renderer.strict and not renderer.ensure_ascii:
+        try:
+            content = orjson.dumps(data)
+        except orjson.JSONEncodeError:
+            content = None
+        if content is not None and _like_json(content):
+            # JSONRenderer escapes the two line terminators JavaScript does not allow in strings
+            return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return renderer.render(data, request.accepted_media_type, view.get_renderer_context())
+
+
+class _Compiled:
+    """
+    A view's filtered queryset compiled to SQL once, for the count and each
+    page slice, and run again without the ORM
+    """
+
+    def __init__(self, queryset, values):
+        self.ordered = queryset.ordered
+        self.values = values
+        self.counter = _Statement(queryset.order_by().values_list('pk'), counting=True)
+        self.pages = {}
+
+    def count(self):
+        return self.counter.run()[0][0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        bounds = (key.start, key.stop)
+        if bounds not in self.pages:
+            if len(self.pages) >= MAX_PLANS:
+                self.pages.clear()
+            self.pages[bounds] = _Statement(self.values[key])
+        return self.pages[bounds].run()
+
+
+class _Statement:
+    """SQL, params and database converters of a ``values_list()`` queryset"""
+
+    def __init__(self, queryset, counting=False):
+        self.using = queryset.db
+        self.compiler = queryset.query.get_compiler(self.using)
+        self.width, self.converters, self.order = None, {}, None
+        self.empty = [(0,)] if counting else []
+        try:
+            sql, self.params = self.compiler.as_sql()
+        except EmptyResultSet:
+            self.sql = None   # the filters match nothing
+            return
+        if counting:
+            self.sql = f'SELECT COUNT(*) FROM ({sql}) subquery'
+            return
+        self.sql = sql
+        if self.compiler.has_extra_select:
+            self.width = self.compiler.col_count
+        self.converters = self.compiler.get_converters(
+            [expression for expression, _, _ in self.compiler.select[:self.compiler.col_count]]
+        )
+        # Expression columns come last in the SELECT; put them back in place as ValuesListIterable does
+        query = queryset.query
+        names = [*query.extra_select, *query.values_select, *query.annotation_select]
+        fields = [*queryset._fields, *(name for name in query.annotation_select if name not in queryset._fields)]
+        if fields != names:
+            positions = [names.index(name) for name in fields]
+            self.order = lambda row: tuple(row[i] for i in positions)
+
+    def run(self):
+        if self.sql is None:
+            return self.empty
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(self.sql, self.params)
+            found = cursor.fetchall()
+        if self.width is not None:
+            found = [row[:self.width] for row in found]
+        if self.converters:
+            found = list(self.compiler.apply_converters(found, self.converters))
+        if self.order is not None:
+            found = [self.order(row) for row in found]
+        return found
+
+
+# ==================== VIEWSETS ====================
+class FastListMixin:
+    """Viewset mixin serving ``list`` from ``values_list()`` rows when the serializer allows it"""
+
+    def _fast_plan(self, request):
+        renderer = getattr(request, 'accepted_renderer', None)
+        if not settings.FAST_LISTS or type(renderer) is not JSONRenderer:
+            return None
+        if renderer.get_indent(request.accepted_media_type, self.get_renderer_context()) is not None:
+            return None
+        key = (self.get_serializer_class(),
+               tuple(sorted((param, tuple(sorted(names))) for param, names in requested(request).items())))
+        if key not in _plans:
+            if len(_plans) >= MAX_PLANS:
+                _plans.clear()
+            _plans[key] = plan(self.get_serializer(), self.get_queryset().model)
+        return _plans[key]
+
+    def list_cache_key(self, request):
+        """
+        What the filtered queryset depends on besides the view class; its SQL
+        is reused for every request with the same key. Override when
+        ``get_queryset`` or a filter backend reads more than the query string
+        (the user, the time).
+        """
+        return tuple(sorted((param, tuple(values)) for param, values in request.query_params.lists()))
+
+    def _compiled(self, request, found):
+        compiled = getattr(_statements, 'compiled', None)
+        if compiled is None:
+            compiled = _statements.compiled = {}
+        key = (type(self), self.list_cache_key(request))
+        if key not in compiled:
+            if len(compiled) >= MAX_PLANS:
+                compiled.clear()
+            queryset = self.filter_queryset(self.get_queryset())
+            compiled[key] = _Compiled(queryset, queryset.values_list(*found[1]))
+        return compiled[key]
+
+    def list(self, request, *args, **kwargs):
+        found = self._fast_plan(request)
+        if found is None:
+            return super().list(request, *args, **kwargs)
+        compiled = self._compiled(request, found)
+        page = self.paginate_queryset(compiled)
+        try:
+            results = rows(found, compiled[:] if page is None else page, request)
+        except Unsupported:
+            return super().list(request, *args, **kwargs)
+        data = results if page is None else self.get_paginated_response(results).data
+        renderer = request.accepted_renderer
+        content_type = f'{renderer.media_type}; charset={renderer.charset}' if renderer.charset else renderer.media_type
+        return HttpResponse(render(data, request, self), content_type=content_type)
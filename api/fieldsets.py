@@ -0,0 +1,146 @@
+"""
+Sparse fieldsets for API responses.
+
+On GET requests ``?fields=name,city`` keeps only those fields of the
+top-level objects, ``?omit=images,policies`` drops fields, and
+``?expand=destination`` nests a related object (from the serializer's
+``expandable_fields``) instead of its id. Dotted names apply to nested
+objects: ``?expand=destination&fields=name,destination.name``. Without any
+of them responses are unchanged.
+
+Viewsets with ``SparseQuerysetMixin`` also load only the columns those fields
+read: ``.only()`` over the fields' model columns plus the ordering columns,
+and ``select_related`` for nested objects. Card listings thus skip the
+heavy JSON columns (``images``, ``attractions``, ``room_types``, ...) in the
+database as well as in the response.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+PARAMS = ('fields', 'omit', 'expand')
+
+
+def requested(request):
+    """``{'fields', 'omit', 'expand'}`` name sets from a safe request's query string (empty otherwise)"""
+    if request is None or request.method not in SAFE_METHODS:
+        return {}
+    found = {}
+    for param in PARAMS:
+        names = {name.strip() for value in request.query_params.getlist(param) for name in value.split(',')}
+        names.discard('')
+        if names:
+            found[param] = names
+    return found
+
+
+def _split(names):
+    """``({own names}, {field: {names below it}})`` from dotted names"""
+    own, nested = set(), {}
+    for name in names:
+        head, _, rest = name.partition('.')
+        if rest:
+            nested.setdefault(head, set()).add(rest)
+        else:
+            own.add(head)
+    return own, nested
+
+
+def _below(params, name):
+    """The params (as name sets) for the object nested in field ``name``"""
+    return {param: nested[name] for param, (_, nested) in params.items() if name in nested}
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin honouring ``?fields=``, ``?omit=`` and ``?expand=``
+    for the top-level objects; dotted names (``destination.name``) reach into
+    nested objects.
+    """
+    expandable_fields = {}   # field name -> serializer class nested by ?expand=
+
+    def __init__(self, *args, sparse=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sparse = sparse
+
+    def _params(self):
+        if self.sparse is not None:
+            return self.sparse
+        root = self.root
+        if root is self or (isinstance(root, serializers.ListSerializer) and root.child is self):
+            return requested(self.context.get('request'))
+        return {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        params = {param: _split(names) for param, names in self._params().items()}
+        if not params:
+            return fields
+
+        own, nested = params.get('expand', (set(), {}))
+        for name in own | set(nested):
+            if name in self.expandable_fields:
+                fields[name] = self.expandable_fields[name](read_only=True, sparse=_below(params, name))
+        if 'fields' in params:
+            own, nested = params['fields']
+            fields = {name: field for name, field in fields.items() if name in own or name in nested}
+        for name in params.get('omit', (set(), {}))[0]:
+            fields.pop(name, None)
+        for name, field in fields.items():
+            if isinstance(field, SparseFieldsMixin) and field.sparse is None and _below(params, name):
+                field.sparse = _below(params, name)
+        return fields
+
+
+def columns(serializer, model, prefix=''):
+    """
+    ``(columns, related)`` to load for ``serializer``'s readable fields, or
+    ``None`` if one reads something other than a model field (the whole
+    object, a property, a method).
+    """
+    names, related = {prefix + model._meta.pk.name}, set()
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        source = field.source.split('.')[0]
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            return None
+        if model_field.many_to_many or model_field.one_to_many:
+            continue   # loaded by its own query
+        if not model_field.concrete:
+            return None
+        names.add(prefix + source)
+        nested = getattr(field, 'child', field)
+        if model_field.many_to_one and isinstance(nested, serializers.BaseSerializer):
+            found = columns(nested, model_field.related_model, f'{prefix}{source}__')
+            if found is None:
+                return None
+            names |= found[0]
+            related |= {prefix + source} | found[1]
+    return names, related
+
+
+class SparseQuerysetMixin:
+    """Viewset mixin narrowing the SQL to the columns of the requested fields"""
+
+    def get_queryset(self):
+        return self.narrow(super().get_queryset())
+
+    def narrow(self, queryset):
+        if not requested(self.request):
+            return queryset
+        found = columns(self.get_serializer(), queryset.model)
+        if found is None:
+            return queryset
+        names, related = found
+        for name in list(getattr(self, 'ordering_fields', None) or []) + list(getattr(self, 'ordering', None) or []):
+            try:
+                if queryset.model._meta.get_field(name.lstrip('-')).concrete:
+                    names.add(name.lstrip('-'))
+            except FieldDoesNotExist:
+                pass
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*names)
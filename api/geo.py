@@ -0,0 +1,190 @@
+"""
+Spatial index for located catalog and user content.
+
+Every destination, hotel, gallery photo and saved place with coordinates
+has a ``GeoPoint`` row holding its geohash, kept up to date from the model
+signals in the same transaction as the row itself. A ``(kind, geohash)``
+B-tree index turns "what is near here" into a few range scans:
+
+1. the search circle's bounding box is covered by at most ``MAX_CELLS``
+   geohash cells, each of which is a key range ``[cell, cell~)``;
+2. the candidates from those ranges are also filtered by the bounding box
+   in SQL;
+3. exact haversine distances are computed for the survivors.
+
+k-nearest queries run radius queries with a growing radius until k points
+fall inside it, which makes the result exact.
+"""
+import heapq
+import math
+
+from django.db.models import Q
+
+from .models import Destination, GeoPoint, Hotel, SavedPlace, TravelGallery
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+GEOHASH_PRECISION = 12
+MAX_CELLS = 16
+KNN_START_RADIUS_KM = 5.0
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# kind -> (model, instance -> (owner id, is public)); rows without coordinates are not indexed
+SOURCES = {
+    'destination': (Destination, lambda obj: (None, obj.is_active)),
+    'hotel': (Hotel, lambda obj: (None, obj.is_active)),
+    'gallery': (TravelGallery, lambda obj: (obj.user_id, obj.is_public)),
+    'savedplace': (SavedPlace, lambda obj: (obj.user_id, False)),
+}
+KIND_BY_MODEL = {model: kind for kind, (model, _) in SOURCES.items()}
+
+
+# ==================== GEOMETRY ====================
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell"""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """``(min lat, max lat, [(min lon, max lon), ...])``, split at the antimeridian"""
+    delta_lat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+
+    delta_lon = delta_lat / math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if delta_lon >= 180:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+    west, east = longitude - delta_lon, longitude + delta_lon
+    if west < -180:
+        return min_lat, max_lat, [(west + 360, 180.0), (-180.0, east)]
+    if east > 180:
+        return min_lat, max_lat, [(west, 180.0), (-180.0, east - 360)]
+    return min_lat, max_lat, [(west, east)]
+
+
+def _steps(low, high, step):
+    value = low
+    while value < high:
+        yield value
+        value += step
+    yield high
+
+
+def covering_cells(min_lat, max_lat, lon_ranges):
+    """The longest geohash prefixes (at most ``MAX_CELLS``) covering the box; ``['']`` is everything"""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.ceil((max_lat - min_lat) / height) + 1
+        columns = sum(math.ceil((east - west) / width) + 1 for west, east in lon_ranges)
+        if rows * columns > MAX_CELLS:
+            continue
+        return sorted({
+            encode(lat, lon, precision)
+            for west, east in lon_ranges
+            for lat in _steps(min_lat, max_lat, height)
+            for lon in _steps(west, east, width)
+        })
+    return ['']
+
+
+# ==================== INDEX MAINTENANCE ====================
+def point_for(instance):
+    """The unsaved ``GeoPoint`` for ``instance``, or ``None`` without coordinates"""
+    kind = KIND_BY_MODEL[type(instance)]
+    if instance.latitude is None or instance.longitude is None:
+        return None
+    owner_id, is_public = SOURCES[kind][1](instance)
+    return GeoPoint(
+        kind=kind,
+        object_id=str(instance.pk),
+        owner_id=owner_id,
+        is_public=is_public,
+        latitude=instance.latitude,
+        longitude=instance.longitude,
+        geohash=encode(instance.latitude, instance.longitude),
+    )
+
+
+def index_instance(instance):
+    point = point_for(instance)
+    if point is None:
+        remove_instance(instance)
+        return
+    GeoPoint.objects.update_or_create(
+        kind=point.kind,
+        object_id=point.object_id,
+        defaults={field: getattr(point, field)
+                  for field in ('owner_id', 'is_public', 'latitude', 'longitude', 'geohash')},
+    )
+
+
+def remove_instance(instance):
+    GeoPoint.objects.filter(kind=KIND_BY_MODEL[type(instance)], object_id=str(instance.pk)).delete()
+
+
+# ==================== QUERIES ====================
+def _within(kind, latitude, longitude, radius_km, visible):
+    min_lat, max_lat, lon_ranges = bounding_box(latitude, longitude, radius_km)
+    cells = Q()
+    for cell in covering_cells(min_lat, max_lat, lon_ranges):
+        cells |= Q(geohash__gte=cell, geohash__lt=cell + '~') if cell else Q()
+    longitudes = Q()
+    for west, east in lon_ranges:
+        longitudes |= Q(longitude__gte=west, longitude__lte=east)
+
+    candidates = GeoPoint.objects.filter(
+        cells, longitudes, visible, kind=kind, latitude__gte=min_lat, latitude__lte=max_lat,
+    ).values_list('object_id', 'latitude', 'longitude')
+
+    for object_id, lat, lon in candidates.iterator(chunk_size=2000):
+        distance = haversine_km(latitude, longitude, lat, lon)
+        if distance <= radius_km:
+            yield distance, object_id
+
+
+def nearby(kind, latitude, longitude, radius_km=None, k=None, visible=Q(is_public=True)):
+    """
+    ``[(object id, distance in km)]`` nearest first: everything within
+    ``radius_km``, the ``k`` nearest, or the ``k`` nearest within the radius.
+    ``visible`` restricts which ``GeoPoint`` rows may be returned.
+    """
+    if radius_km is not None:
+        points = _within(kind, latitude, longitude, radius_km, visible)
+        found = heapq.nsmallest(k, points) if k else sorted(points)
+        return [(object_id, distance) for distance, object_id in found]
+
+    radius = KNN_START_RADIUS_KM
+    while True:
+        found = heapq.nsmallest(k, _within(kind, latitude, longitude, radius, visible))
+        if len(found) >= k or radius >= MAX_DISTANCE_KM:
+            return [(object_id, distance) for distance, object_id in found]
+        radius = min(radius * 4, MAX_DISTANCE_KM)
@@ -0,0 +1,227 @@
+"""
+Geofences around a user's favourite locations and wishlisted places.
+
+Each worker keeps a small spatial grid of fences per user (an LRU of at
+most ``GEOFENCE_CACHED_USERS`` users), rebuilt when the user's version key
+in the cache changes or after ``GEOFENCE_GRID_MAX_AGE_SECONDS``, so changes
+reach other workers even when the cache is not shared. A GPS batch checks each point only
+against the fences in the grid cells around it, plus the fences the user
+is currently inside (to see them leave), so the cost does not grow with
+the number of favourites.
+
+Transitions are debounced: the new side must be observed for at least
+``GEOFENCE_DEBOUNCE_SECONDS`` before it counts, and leaving uses a wider
+radius than entering. State lives in ``GeofenceState`` and is updated in the
+ingestion transaction; notifications for a batch are written with a single
+``bulk_create``.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .geo import haversine_km
+from .models import FavoriteLocation, GeofenceState, Notification, Wishlist
+
+CELL_DEGREES = 0.05
+EXIT_RADIUS_FACTOR = 1.25
+METRES_PER_DEGREE = 111320.0
+
+
+class Fence:
+    __slots__ = ('key', 'name', 'latitude', 'longitude', 'radius_m')
+
+    def __init__(self, key, name, latitude, longitude, radius_m):
+        self.key = key
+        self.name = name
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius_m = radius_m
+
+    def distance_m(self, latitude, longitude):
+        return haversine_km(self.latitude, self.longitude, latitude, longitude) * 1000
+
+
+def _cell(latitude, longitude):
+    return int(math.floor(latitude / CELL_DEGREES)), int(math.floor(longitude / CELL_DEGREES))
+
+
+class FenceGrid:
+    """Fences bucketed into ``CELL_DEGREES`` cells"""
+
+    def __init__(self, fences):
+        self.fences = {fence.key: fence for fence in fences}
+        self.cells = {}
+        self.reach_m = max((fence.radius_m for fence in fences), default=0) * EXIT_RADIUS_FACTOR
+        for fence in fences:
+            self.cells.setdefault(_cell(fence.latitude, fence.longitude), []).append(fence)
+
+    def near(self, latitude, longitude):
+        """Fences whose (exit) radius could contain the point"""
+        if not self.cells:
+            return []
+        row, column = _cell(latitude, longitude)
+        rows = math.ceil(self.reach_m / METRES_PER_DEGREE / CELL_DEGREES)
+        scale = max(math.cos(math.radians(min(abs(latitude) + CELL_DEGREES, 89.9))), 1e-6)
+        columns = math.ceil(self.reach_m / (METRES_PER_DEGREE * scale) / CELL_DEGREES)
+        if (2 * rows + 1) * (2 * columns + 1) > len(self.cells):
+            return list(self.fences.values())
+        found = []
+        for r in range(row - rows, row + rows + 1):
+            for c in range(column - columns, column + columns + 1):
+                found.extend(self.cells.get((r, c), ()))
+        return found
+
+
+# ==================== PER-USER GRIDS ====================
+_grids = OrderedDict()
+_grids_lock = threading.Lock()
+
+
+def _version_key(user_id):
+    return f'geofence:{user_id}:version'
+
+
+def load_fences(user_id):
+    fences = [
+        Fence(f'favorite:{pk}', name, lat, lon, settings.GEOFENCE_FAVORITE_RADIUS_M)
+        for pk, name, lat, lon in FavoriteLocation.objects.filter(user_id=user_id)
+        .values_list('pk', 'name', 'latitude', 'longitude')
+    ]
+    wishlist = (
+        Wishlist.objects.filter(user_id=user_id, is_visited=False)
+        .filter(Q(destination__latitude__isnull=False) | Q(hotel__latitude__isnull=False))
+        .values_list('destination_id', 'destination__name', 'destination__latitude', 'destination__longitude',
+                     'hotel_id', 'hotel__name', 'hotel__latitude', 'hotel__longitude')
+    )
+    for row in wishlist:
+        for kind, (pk, name, lat, lon), radius in (
+            ('destination', row[:4], settings.GEOFENCE_DESTINATION_RADIUS_M),
+            ('hotel', row[4:], settings.GEOFENCE_FAVORITE_RADIUS_M),
+        ):
+            if pk is not None and lat is not None and lon is not None:
+                fences.append(Fence(f'{kind}:{pk}', name, lat, lon, radius))
+    return FenceGrid(fences)
+
+
+def grid_for(user_id):
+    version = cache.get(_version_key(user_id), 0)
+    now = time.monotonic()
+    with _grids_lock:
+        entry = _grids.get(user_id)
+        if entry is not None and entry[0] == version and now - entry[1] < settings.GEOFENCE_GRID_MAX_AGE_SECONDS:
+            _grids.move_to_end(user_id)
+            return entry[2]
+    grid = load_fences(user_id)
+    with _grids_lock:
+        _grids[user_id] = (version, now, grid)
+        _grids.move_to_end(user_id)
+        while len(_grids) > settings.GEOFENCE_CACHED_USERS:
+            _grids.popitem(last=False)
+    return grid
+
+
+def invalidate(user_id):
+    """Rebuild the user's fences on next use, in every worker"""
+    key = _version_key(user_id)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+# ==================== EVALUATION ====================
+def evaluate(user_id, rows):
+    """
+    Run a batch of ``(timestamp, lat, lon, alt, acc)`` points through the
+    user's geofences; returns the ``(fence key, 'enter'|'exit', timestamp)``
+    transitions. Must run inside the transaction that stores the points.
+    """
+    grid = grid_for(user_id)
+    if not grid.fences:
+        return []
+    debounce = timedelta(seconds=settings.GEOFENCE_DEBOUNCE_SECONDS)
+    max_accuracy = settings.GEOFENCE_MAX_ACCURACY_M
+    states = {
+        state.fence: state
+        for state in GeofenceState.objects.select_for_update().filter(
+            Q(inside=True) | Q(pending_since__isnull=False), user_id=user_id
+        )
+    }
+    loaded = set(states)
+    changed, events = {}, []
+
+    for timestamp, lat, lon, _, accuracy in sorted(rows, key=lambda row: row[0]):
+        if accuracy is not None and accuracy > max_accuracy:
+            continue
+        candidates = {fence.key: fence for fence in grid.near(lat, lon)}
+        for key in states:
+            if key in grid.fences:
+                candidates.setdefault(key, grid.fences[key])
+        for key, fence in candidates.items():
+            state = states.get(key)
+            tracked = state is not None
+            if not tracked:
+                state = GeofenceState(user_id=user_id, fence=key, inside=False, last_seen=timestamp)
+            elif timestamp < state.last_seen:
+                continue
+            radius = fence.radius_m * (EXIT_RADIUS_FACTOR if state.inside else 1)
+            observed = fence.distance_m(lat, lon) <= radius
+            if observed == state.inside:
+                if not tracked:
+                    continue
+                state.pending_since = None
+            elif state.pending_since is None:
+                state.pending_since = timestamp
+            elif timestamp - state.pending_since >= debounce:
+                state.inside, state.pending_since = observed, None
+                events.append((fence, 'enter' if observed else 'exit', timestamp))
+            state.last_seen = timestamp
+            states[key] = changed[key] = state
+
+    _save_states(user_id, changed, loaded)
+    _notify(user_id, events)
+    return [(fence.key, event, timestamp) for fence, event, timestamp in events]
+
+
+def _save_states(user_id, changed, loaded):
+    if not changed:
+        return
+    existing = dict(
+        GeofenceState.objects.filter(user_id=user_id, fence__in=[key for key in changed if key not in loaded])
+        .values_list('fence', 'pk')
+    )
+    updates, creates = [], []
+    for key, state in changed.items():
+        if state.pk is None and key in existing:
+            state.pk = existing[key]
+        (updates if state.pk is not None else creates).append(state)
+    GeofenceState.objects.bulk_create(creates)
+    GeofenceState.objects.bulk_update(updates, ['inside', 'pending_since', 'last_seen'])
+
+
+def _notify(user_id, events):
+    if not events:
+        return
+    notifications = []
+    for fence, event, timestamp in events:
+        if event == 'exit' and not settings.GEOFENCE_NOTIFY_EXIT:
+            continue
+        kind, object_id = fence.key.split(':', 1)
+        notifications.append(Notification(
+            user_id=user_id,
+            notification_type='reminder',
+            title=f"You're near {fence.name}" if event == 'enter' else f"You left {fence.name}",
+            message=(f"You are within {int(fence.radius_m)} m of {fence.name}." if event == 'enter'
+                     else f"You have left the area around {fence.name}."),
+            data={'geofence': fence.key, 'kind': kind, 'id': object_id, 'event': event,
+                  'at': timestamp.isoformat()},
+            priority=2,
+        ))
+    Notification.objects.bulk_create(notifications)
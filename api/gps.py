@@ -0,0 +1,169 @@
+"""
+Batched GPS point ingestion for trip tracking.
+
+Phones send a trip's fixes as columnar arrays, optionally gzip-compressed
+(``Content-Encoding: gzip``)::
+
+    {"t": [1718000000000, ...],          # epoch milliseconds
+     "lat": [19.0760, ...], "lon": [72.8777, ...],
+     "alt": [12.0, ...], "acc": [5.0, ...]}   # optional, may hold nulls
+
+The whole batch is validated column by column, invalid points are dropped
+and reported by index, and the rest are written with ``bulk_create`` while
+the trip's end point and ``total_distance`` are advanced and the points are
+run through the user's geofences (see ``geofence``). A
+batch is remembered by its idempotency key (the ``Idempotency-Key`` header,
+or a hash of the payload), so a retransmitted batch is acknowledged without
+storing its points twice.
+"""
+import hashlib
+import json
+import math
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from . import geofence, track_metrics, track_simplify
+from .models import GPSBatch, GPSLocation, TripTrack
+
+MAX_BATCH_POINTS = 10000
+MAX_BODY_BYTES = 8 * 1024 * 1024
+BULK_CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 20
+CLOCK_SKEW = timedelta(minutes=5)
+COLUMNS = ('t', 'lat', 'lon', 'alt', 'acc')
+
+
+class GzipJSONParser(JSONParser):
+    """JSON parser that also accepts ``Content-Encoding: gzip`` bodies, bounded in size"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        if request.META.get('HTTP_CONTENT_ENCODING', '').lower() != 'gzip':
+            return super().parse(stream, media_type, parser_context)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(stream.read(MAX_BODY_BYTES + 1), MAX_BODY_BYTES)
+        except zlib.error as e:
+            raise ParseError(f'Invalid gzip body: {e}')
+        if decompressor.unconsumed_tail:
+            raise ParseError(f'Decompressed body larger than {MAX_BODY_BYTES} bytes')
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise ParseError(f'JSON parse error - {e}')
+
+
+class BatchError(ValueError):
+    """The batch as a whole is malformed"""
+
+
+def _finite(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def parse_batch(payload, not_before, not_after):
+    """
+    Validate a columnar batch. Returns ``(rows, errors, rejected)``: the
+    ``(timestamp, lat, lon, alt, acc)`` tuples for the valid points, point
+    index -> reason for the first few invalid ones, and how many were dropped.
+    """
+    if not isinstance(payload, dict):
+        raise BatchError('Expected an object of point arrays')
+    columns = {name: payload.get(name) for name in COLUMNS}
+    for name in ('t', 'lat', 'lon'):
+        if not isinstance(columns[name], list):
+            raise BatchError(f"'{name}' must be an array")
+    size = len(columns['t'])
+    if size > MAX_BATCH_POINTS:
+        raise BatchError(f'At most {MAX_BATCH_POINTS} points per batch')
+    for name, values in columns.items():
+        if values is None:
+            columns[name] = [None] * size
+        elif not isinstance(values, list) or len(values) != size:
+            raise BatchError(f"'{name}' must be an array of {size} values")
+
+    low, high = not_before.timestamp() * 1000, not_after.timestamp() * 1000
+    rows, errors, rejected = [], {}, 0
+    for index, (t, lat, lon, alt, acc) in enumerate(zip(*(columns[name] for name in COLUMNS))):
+        if not (_finite(t) and low <= t <= high):
+            reason = 'timestamp out of range'
+        elif not (_finite(lat) and -90 <= lat <= 90 and _finite(lon) and -180 <= lon <= 180):
+            reason = 'invalid coordinates'
+        elif alt is not None and not _finite(alt):
+            reason = 'invalid altitude'
+        elif acc is not None and not (_finite(acc) and acc >= 0):
+            reason = 'invalid accuracy'
+        else:
+            rows.append((datetime.fromtimestamp(t / 1000, tz=dt_timezone.utc), lat, lon, alt, acc))
+            continue
+        rejected += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors[index] = reason
+    return rows, errors, rejected
+
+
+def batch_key(payload, header=None):
+    if header:
+        return header[:64]
+    canonical = json.dumps([payload.get(name) for name in COLUMNS], separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def ingest(trip, payload, key=None):
+    """
+    Store a batch of points for ``trip``. Returns a summary dict; a batch
+    whose key was already ingested returns the original summary with
+    ``duplicate`` set and writes nothing.
+    """
+    if not isinstance(payload, dict):
+        raise BatchError('Expected an object of point arrays')
+    key = batch_key(payload, key)
+    existing = GPSBatch.objects.filter(trip=trip, key=key).first()
+    if existing is not None:
+        return _summary(existing, duplicate=True)
+
+    rows, errors, rejected = parse_batch(payload, trip.start_time - CLOCK_SKEW, timezone.now() + CLOCK_SKEW)
+    points = [
+        GPSLocation(user_id=trip.user_id, trip_id=trip.pk, timestamp=timestamp,
+                    latitude=lat, longitude=lon, altitude=alt, accuracy=acc)
+        for timestamp, lat, lon, alt, acc in rows
+    ]
+    try:
+        with transaction.atomic():
+            batch = GPSBatch.objects.create(trip=trip, key=key, accepted=len(points), rejected=rejected)
+            trip = TripTrack.objects.select_for_update().get(pk=trip.pk)
+            last = (GPSLocation.objects.filter(trip=trip).order_by('-timestamp')
+                    .values_list('timestamp', 'latitude', 'longitude').first())
+            for start in range(0, len(points), BULK_CHUNK_SIZE):
+                GPSLocation.objects.bulk_create(points[start:start + BULK_CHUNK_SIZE])
+            events = []
+            if rows:
+                _extend_trip(trip, rows, last)
+                events = geofence.evaluate(trip.user_id, rows)
+                transaction.on_commit(lambda: track_simplify.invalidate(trip.pk))
+    except IntegrityError:
+        # The same batch is being stored by a concurrent retry
+        return _summary(GPSBatch.objects.get(trip=trip, key=key), duplicate=True)
+    return {**_summary(batch), 'errors': errors, 'geofence_events': len(events)}
+
+
+def _extend_trip(trip, rows, last):
+    """Advance the trip's end point and distance; ``last`` is its latest point before this batch"""
+    if last is None or min(row[0] for row in rows) >= last[0]:
+        trip.total_distance += track_metrics.append_distance(last, rows)
+    else:
+        # Late points landed inside the stored track
+        trip.total_distance = track_metrics.recompute_distance(trip.pk)
+    newest = max(rows, key=lambda row: row[0])
+    if trip.end_time is None or newest[0] >= trip.end_time:
+        trip.end_time, trip.end_latitude, trip.end_longitude = newest[0], newest[1], newest[2]
+    trip.save(update_fields=['end_time', 'end_latitude', 'end_longitude', 'total_distance'])
+
+
+def _summary(batch, duplicate=False):
+    return {'batch': batch.key, 'accepted': batch.accepted, 'rejected': batch.rejected, 'duplicate': duplicate}
@@ -0,0 +1,184 @@
+"""
+Retention for GPS points: archive finished trips, downsample old points.
+
+``GPSLocation`` only keeps data that is still queried row by row. Each
+``compact()`` pass does a bounded amount of work, so it can run often from
+``manage.py compact_gps --loop``:
+
+1. finished trips older than ``GPS_ARCHIVE_AFTER_DAYS`` are packed into a
+   ``TripArchive`` blob and their rows deleted;
+2. remaining points older than each ``GPS_DOWNSAMPLE_TIERS`` age are thinned
+   to one point per interval (per user and trip), walking forward in time
+   a page at a time; ``resolution`` records the tier a point has reached;
+3. points without a trip older than ``GPS_RETENTION_DAYS`` are deleted.
+
+Archive blob layout (little endian)::
+
+    b"GPA1" | uint32 count | zlib(t deltas int64 ms | lat deltas int32 1e-6 deg
+                                 | lon deltas int32 | alt int32 dm | acc int32 dm)
+
+Missing altitude/accuracy are stored as ``NULL_VALUE``.
+"""
+import struct
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import GPSLocation, TripArchive, TripTrack
+
+MAGIC = b'GPA1'
+HEADER = struct.Struct('<4sI')
+NULL_VALUE = np.iinfo(np.int32).min
+COORDINATE_SCALE = 1e6
+METRIC_SCALE = 10
+DELETE_CHUNK_SIZE = 1000
+PAGE_SIZE = 5000
+
+
+# ==================== ARCHIVE FORMAT ====================
+def _scaled(values, scale):
+    array = np.array([NULL_VALUE if value is None else round(value * scale) for value in values], dtype=np.int64)
+    return np.clip(array, NULL_VALUE, np.iinfo(np.int32).max).astype('<i4')
+
+
+def encode_points(points):
+    """Pack ``(timestamp, lat, lon, alt, acc)`` tuples in time order"""
+    count = len(points)
+    columns = list(zip(*points)) if points else [(), (), (), (), ()]
+    millis = np.array([round(moment.timestamp() * 1000) for moment in columns[0]], dtype='<i8')
+    lat = np.round(np.array(columns[1], dtype=np.float64) * COORDINATE_SCALE).astype('<i4')
+    lon = np.round(np.array(columns[2], dtype=np.float64) * COORDINATE_SCALE).astype('<i4')
+    body = b''.join([
+        np.diff(millis, prepend=np.int64(0)).astype('<i8').tobytes(),
+        np.diff(lat, prepend=np.int32(0)).astype('<i4').tobytes(),
+        np.diff(lon, prepend=np.int32(0)).astype('<i4').tobytes(),
+        _scaled(columns[3], METRIC_SCALE).tobytes(),
+        _scaled(columns[4], METRIC_SCALE).tobytes(),
+    ])
+    return HEADER.pack(MAGIC, count) + zlib.compress(body, 6)
+
+
+def decode_points(blob):
+    """``(millis int64, lat, lon, alt, acc float64 with NaN for missing)`` arrays"""
+    magic, count = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError(f'Unknown trip archive format {magic!r}')
+    body = zlib.decompress(bytes(blob[HEADER.size:]))
+    offsets = np.cumsum([0, 8 * count] + [4 * count] * 4)
+    millis = np.cumsum(np.frombuffer(body, '<i8', count, offsets[0]))
+    lat = np.cumsum(np.frombuffer(body, '<i4', count, offsets[1]).astype(np.int64)) / COORDINATE_SCALE
+    lon = np.cumsum(np.frombuffer(body, '<i4', count, offsets[2]).astype(np.int64)) / COORDINATE_SCALE
+    metrics = []
+    for offset in offsets[3:5]:
+        raw = np.frombuffer(body, '<i4', count, offset)
+        metrics.append(np.where(raw == NULL_VALUE, np.nan, raw / METRIC_SCALE))
+    return millis, lat, lon, metrics[0], metrics[1]
+
+
+# ==================== ARCHIVING ====================
+def _delete_ids(ids):
+    for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+        GPSLocation.objects.filter(pk__in=ids[start:start + DELETE_CHUNK_SIZE]).delete()
+
+
+def archive_trip(trip):
+    """Move a finished trip's points into its ``TripArchive``; returns the number of points moved"""
+    with transaction.atomic():
+        trip = TripTrack.objects.select_for_update().get(pk=trip.pk)
+        if trip.is_active or TripArchive.objects.filter(trip=trip).exists():
+            return 0
+        rows = list(
+            GPSLocation.objects.filter(trip=trip).order_by('timestamp', 'pk')
+            .values_list('pk', 'timestamp', 'latitude', 'longitude', 'altitude', 'accuracy')
+        )
+        points = [row[1:] for row in rows]
+        TripArchive.objects.create(
+            trip=trip,
+            point_count=len(points),
+            start_time=points[0][0] if points else None,
+            end_time=points[-1][0] if points else None,
+            data=encode_points(points),
+        )
+        _delete_ids([row[0] for row in rows])
+    return len(rows)
+
+
+def archive_finished_trips(limit):
+    cutoff = timezone.now() - timedelta(days=settings.GPS_ARCHIVE_AFTER_DAYS)
+    trips = TripTrack.objects.filter(is_active=False, end_time__lt=cutoff, archive__isnull=True).order_by('end_time')
+    archived = points = 0
+    for trip in trips[:limit]:
+        points += archive_trip(trip)
+        archived += 1
+    return archived, points
+
+
+# ==================== DOWNSAMPLING ====================
+def downsample(age_days, interval, max_rows):
+    """
+    Thin points older than ``age_days`` to one per ``interval`` seconds per
+    (user, trip), reading at most ``max_rows`` rows. Returns ``(read, deleted)``.
+    """
+    cutoff = timezone.now() - timedelta(days=age_days)
+    pending = GPSLocation.objects.filter(resolution__lt=interval, timestamp__lt=cutoff).order_by('timestamp', 'pk')
+    read = deleted = 0
+    bucket, seen = None, set()
+    while read < max_rows:
+        # Every row read is deleted or promoted out of ``pending``, so the next page starts after it
+        size = min(PAGE_SIZE, max_rows - read)
+        rows = list(pending.values_list('pk', 'user_id', 'trip_id', 'timestamp')[:size])
+        if not rows:
+            break
+        drop, keep = [], []
+        for pk, user_id, trip_id, moment in rows:
+            current = int(moment.timestamp()) // interval
+            if current != bucket:
+                bucket, seen = current, set()
+            if (user_id, trip_id) in seen:
+                drop.append(pk)
+            else:
+                seen.add((user_id, trip_id))
+                keep.append(pk)
+        with transaction.atomic():
+            _delete_ids(drop)
+            for start in range(0, len(keep), DELETE_CHUNK_SIZE):
+                GPSLocation.objects.filter(pk__in=keep[start:start + DELETE_CHUNK_SIZE]).update(resolution=interval)
+        read += len(rows)
+        deleted += len(drop)
+    return read, deleted
+
+
+def purge_expired(limit):
+    """Delete trip-less points older than ``GPS_RETENTION_DAYS`` (0 keeps them forever)"""
+    if not settings.GPS_RETENTION_DAYS:
+        return 0
+    cutoff = timezone.now() - timedelta(days=settings.GPS_RETENTION_DAYS)
+    ids = list(GPSLocation.objects.filter(trip__isnull=True, timestamp__lt=cutoff)
+               .order_by('timestamp').values_list('pk', flat=True)[:limit])
+    _delete_ids(ids)
+    return len(ids)
+
+
+def compact(trip_limit=50, row_limit=100000):
+    """One bounded retention pass; returns what it did"""
+    archived, archived_points = archive_finished_trips(trip_limit)
+    stats = {'archived_trips': archived, 'archived_points': archived_points, 'downsampled': {}}
+    for age_days, interval in sorted(settings.GPS_DOWNSAMPLE_TIERS, key=lambda tier: tier[1]):
+        read, deleted = downsample(age_days, interval, row_limit)
+        stats['downsampled'][interval] = {'read': read, 'deleted': deleted}
+    stats['purged'] = purge_expired(row_limit)
+    return stats
+
+
+# ==================== READING ====================
+def archived_track(trip_id):
+    """``(seconds, lat, lon)`` arrays from a trip's archive, or ``None`` if it is not archived"""
+    archive = TripArchive.objects.filter(trip_id=trip_id).only('data').first()
+    if archive is None:
+        return None
+    millis, lat, lon, _, _ = decode_points(archive.data)
+    return millis / 1000.0, lat, lon
@@ -0,0 +1,85 @@
+"""
+Materialized home page feed (featured tours and catalog counts) in the cache.
+
+The snapshot lives under ``FEED_KEY`` with no expiry; ``FRESH_KEY`` is a
+marker that expires after ``HOME_FEED_REFRESH_SECONDS``. A missing marker
+(expired, or removed by ``invalidate()`` on a catalog write) makes the next
+request serve the old snapshot and rebuild it in a background thread, so
+the page never waits on the database or Mongo once the feed exists.
+"""
+import logging
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection as db_connection
+from pymongo.errors import PyMongoError
+
+from .db import tours_collection
+
+logger = logging.getLogger(__name__)
+
+FEED_KEY = 'home_feed:data'
+FRESH_KEY = 'home_feed:fresh'
+LOCK_KEY = 'home_feed:refreshing'
+LOCK_TIMEOUT = 60
+FEATURED_TOURS = 10
+
+
+def _count(model_name):
+    try:
+        return apps.get_model('api', model_name).objects.count()
+    except (LookupError, DatabaseError):
+        return 0
+
+
+def build_feed():
+    """Query Mongo and the ORM for a fresh snapshot"""
+    try:
+        tours = list(tours_collection.find({}, {"_id": 0}).limit(FEATURED_TOURS))
+    except PyMongoError as e:
+        logger.warning("Home feed built without tours: %s", e)
+        tours = []
+    return {
+        "tours": tours,
+        "stats": {
+            "destinations": _count('Destination'),
+            "hotels": _count('Hotel'),
+            "cabs": _count('Cab'),
+        }
+    }
+
+
+def refresh():
+    """Rebuild the snapshot and mark it fresh"""
+    feed = build_feed()
+    cache.set(FEED_KEY, feed, timeout=None)
+    cache.set(FRESH_KEY, True, timeout=settings.HOME_FEED_REFRESH_SECONDS)
+    return feed
+
+
+def _refresh_in_background():
+    try:
+        refresh()
+    except Exception:
+        logger.exception("Home feed refresh failed")
+    finally:
+        cache.delete(LOCK_KEY)
+        db_connection.close()
+
+
+def get_feed():
+    """Return the cached feed, scheduling a rebuild when it is stale"""
+    cached = cache.get_many([FEED_KEY, FRESH_KEY])
+    feed = cached.get(FEED_KEY)
+    if feed is None:
+        return refresh()
+    if FRESH_KEY not in cached and cache.add(LOCK_KEY, True, timeout=LOCK_TIMEOUT):
+        threading.Thread(target=_refresh_in_background, name='home-feed-refresh', daemon=True).start()
+    return feed
+
+
+def invalidate():
+    """Mark the feed stale; the next request triggers a background rebuild"""
+    cache.delete(FRESH_KEY)
@@ -0,0 +1,64 @@
+"""
+``Idempotency-Key`` support for POST endpoints.
+
+``claim()`` inserts the key in the caller's transaction before any work is
+done, so a retry that arrives while the first request is still running
+waits on the unique index and then replays the committed response. If the
+first request fails, its transaction rolls the key back and the retry runs
+afresh. Keys are per user, tied to the method, path and body they were
+first used with, and pruned after ``IDEMPOTENCY_KEY_TTL_SECONDS``
+(``manage.py prune_idempotency_keys``).
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+class KeyReused(Exception):
+    """The key was already used for a different request"""
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def claim(request, key):
+    """
+    Record ``key`` for this request (call inside its transaction). Returns
+    ``(record, None)`` for a new key or ``(record, response)`` to replay.
+    """
+    fingerprint = _fingerprint(request)
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(user=request.user, key=key, fingerprint=fingerprint), None
+    except IntegrityError:
+        record = IdempotencyKey.objects.get(user=request.user, key=key)
+    if record.fingerprint != fingerprint:
+        raise KeyReused(f'{HEADER} was already used for a different request')
+    return record, Response(record.response_body, status=record.response_status,
+                            headers={'Idempotent-Replayed': 'true'})
+
+
+def remember(record, response):
+    """Store the response to replay for ``record``'s key"""
+    record.response_status, record.response_body = response.status_code, response.data
+    record.save(update_fields=['response_status', 'response_body'])
+
+
+def prune():
+    """Delete keys older than ``IDEMPOTENCY_KEY_TTL_SECONDS``; returns how many"""
+    cutoff = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,273 @@
+"""
+Per-night hotel room inventory with a hold/confirm protocol.
+
+``RoomInventory`` has one row per hotel, room type and night. Taking rooms
+for a stay is a single conditional ``UPDATE`` over its nights
+(``held + booked + rooms <= total``) that must change every night or the
+transaction is rolled back, so a stay is never half reserved and a night is
+never oversold (the table also has a check constraint to that effect).
+Before updating, the nights are locked with ``SELECT ... FOR UPDATE`` in
+date order: overlapping stays queue on their first shared night instead of
+deadlocking, and only rows of that hotel and room type are ever locked.
+
+``hold()`` takes rooms for ``INVENTORY_HOLD_SECONDS``; ``confirm()`` turns a
+live hold into a booking's rooms and ``release()`` gives it back;
+``reserve()`` books without a prior hold and ``rebook()`` moves a booking's
+rooms when its stay is edited. Holds past their expiry are released by
+``expire_holds()`` (``manage.py expire_room_holds --loop``), and on the
+spot when a new hold finds the nights full.
+
+Nights without a row are created on first use from the hotel's capacity:
+``room_types`` entries like ``{"name": "deluxe", "rooms": 10}``, or
+``total_rooms`` as ``DEFAULT_ROOM_TYPE``. Every change bumps the version
+of the availability search index (``availability.py``).
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from . import availability
+from .models import RoomHold, RoomInventory
+
+DEFAULT_ROOM_TYPE = 'standard'
+EXPIRE_BATCH_SIZE = 500
+STAY_FIELDS = ('booking_type', 'hotel_id', 'check_in_date', 'check_out_date', 'number_of_rooms')
+
+
+class InventoryError(Exception):
+    """The reservation request itself is invalid"""
+
+
+class Unavailable(InventoryError):
+    """Not enough rooms on at least one night of the stay"""
+
+
+class HoldNotActive(InventoryError):
+    """The hold was already confirmed, released or has expired"""
+
+
+def capacity(hotel):
+    """Rooms per room type"""
+    return room_capacity(hotel.room_types, hotel.total_rooms)
+
+
+def room_capacity(room_types, total_rooms):
+    rooms = {}
+    for entry in room_types or []:
+        if isinstance(entry, dict) and entry.get('name') and isinstance(entry.get('rooms'), int):
+            rooms[str(entry['name'])[:50]] = max(entry['rooms'], 0)
+    return rooms or {DEFAULT_ROOM_TYPE: max(total_rooms or 0, 0)}
+
+
+def stay_nights(check_in, check_out):
+    count = (check_out - check_in).days
+    if count < 1:
+        raise InventoryError('check_out must be after check_in')
+    if count > settings.INVENTORY_MAX_NIGHTS:
+        raise InventoryError(f'At most {settings.INVENTORY_MAX_NIGHTS} nights per stay')
+    return [check_in + timedelta(days=offset) for offset in range(count)]
+
+
+def _nights(hotel_id, room_type, check_in, check_out):
+    return RoomInventory.objects.filter(
+        hotel_id=hotel_id, room_type=room_type, night__gte=check_in, night__lt=check_out
+    )
+
+
+def _lock(rows):
+    return list(rows.select_for_update().order_by('night').values_list('night', flat=True))
+
+
+def _lock_stay(hotel, room_type, check_in, check_out):
+    """Lock the stay's rows in night order, creating missing nights; returns ``(rows, nights)``"""
+    nights = stay_nights(check_in, check_out)
+    rows = _nights(hotel.pk, room_type, check_in, check_out)
+    locked = _lock(rows)
+    if len(locked) < len(nights):
+        total = capacity(hotel).get(room_type)
+        if total is None:
+            raise InventoryError(f'Unknown room type {room_type!r}')
+        existing = set(locked)
+        RoomInventory.objects.bulk_create(
+            [RoomInventory(hotel=hotel, room_type=room_type, night=night, total=total)
+             for night in nights if night not in existing],
+            ignore_conflicts=True,
+        )
+        _lock(rows)
+    return rows, len(nights)
+
+
+def _take(hotel, room_type, check_in, check_out, rooms, column):
+    """Add ``rooms`` to ``column`` on every night of the stay; raises ``Unavailable`` (call inside atomic)"""
+    if rooms < 1:
+        raise InventoryError('rooms must be at least 1')
+    rows, nights = _lock_stay(hotel, room_type, check_in, check_out)
+    updated = rows.filter(total__gte=F('held') + F('booked') + rooms).update(
+        **{column: F(column) + rooms}, updated_at=timezone.now()
+    )
+    if updated != nights:
+        raise Unavailable(f'Not enough {room_type} rooms for {check_in} to {check_out}')
+    transaction.on_commit(availability.local_index.bump_version)
+
+
+def _give_back(hold, **deltas):
+    rows = _nights(hold.hotel_id, hold.room_type, hold.check_in, hold.check_out)
+    _lock(rows)
+    rows.update(**{column: F(column) + delta for column, delta in deltas.items()}, updated_at=timezone.now())
+    transaction.on_commit(availability.local_index.bump_version)
+
+
+# ==================== HOLD / CONFIRM ====================
+def hold(hotel, room_type, check_in, check_out, rooms=1, user=None):
+    """Take rooms for ``INVENTORY_HOLD_SECONDS``; returns the ``RoomHold``"""
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                _take(hotel, room_type, check_in, check_out, rooms, 'held')
+                return RoomHold.objects.create(
+                    hotel=hotel, user=user, room_type=room_type, check_in=check_in, check_out=check_out,
+                    rooms=rooms, expires_at=timezone.now() + timedelta(seconds=settings.INVENTORY_HOLD_SECONDS),
+                )
+        except Unavailable:
+            # Rooms may still be held by abandoned checkouts the expiry job has not reached yet
+            if attempt or not expire_holds(hotel_id=hotel.pk, room_type=room_type,
+                                           check_in__lt=check_out, check_out__gt=check_in):
+                raise
+
+
+def confirm(hold_id, booking, room_type=None):
+    """Move a live hold's rooms to ``booking`` (call inside the booking's transaction)"""
+    current = RoomHold.objects.select_for_update().filter(pk=hold_id).first()
+    if current is None or current.status != RoomHold.HELD or current.expires_at <= timezone.now():
+        raise HoldNotActive('Room hold is no longer active')
+    if (current.hotel_id != booking.hotel_id or current.user_id not in (None, booking.user_id)
+            or (booking.check_in_date, booking.check_out_date) != (current.check_in, current.check_out)
+            or booking.number_of_rooms != current.rooms
+            or (room_type and room_type != current.room_type)):
+        raise InventoryError('Room hold does not match the booking')
+    _give_back(current, held=-current.rooms, booked=current.rooms)
+    current.status, current.booking = RoomHold.CONFIRMED, booking
+    current.save(update_fields=['status', 'booking'])
+    return current
+
+
+def reserve(booking, room_type, rooms):
+    """Book rooms for ``booking``'s stay without a prior hold (call inside the booking's transaction)"""
+    with transaction.atomic():
+        _take(booking.hotel, room_type, booking.check_in_date, booking.check_out_date, rooms, 'booked')
+        return RoomHold.objects.create(
+            hotel=booking.hotel, user=booking.user, booking=booking, room_type=room_type,
+            check_in=booking.check_in_date, check_out=booking.check_out_date, rooms=rooms,
+            status=RoomHold.CONFIRMED, expires_at=timezone.now(),
+        )
+
+
+def take_for_booking(booking, hold_id=None, room_type=None):
+    """Take a hotel booking's rooms out of inventory, from ``hold_id`` if given (call inside its transaction)"""
+    if booking.booking_type != 'hotel' or booking.hotel_id is None:
+        return None
+    if not (booking.check_in_date and booking.check_out_date):
+        raise InventoryError('Hotel bookings need check_in_date and check_out_date')
+    if hold_id:
+        try:
+            hold_id = uuid.UUID(str(hold_id))
+        except ValueError:
+            raise InventoryError('Invalid hold_id')
+        return confirm(hold_id, booking, room_type)
+    return reserve(booking, room_type or DEFAULT_ROOM_TYPE, booking.number_of_rooms)
+
+
+def release(hold_id, user=None):
+    """Give back a live hold; returns False if it was not held (by ``user``)"""
+    with transaction.atomic():
+        holds = RoomHold.objects.select_for_update().filter(pk=hold_id, status=RoomHold.HELD)
+        if user is not None:
+            holds = holds.filter(user=user)
+        current = holds.first()
+        if current is None:
+            return False
+        _give_back(current, held=-current.rooms)
+        current.status = RoomHold.RELEASED
+        current.save(update_fields=['status'])
+    return True
+
+
+def cancel(booking):
+    """Return a booking's rooms to inventory (call inside the booking's transaction)"""
+    current = RoomHold.objects.select_for_update().filter(booking=booking, status=RoomHold.CONFIRMED).first()
+    if current is None:
+        return False
+    _give_back(current, booked=-current.rooms)
+    current.status = RoomHold.RELEASED
+    current.save(update_fields=['status'])
+    return True
+
+
+def stay(booking):
+    """What a booking's reserved rooms depend on; a change needs ``rebook()``"""
+    return tuple(getattr(booking, field) for field in STAY_FIELDS)
+
+
+def rebook(booking, room_type=None):
+    """
+    Move a booking's rooms to its current stay after an edit or an undone
+    cancellation: the old nights are given back and the new ones taken in
+    the booking's transaction (call inside it); raises ``Unavailable`` if
+    the new stay is full. Keeps the room type unless ``room_type`` is given.
+    """
+    current = RoomHold.objects.select_for_update().filter(booking=booking).first()
+    if current is None:
+        return take_for_booking(booking, room_type=room_type)
+    if current.status == RoomHold.CONFIRMED:
+        _give_back(current, booked=-current.rooms)
+    current.status = RoomHold.RELEASED
+    if booking.booking_type == 'hotel' and booking.hotel_id is not None:
+        if not (booking.check_in_date and booking.check_out_date):
+            raise InventoryError('Hotel bookings need check_in_date and check_out_date')
+        current.hotel_id, current.room_type = booking.hotel_id, room_type or current.room_type
+        current.check_in, current.check_out = booking.check_in_date, booking.check_out_date
+        current.rooms, current.status = booking.number_of_rooms, RoomHold.CONFIRMED
+        _take(booking.hotel, current.room_type, current.check_in, current.check_out, current.rooms, 'booked')
+    current.save()
+    return current
+
+
+def expire_holds(limit=EXPIRE_BATCH_SIZE, **filters):
+    """Release up to ``limit`` holds past their expiry, one transaction each; returns how many"""
+    ids = list(
+        RoomHold.objects.filter(status=RoomHold.HELD, expires_at__lte=timezone.now(), **filters)
+        .order_by('expires_at').values_list('pk', flat=True)[:limit]
+    )
+    expired = 0
+    for pk in ids:
+        with transaction.atomic():
+            current = (RoomHold.objects.select_for_update(skip_locked=True)
+                       .filter(pk=pk, status=RoomHold.HELD).first())
+            if current is None:
+                continue
+            _give_back(current, held=-current.rooms)
+            current.status = RoomHold.EXPIRED
+            current.save(update_fields=['status'])
+            expired += 1
+    return expired
+
+
+# ==================== AVAILABILITY ====================
+def available(hotel, check_in, check_out):
+    """Rooms free on every night of the stay, per room type"""
+    nights = len(stay_nights(check_in, check_out))
+    free = capacity(hotel)
+    stored = (RoomInventory.objects.filter(hotel=hotel, night__gte=check_in, night__lt=check_out)
+              .values('room_type')
+              .annotate(free=Min(F('total') - F('held') - F('booked')), nights=Count('pk')))
+    for row in stored:
+        tightest = max(row['free'], 0)
+        if row['nights'] < nights:
+            # Nights without a row yet have the full capacity (none for a retired room type)
+            tightest = min(tightest, free.get(row['room_type'], 0))
+        free[row['room_type']] = tightest
+    return free
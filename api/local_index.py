@@ -0,0 +1,104 @@
+"""
+Per-worker in-memory indexes over catalog rows.
+
+A ``LocalIndex`` builds its index lazily on first use and then keeps it in
+step with the database without blocking requests:
+
+* writes made by this worker are applied directly by the caller (from an
+  ``on_commit`` hook) followed by ``bump_version()``;
+* other workers see the shared version in the cache move within
+  ``LOCAL_INDEX_SYNC_SECONDS`` and pull only the rows whose ``updated_at``
+  is newer than their last sync;
+* every ``LOCAL_INDEX_REBUILD_SECONDS`` the index is rebuilt in a background
+  thread, which drops rows deleted by other workers, and swapped in.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection as db_connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class LocalIndex:
+    """
+    ``build()`` returns a fresh index; ``update(index, since)`` applies the
+    rows changed since the ``since`` datetime to an existing one.
+    """
+
+    def __init__(self, name, build, update):
+        self.name = name
+        self.version_key = f'{name}:version'
+        self._build = build
+        self._update = update
+        self._index = None
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._synced_at = None
+        self._built_at = 0.0
+        self._rebuilding = False
+
+    def current(self):
+        """The index if this worker has built one, without building it"""
+        return self._index
+
+    def get(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    started = timezone.now()
+                    self._version = cache.get(self.version_key)
+                    self._index = self._build()
+                    self._synced_at = started
+                    self._built_at = self._checked_at = time.monotonic()
+            return self._index
+        self._sync()
+        return self._index
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._checked_at < settings.LOCAL_INDEX_SYNC_SECONDS:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = now
+            if now - self._built_at > settings.LOCAL_INDEX_REBUILD_SECONDS and not self._rebuilding:
+                self._rebuilding = True
+                threading.Thread(target=self._rebuild_in_background, name=f'{self.name}-rebuild',
+                                 daemon=True).start()
+            version = cache.get(self.version_key)
+            if version != self._version:
+                started = timezone.now()
+                self._update(self._index, self._synced_at)
+                self._version, self._synced_at = version, started
+        finally:
+            self._lock.release()
+
+    def _rebuild_in_background(self):
+        try:
+            started = timezone.now()
+            index = self._build()
+            with self._lock:
+                self._index = index
+                # Re-pull anything saved while the rebuild was reading
+                self._synced_at, self._version = started, None
+                self._built_at, self._checked_at = time.monotonic(), 0.0
+        except Exception:
+            logger.exception("Rebuilding the %s index failed", self.name)
+        finally:
+            self._rebuilding = False
+            db_connection.close()
+
+    def bump_version(self):
+        """Tell the other workers that rows changed"""
+        if not cache.add(self.version_key, 1, timeout=None):
+            try:
+                cache.incr(self.version_key)
+            except ValueError:
+                cache.set(self.version_key, 1, timeout=None)
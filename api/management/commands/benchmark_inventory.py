@@ -0,0 +1,97 @@
+import random
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from api import inventory
+from api.models import Hotel, RoomHold, RoomInventory
+
+
+class Command(BaseCommand):
+    help = ('Hammer one temporary hotel with concurrent holds and check nothing is oversold '
+            '(use a PostgreSQL database; SQLite serialises all writers)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32, help='Concurrent clients')
+        parser.add_argument('--attempts', type=int, default=50, help='Holds attempted per client')
+        parser.add_argument('--rooms', type=int, default=100, help='Rooms in the hotel')
+        parser.add_argument('--span', type=int, default=14, help='Days over which stays start')
+        parser.add_argument('--max-nights', type=int, default=4, help='Longest stay')
+        parser.add_argument('--release', type=float, default=0.3, help='Share of holds released again')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark hotel afterwards')
+
+    def handle(self, *args, **options):
+        hotel = Hotel.objects.create(
+            name=f'Inventory benchmark {timezone.now():%Y%m%d%H%M%S}', description='', address='',
+            city='', state='', country='', price_per_night=0, total_rooms=options['rooms'],
+        )
+        start_day = timezone.now().date() + timedelta(days=1)
+        latencies, outcomes, lock = [], {'held': 0, 'full': 0, 'released': 0, 'errors': 0}, threading.Lock()
+
+        def client(seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(options['attempts']):
+                    check_in = start_day + timedelta(days=rng.randrange(options['span']))
+                    check_out = check_in + timedelta(days=rng.randint(1, options['max_nights']))
+                    began = time.perf_counter()
+                    try:
+                        held = inventory.hold(hotel, inventory.DEFAULT_ROOM_TYPE, check_in, check_out,
+                                              rng.randint(1, 3))
+                        outcome = 'held'
+                    except inventory.Unavailable:
+                        held, outcome = None, 'full'
+                    except DatabaseError:
+                        held, outcome = None, 'errors'
+                    elapsed = time.perf_counter() - began
+                    released = failed = False
+                    if held is not None and rng.random() < options['release']:
+                        try:
+                            released = inventory.release(held.pk)
+                        except DatabaseError:
+                            failed = True
+                    with lock:
+                        latencies.append(elapsed)
+                        outcomes[outcome] += 1
+                        outcomes['released'] += released
+                        outcomes['errors'] += failed
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client, args=(seed,)) for seed in range(options['threads'])]
+        began = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        nights = RoomInventory.objects.filter(hotel=hotel)
+        oversold = nights.filter(total__lt=F('held') + F('booked')).count()
+        held_rooms = nights.aggregate(total=Sum('held'))['total'] or 0
+        expected = sum(
+            hold.rooms * (hold.check_out - hold.check_in).days
+            for hold in RoomHold.objects.filter(hotel=hotel, status=RoomHold.HELD)
+        )
+        latencies.sort()
+        self.stdout.write(
+            f"{len(latencies)} hold attempts in {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s): "
+            f"{outcomes['held']} held, {outcomes['full']} full, {outcomes['released']} released, "
+            f"{outcomes['errors']} database errors; latency p50 {statistics.median(latencies) * 1000:.1f} ms, "
+            f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms"
+        )
+        if oversold or held_rooms != expected:
+            self.stderr.write(self.style.ERROR(
+                f'Inventory inconsistent: {oversold} oversold nights, {held_rooms} room-nights held '
+                f'vs {expected} in live holds'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'No night oversold; {held_rooms} room-nights held match live holds'))
+        if not options['keep']:
+            hotel.delete()
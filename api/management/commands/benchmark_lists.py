@@ -0,0 +1,101 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIRequestFactory
+
+from api.models import Destination, Hotel
+from api.views import DestinationViewSet, HotelViewSet
+
+VIEWSETS = {'destinations': DestinationViewSet, 'hotels': HotelViewSet}
+# Query strings whose responses must match byte for byte besides the timed default listing
+CHECKS = ['?fields=name', '?fields=images', '?fields=id,images,name', '?fields=bogus', '?omit=id']
+
+
+def _seed(count):
+    stamp = timezone.now().strftime('%Y%m%d%H%M%S')
+    destinations = Destination.objects.bulk_create([
+        Destination(
+            name=f'Benchmark {stamp} {i}', slug=f'benchmark-{stamp}-{i}', description='Backwaters and beaches. ' * 40,
+            short_description='Backwaters, beaches and spice gardens', city='Kochi', state='Kerala', country='India',
+            latitude=9.93 + i / 1000, longitude=76.26 + i / 1000, best_time_to_visit='October to March',
+            images=[f'https://images.example.com/{stamp}/{i}/{n}.jpg' for n in range(8)],
+            attractions=[{'name': f'Attraction {n}', 'type': 'heritage', 'entry_fee': 50 * n} for n in range(10)],
+            activities=['Kayaking', 'Houseboat cruise', 'Kathakali show'],
+            average_cost=2500.5 + i, rating=round(3 + (i % 20) / 10, 1), review_count=i * 7,
+            weather_info={'summer': '32°C', 'monsoon': 'Heavy rain', 'winter': '24°C'},
+            safety_tips=['Carry water', 'Mind the tides'], emergency_contacts={'police': '100', 'ambulance': '108'},
+        )
+        for i in range(count)
+    ])
+    Hotel.objects.bulk_create([
+        Hotel(
+            name=f'Benchmark hotel {stamp} {i}', slug=f'benchmark-hotel-{stamp}-{i}', description='Lagoon views. ' * 40,
+            images=[f'https://images.example.com/{stamp}/h{i}/{n}.jpg' for n in range(8)],
+            destination=destinations[i % len(destinations)], address=f'{i} Marine Drive', city='Kochi',
+            state='Kerala', country='India', latitude=9.97, longitude=76.28, price_per_night=4200 + i,
+            rating=4.2, review_count=i, amenities=['wifi', 'pool', 'spa', 'breakfast'],
+            room_types=[{'name': 'deluxe', 'rooms': 20, 'guests': 2}, {'name': 'suite', 'rooms': 5, 'guests': 4}],
+            available_rooms=25, total_rooms=25, phone='+91 484 000 0000', email='stay@example.com',
+            policies={'cancellation': 'Free up to 48 hours before check-in', 'pets': False},
+        )
+        for i in range(count)
+    ])
+
+
+class Command(BaseCommand):
+    help = ('Compare list endpoint throughput with and without the fast path (FAST_LISTS) '
+            'and check that both render the same bytes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and mode')
+        parser.add_argument('--rounds', type=int, default=3,
+                            help='Alternating rounds per mode; the fastest one counts')
+        parser.add_argument('--page-size', type=int, default=20, help='Objects per page')
+        parser.add_argument('--seed', type=int, default=100,
+                            help='Temporary destinations and hotels to add first (rolled back afterwards)')
+        parser.add_argument('--endpoint', action='append', choices=sorted(VIEWSETS),
+                            help='Endpoint to run (repeatable; default all)')
+
+    def handle(self, *args, **options):
+        pagination = type('BenchmarkPagination', (PageNumberPagination,), {'page_size': options['page_size']})
+        factory = APIRequestFactory()
+        with transaction.atomic():
+            if options['seed']:
+                _seed(options['seed'])
+            for name in options['endpoint'] or sorted(VIEWSETS):
+                view = VIEWSETS[name].as_view({'get': 'list'}, throttle_classes=[], pagination_class=pagination)
+                for query in CHECKS:
+                    rendered = []
+                    for fast in (False, True):
+                        with override_settings(FAST_LISTS=fast):
+                            response = view(factory.get(f'/api/{name}/{query}'))
+                            if hasattr(response, 'render'):
+                                response.render()
+                            rendered.append((response.status_code, response.content))
+                    if rendered[0] != rendered[1]:
+                        raise CommandError(f'/api/{name}/{query}: the fast path rendered different bytes')
+                timings, contents = {}, {}
+                for _ in range(max(options['rounds'], 1)):
+                    for fast in (False, True):
+                        with override_settings(FAST_LISTS=fast):
+                            began = time.perf_counter()
+                            for _ in range(options['requests']):
+                                response = view(factory.get(f'/api/{name}/'))
+                                if hasattr(response, 'render'):
+                                    response.render()
+                            elapsed = time.perf_counter() - began
+                        timings[fast] = min(timings.get(fast, elapsed), elapsed)
+                        contents[fast] = response.content
+                if contents[True] != contents[False]:
+                    raise CommandError(f'/api/{name}/: the fast path rendered different bytes')
+                per_second = {fast: options['requests'] / elapsed for fast, elapsed in timings.items()}
+                self.stdout.write(
+                    f'/api/{name}/ ({len(contents[True])} bytes per page): '
+                    f'{per_second[False]:.0f} req/s serializer, {per_second[True]:.0f} req/s fast path, '
+                    f'{per_second[True] / per_second[False]:.1f}x; identical output'
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import gps_retention
+
+
+class Command(BaseCommand):
+    help = 'Archive finished trips and downsample old GPS points (repeatedly with --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep compacting on a schedule')
+        parser.add_argument('--interval', type=float, default=settings.GPS_COMPACTION_INTERVAL,
+                            help='Seconds to sleep between passes that found nothing to do')
+        parser.add_argument('--trips', type=int, default=50, help='Trips archived per pass')
+        parser.add_argument('--rows', type=int, default=100000, help='Points read per tier per pass')
+
+    def handle(self, *args, **options):
+        while True:
+            stats = gps_retention.compact(options['trips'], options['rows'])
+            tiers = ', '.join(
+                f"{interval}s: {tier['deleted']}/{tier['read']} dropped"
+                for interval, tier in stats['downsampled'].items()
+            )
+            self.stdout.write(
+                f"Archived {stats['archived_trips']} trips ({stats['archived_points']} points); "
+                f"downsampled {tiers or 'nothing'}; purged {stats['purged']}"
+            )
+            if not options['loop']:
+                break
+            busy = (stats['archived_trips'] >= options['trips']
+                    or any(tier['read'] >= options['rows'] for tier in stats['downsampled'].values())
+                    or stats['purged'] >= options['rows'])
+            if not busy:
+                time.sleep(options['interval'])
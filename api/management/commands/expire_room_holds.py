@@ -0,0 +1,25 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import inventory
+
+
+class Command(BaseCommand):
+    help = 'Return rooms from expired checkout holds to inventory (repeatedly with --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep expiring on a schedule')
+        parser.add_argument('--interval', type=float, default=settings.INVENTORY_EXPIRY_INTERVAL,
+                            help='Seconds to sleep between passes that found nothing to do')
+        parser.add_argument('--limit', type=int, default=inventory.EXPIRE_BATCH_SIZE, help='Holds expired per pass')
+
+    def handle(self, *args, **options):
+        while True:
+            expired = inventory.expire_holds(options['limit'])
+            self.stdout.write(f'Expired {expired} room holds')
+            if not options['loop']:
+                break
+            if expired < options['limit']:
+                time.sleep(options['interval'])
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import outbox
+
+
+class Command(BaseCommand):
+    help = 'Drain the MongoDB mirror outbox (runs continuously unless --once is given)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Flush what is pending and exit')
+        parser.add_argument('--batch-size', type=int, default=settings.MONGO_OUTBOX_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=settings.MONGO_OUTBOX_POLL_INTERVAL,
+                            help='Seconds to sleep when the outbox is empty')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        while True:
+            applied = outbox.flush(batch_size)
+            if applied:
+                stats = outbox.stats()
+                self.stdout.write(
+                    f"Flushed {applied} writes, {stats['pending']} pending, "
+                    f"{stats['failed']} failed, lag {stats['lag_seconds']:.1f}s"
+                )
+            if options['once']:
+                if applied < batch_size:
+                    break
+                continue
+            if applied < batch_size:
+                time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import artefacts
+
+
+class Command(BaseCommand):
+    help = 'Render pending booking invoices, itineraries and QR tickets (repeatedly with --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep generating as bookings are confirmed')
+        parser.add_argument('--interval', type=float, default=settings.ARTEFACT_INTERVAL,
+                            help='Seconds to sleep between passes that found nothing to do')
+        parser.add_argument('--workers', type=int, default=settings.ARTEFACT_WORKERS, help='Render processes')
+        parser.add_argument('--limit', type=int, default=settings.ARTEFACT_BATCH_SIZE, help='Artefacts per pass')
+
+    def handle(self, *args, **options):
+        with artefacts.pool(options['workers']) as executor:
+            while True:
+                generated, unchanged, failed = artefacts.generate(executor, options['limit'])
+                self.stdout.write(f'Generated {generated}, unchanged {unchanged}, failed {failed}')
+                if not options['loop']:
+                    break
+                if generated + unchanged + failed < options['limit']:
+                    time.sleep(options['interval'])
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from api.db import connection, create_indexes, missing_indexes
+
+
+class Command(BaseCommand):
+    help = 'Create the MongoDB indexes (idempotent); --check only reports missing ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Exit non-zero if any index is missing instead of building it')
+
+    def handle(self, *args, **options):
+        ok, _, error = connection.ping()
+        if not ok:
+            raise CommandError(f'MongoDB unreachable: {error}')
+
+        try:
+            if options['check']:
+                missing = missing_indexes()
+                for collection, name in missing:
+                    self.stdout.write(f'missing: {collection}.{name}')
+                if missing:
+                    raise CommandError(f'{len(missing)} MongoDB indexes missing')
+                self.stdout.write(self.style.SUCCESS('All MongoDB indexes present'))
+                return
+
+            created = create_indexes()
+        except PyMongoError as e:
+            raise CommandError(f'Index bootstrap failed: {e}')
+
+        for collection, name in created:
+            self.stdout.write(f'created: {collection}.{name}')
+        self.stdout.write(self.style.SUCCESS(f'MongoDB indexes up to date ({len(created)} created)'))
@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import weather
+
+
+class Command(BaseCommand):
+    help = 'Refresh weather for every active destination before it goes stale (repeatedly with --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep prefetching on a schedule')
+        parser.add_argument('--interval', type=float, default=settings.WEATHER_PREFETCH_INTERVAL,
+                            help='Seconds between passes with --loop')
+        parser.add_argument('--ahead', type=int, default=settings.WEATHER_PREFETCH_AHEAD_SECONDS,
+                            help='Refresh entries that go stale within this many seconds')
+        parser.add_argument('--concurrency', type=int, default=settings.WEATHER_PREFETCH_CONCURRENCY,
+                            help='Concurrent provider requests')
+
+    def handle(self, *args, **options):
+        while True:
+            stats = weather.prefetch(options['ahead'], options['concurrency'])
+            self.stdout.write(
+                f"Weather prefetch: {stats['refreshed']} of {stats['due']} due refreshed, {stats['failed']} failed"
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import idempotency
+
+
+class Command(BaseCommand):
+    help = 'Delete Idempotency-Key records older than IDEMPOTENCY_KEY_TTL_SECONDS'
+
+    def handle(self, *args, **options):
+        deleted = idempotency.prune()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} idempotency keys'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import weather
+
+
+class Command(BaseCommand):
+    help = 'Delete all but the newest WeatherCache row per city'
+
+    def handle(self, *args, **options):
+        deleted = weather.prune()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} weather rows'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import geo
+from api.models import GeoPoint
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the spatial index for destinations, hotels, gallery photos and saved places'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        for kind, (model, _) in geo.SOURCES.items():
+            total = 0
+            with transaction.atomic():
+                GeoPoint.objects.filter(kind=kind).delete()
+                queryset = model.objects.order_by().filter(latitude__isnull=False, longitude__isnull=False)
+                batch = []
+                for instance in queryset.iterator(chunk_size=chunk_size):
+                    batch.append(geo.point_for(instance))
+                    if len(batch) >= chunk_size:
+                        GeoPoint.objects.bulk_create(batch)
+                        total += len(batch)
+                        batch = []
+                if batch:
+                    GeoPoint.objects.bulk_create(batch)
+                    total += len(batch)
+            self.stdout.write(f'{kind}: indexed {total}')
+        self.stdout.write(self.style.SUCCESS('Spatial index rebuilt'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from api import analytics
+from api.models import Booking, MongoOutbox
+
+
+class Command(BaseCommand):
+    help = ('Recompute the booking rollup collections from the Booking table. '
+            'Run while booking writes are paused so no increment is counted twice.')
+
+    def handle(self, *args, **options):
+        collections = [collection for collection, _ in analytics.GRANULARITIES.values()]
+        # Increments still queued are already part of the rebuilt totals
+        discarded, _ = MongoOutbox.objects.filter(
+            database=analytics.database_name(), collection__in=collections
+        ).delete()
+
+        bookings = (
+            Booking.objects.only('created_at', 'booking_type', 'destination_id', 'final_amount', 'booking_status')
+            .order_by()
+            .iterator(chunk_size=5000)
+        )
+        try:
+            written = analytics.rebuild_booking_rollups(analytics.snapshot(booking) for booking in bookings)
+        except PyMongoError as e:
+            raise CommandError(f'Rebuild failed: {e}')
+
+        for collection, count in written.items():
+            self.stdout.write(f'{collection}: {count} buckets')
+        self.stdout.write(self.style.SUCCESS(f'Rollups rebuilt ({discarded} queued increments discarded)'))
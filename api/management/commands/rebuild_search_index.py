@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import search
+from api.models import Destination, Hotel
+
+MODELS = {'destination': Destination, 'hotel': Hotel}
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for destinations and hotels'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        if backend is None:
+            raise CommandError('No search backend for this database')
+
+        chunk_size = options['chunk_size']
+        for kind, model in MODELS.items():
+            total = 0
+            with transaction.atomic():
+                backend.clear(kind)
+                batch = []
+                for instance in model.objects.order_by().iterator(chunk_size=chunk_size):
+                    batch.append((instance.pk, search.document_for(instance)))
+                    if len(batch) >= chunk_size:
+                        backend.index_many(kind, batch)
+                        total += len(batch)
+                        batch = []
+                if batch:
+                    backend.index_many(kind, batch)
+                    total += len(batch)
+            self.stdout.write(f'{kind}: indexed {total}')
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
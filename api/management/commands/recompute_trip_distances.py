@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import track_metrics
+from api.models import TripTrack
+
+
+class Command(BaseCommand):
+    help = 'Recompute TripTrack.total_distance from the stored GPS points'
+
+    def add_arguments(self, parser):
+        parser.add_argument('trips', nargs='*', type=int, help='Trip ids (default: every trip)')
+
+    def handle(self, *args, **options):
+        trip_ids = options['trips'] or list(TripTrack.objects.order_by('pk').values_list('pk', flat=True))
+        changed = 0
+        for trip_id in trip_ids:
+            with transaction.atomic():
+                trip = TripTrack.objects.select_for_update().filter(pk=trip_id).first()
+                if trip is None:
+                    self.stderr.write(f'Trip {trip_id} not found')
+                    continue
+                distance = track_metrics.recompute_distance(trip.pk)
+                if abs(distance - trip.total_distance) > 1e-6:
+                    trip.total_distance = distance
+                    trip.save(update_fields=['total_distance'])
+                    changed += 1
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {len(trip_ids)} trips, {changed} changed'))
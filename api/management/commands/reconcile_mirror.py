@@ -0,0 +1,196 @@
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import DeleteMany, DeleteOne, ReplaceOne, UpdateOne
+from pymongo.errors import PyMongoError
+
+from api import mirror
+from api.db import db
+from api.models import Booking, Destination, Hotel
+
+# name -> (model, collection, base filter, key field, key parser)
+# Only models whose ORM ordering matches Mongo's string/int ordering of the
+# key are listed; Cab ids are integers mirrored as strings, so they would
+# sort differently on the two sides.
+TARGETS = {
+    'destinations': (Destination, mirror.TOURS, {"type": "destination"}, "django_id", uuid.UUID),
+    'hotels': (Hotel, mirror.TOURS, {"type": "hotel"}, "django_id", uuid.UUID),
+    'bookings': (Booking, mirror.BOOKINGS, {}, "django_booking_id", uuid.UUID),
+    'users': (User, mirror.USERS, {}, "user_id", int),
+}
+
+SAMPLE_SIZE = 10
+
+
+def _normalize(value):
+    """Bring ORM values to what a Mongo round trip returns (naive UTC, ms precision)"""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+class Command(BaseCommand):
+    help = 'Merge-diff the ORM against the MongoDB mirror and repair drift in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*',
+                            help=f"What to reconcile: {', '.join(TARGETS)} (default: everything)")
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows/documents fetched per round trip on each side')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Repairs per bulk_write')
+        parser.add_argument('--checkpoint', help='JSON file to resume from and record progress in')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.chunk_size = options['chunk_size']
+        self.batch_size = options['batch_size']
+        self.checkpoint_path = options['checkpoint']
+        self.checkpoint = self._load_checkpoint()
+        targets = options['targets'] or list(TARGETS)
+        unknown = sorted(set(targets) - set(TARGETS))
+        if unknown:
+            raise CommandError(f"Unknown target(s): {', '.join(unknown)}")
+
+        try:
+            for name in targets:
+                if self.checkpoint.get(name) == 'done':
+                    self.stdout.write(f'{name}: already reconciled, skipping')
+                    continue
+                self._reconcile(name, *TARGETS[name])
+        except PyMongoError as e:
+            raise CommandError(f'MongoDB error: {e}')
+
+        finished = all(self.checkpoint.get(name) == 'done' for name in TARGETS)
+        if self.checkpoint_path and finished and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    # ---------- checkpointing ----------
+    def _load_checkpoint(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path) as fh:
+            return json.load(fh)
+
+    def _save_checkpoint(self, name, key):
+        if not self.checkpoint_path or self.dry_run:
+            return
+        self.checkpoint[name] = key
+        tmp = f'{self.checkpoint_path}.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(self.checkpoint, fh)
+        os.replace(tmp, self.checkpoint_path)
+
+    # ---------- streams ----------
+    def _orm_stream(self, model, after):
+        queryset = model.objects.order_by('pk')
+        if model is Booking:
+            queryset = queryset.select_related('user')
+        while True:
+            chunk = list(queryset.filter(pk__gt=after)[:self.chunk_size] if after is not None
+                         else queryset[:self.chunk_size])
+            if not chunk:
+                return
+            yield from chunk
+            after = chunk[-1].pk
+
+    def _mongo_stream(self, collection, base, key_field, after):
+        query = dict(base)
+        query[key_field] = {"$type": "int" if key_field == "user_id" else "string"}
+        if after is not None:
+            query[key_field]["$gt"] = after
+        return collection.find(query).sort(key_field, 1).batch_size(self.chunk_size)
+
+    # ---------- merge ----------
+    def _reconcile(self, name, model, collection_name, base, key_field, parse_key):
+        collection = db[collection_name]
+        _, key_filter, build = mirror.MIRRORS[model._meta.model_name]
+        after = self.checkpoint.get(name)
+        counts = dict.fromkeys(['rows', 'documents', 'missing', 'orphaned', 'duplicate', 'stale', 'legacy'], 0)
+        samples = {kind: [] for kind in ('missing', 'orphaned', 'duplicate', 'stale')}
+        repairs = []
+
+        def record(kind, key, operation):
+            counts[kind] += 1
+            if len(samples[kind]) < SAMPLE_SIZE:
+                samples[kind].append(key)
+            repairs.append(operation)
+
+        def flush(last_key):
+            if repairs and not self.dry_run:
+                collection.bulk_write(repairs, ordered=False)
+            repairs.clear()
+            self._save_checkpoint(name, last_key)
+
+        if after is None:
+            # Mirror documents written before keys were normalised can never match
+            legacy = dict(base)
+            legacy[key_field] = {"$not": {"$type": "int" if key_field == "user_id" else "string"}}
+            counts['legacy'] = collection.count_documents(legacy)
+            if counts['legacy'] and not self.dry_run:
+                collection.bulk_write([DeleteMany(legacy)])
+
+        orm = self._orm_stream(model, parse_key(after) if after is not None else None)
+        docs = self._mongo_stream(collection, base, key_field, after)
+        row, doc = next(orm, None), next(docs, None)
+        last_key = after
+        now = datetime.utcnow()
+
+        while row is not None or doc is not None:
+            row_key = key_filter(row)[key_field] if row is not None else None
+            doc_key = doc[key_field] if doc is not None else None
+
+            if doc is None or (row is not None and row_key < doc_key):
+                counts['rows'] += 1
+                document = {**key_filter(row), **build(row), "created_at": now, "updated_at": now}
+                record('missing', row_key, ReplaceOne(key_filter(row), document, upsert=True))
+                last_key, row = row_key, next(orm, None)
+            elif row is None or doc_key < row_key:
+                counts['documents'] += 1
+                record('orphaned', doc_key, DeleteOne({"_id": doc["_id"]}))
+                last_key, doc = doc_key, next(docs, None)
+            else:
+                counts['rows'] += 1
+                counts['documents'] += 1
+                expected = _normalize(build(row))
+                changed = {field: value for field, value in expected.items() if doc.get(field) != value}
+                if changed:
+                    changed["updated_at"] = now
+                    record('stale', row_key, UpdateOne({"_id": doc["_id"]}, {"$set": changed}))
+                doc = next(docs, None)
+                while doc is not None and doc[key_field] == row_key:
+                    counts['documents'] += 1
+                    record('duplicate', row_key, DeleteOne({"_id": doc["_id"]}))
+                    doc = next(docs, None)
+                last_key, row = row_key, next(orm, None)
+
+            if len(repairs) >= self.batch_size:
+                flush(last_key)
+
+        flush(last_key)
+        self._save_checkpoint(name, 'done')
+        self._report(name, counts, samples)
+
+    def _report(self, name, counts, samples):
+        verb = 'would repair' if self.dry_run else 'repaired'
+        drift = sum(counts[kind] for kind in ('missing', 'orphaned', 'duplicate', 'stale', 'legacy'))
+        self.stdout.write(
+            f"{name}: {counts['rows']} rows vs {counts['documents']} documents, {verb} {drift} "
+            f"(missing {counts['missing']}, orphaned {counts['orphaned']}, duplicate {counts['duplicate']}, "
+            f"stale {counts['stale']}, legacy keys {counts['legacy']})"
+        )
+        if self.dry_run:
+            for kind, keys in samples.items():
+                if keys:
+                    self.stdout.write(f"  {kind}: {', '.join(str(key) for key in keys)}")
@@ -0,0 +1,23 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import home_feed
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the cached home page feed (repeatedly with --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep refreshing on a schedule')
+        parser.add_argument('--interval', type=float, default=settings.HOME_FEED_REFRESH_SECONDS,
+                            help='Seconds between refreshes with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            feed = home_feed.refresh()
+            self.stdout.write(f"Home feed refreshed: {len(feed['tours'])} tours, stats {feed['stats']}")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_temp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MongoOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('collection', models.CharField(max_length=100)),
+                ('operation', models.CharField(choices=[('insert', 'Insert'), ('update', 'Update'), ('delete', 'Delete')], max_length=10)),
+                ('filter', models.JSONField(blank=True, default=dict)),
+                ('document', models.JSONField(blank=True, default=dict)),
+                ('upsert', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'mongo_outbox',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='mongo_outbox_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_mongooutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mongooutbox',
+            name='database',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    from api.search import backend_for_vendor
+    backend = backend_for_vendor(schema_editor.connection.vendor)
+    if backend:
+        with schema_editor.connection.cursor() as cursor:
+            backend.setup(cursor)
+
+
+def drop_index(apps, schema_editor):
+    from api.search import backend_for_vendor
+    backend = backend_for_vendor(schema_editor.connection.vendor)
+    if backend:
+        with schema_editor.connection.cursor() as cursor:
+            backend.teardown(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_mongooutbox_database'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
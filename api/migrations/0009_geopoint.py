@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_catalog_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeoPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('object_id', models.CharField(max_length=64)),
+                ('owner_id', models.IntegerField(blank=True, null=True)),
+                ('is_public', models.BooleanField(default=True)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('geohash', models.CharField(max_length=12)),
+            ],
+            options={
+                'db_table': 'geo_points',
+                'indexes': [models.Index(fields=['kind', 'geohash'], name='geo_points_kind_geohash_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='geo_points_kind_object_uniq')],
+            },
+        ),
+    ]
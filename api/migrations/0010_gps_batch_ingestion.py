@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0009_geopoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gpslocation',
+            name='trip',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='points', to='api.triptrack'),
+        ),
+        migrations.AlterField(
+            model_name='gpslocation',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='gpslocation',
+            index=models.Index(fields=['trip', 'timestamp'], name='gps_trip_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gpslocation',
+            index=models.Index(fields=['user', '-timestamp'], name='gps_user_timestamp_idx'),
+        ),
+        migrations.CreateModel(
+            name='GPSBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64)),
+                ('accepted', models.IntegerField(default=0)),
+                ('rejected', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batches', to='api.triptrack')),
+            ],
+            options={
+                'db_table': 'gps_batches',
+                'constraints': [models.UniqueConstraint(fields=('trip', 'key'), name='gps_batches_trip_key_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_gps_batch_ingestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gpslocation',
+            name='resolution',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='gpslocation',
+            index=models.Index(fields=['resolution', 'timestamp'], name='gps_resolution_timestamp_idx'),
+        ),
+        migrations.CreateModel(
+            name='TripArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('point_count', models.IntegerField()),
+                ('start_time', models.DateTimeField(blank=True, null=True)),
+                ('end_time', models.DateTimeField(blank=True, null=True)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('trip', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='api.triptrack')),
+            ],
+            options={
+                'db_table': 'trip_archives',
+            },
+        ),
+    ]
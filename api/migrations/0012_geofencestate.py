@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0011_gps_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeofenceState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fence', models.CharField(max_length=64)),
+                ('inside', models.BooleanField(default=False)),
+                ('pending_since', models.DateTimeField(blank=True, null=True)),
+                ('last_seen', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='geofence_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'geofence_states',
+                'constraints': [models.UniqueConstraint(fields=('user', 'fence'), name='geofence_states_user_fence_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+
+def fill_city_keys(apps, schema_editor):
+    WeatherCache = apps.get_model('api', 'WeatherCache')
+    rows = list(WeatherCache.objects.filter(city_key='').only('pk', 'city'))
+    for row in rows:
+        row.city_key = ' '.join(row.city.split()).casefold()[:100]
+    WeatherCache.objects.bulk_update(rows, ['city_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_geofencestate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weathercache',
+            name='city_key',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='weathercache',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='weathercache',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_city_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='weathercache',
+            index=models.Index(fields=['city_key', '-cached_at'], name='weather_city_key_cached_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0013_weathercache_city_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_type', models.CharField(max_length=50)),
+                ('night', models.DateField()),
+                ('total', models.PositiveIntegerField()),
+                ('held', models.PositiveIntegerField(default=0)),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory', to='api.hotel')),
+            ],
+            options={
+                'db_table': 'room_inventory',
+                'constraints': [
+                    models.UniqueConstraint(fields=('hotel', 'room_type', 'night'), name='room_inventory_night_uniq'),
+                    models.CheckConstraint(check=models.Q(('total__gte', models.F('held') + models.F('booked'))), name='room_inventory_not_oversold'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='RoomHold',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('room_type', models.CharField(max_length=50)),
+                ('check_in', models.DateField()),
+                ('check_out', models.DateField()),
+                ('rooms', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('held', 'Held'), ('confirmed', 'Confirmed'), ('released', 'Released'), ('expired', 'Expired')], default='held', max_length=10)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='room_hold', to='api.booking')),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_holds', to='api.hotel')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='room_holds', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'room_holds',
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='room_holds_status_expiry_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_room_inventory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roominventory',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='roominventory',
+            index=models.Index(fields=['updated_at'], name='room_inventory_updated_idx'),
+        ),
+    ]
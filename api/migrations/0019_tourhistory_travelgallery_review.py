@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0018_listing_cursor_indexes'),
+    ]
+
+    # These models were never in the migration history; created here with their listing indexes
+    operations = [
+        migrations.CreateModel(
+            name='TourHistory',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('trip_name', models.CharField(max_length=200)),
+                ('destination_name', models.CharField(max_length=200)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('total_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('currency', models.CharField(default='INR', max_length=10)),
+                ('rating_given', models.FloatField(blank=True, null=True)),
+                ('review_given', models.BooleanField(default=False)),
+                ('photos_count', models.IntegerField(default=0)),
+                ('notes', models.TextField(blank=True)),
+                ('memories', models.JSONField(blank=True, default=list)),
+                ('is_favorite', models.BooleanField(default=False)),
+                ('share_count', models.IntegerField(default=0)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.booking')),
+                ('destination', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.destination')),
+                ('hotel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.hotel')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tour_histories', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'tour_histories',
+                'ordering': ['-start_date'],
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='tour_history_user_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TravelGallery',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('image', models.ImageField(upload_to='gallery/')),
+                ('thumbnail', models.ImageField(blank=True, null=True, upload_to='gallery/thumbnails/')),
+                ('image_url', models.URLField(blank=True)),
+                ('thumbnail_url', models.URLField(blank=True)),
+                ('location', models.CharField(blank=True, max_length=200)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('date_taken', models.DateField()),
+                ('is_public', models.BooleanField(default=False)),
+                ('likes_count', models.IntegerField(default=0)),
+                ('tags', models.JSONField(blank=True, default=list)),
+                ('album', models.CharField(blank=True, max_length=100)),
+                ('cloudinary_public_id', models.CharField(blank=True, max_length=200)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('tour_history', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='gallery_items', to='api.tourhistory')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gallery_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'travel_gallery',
+                'ordering': ['-date_taken'],
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='gallery_user_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='review', to='api.booking')),
+                ('destination', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='api.destination')),
+                ('hotel', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='api.hotel')),
+                ('tour_history', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviews', to='api.tourhistory')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews_given', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-created_at', '-id'], name='reviews_user_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_tourhistory_travelgallery_review'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='qrticket',
+            name='superseded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,129 @@
+"""
+MongoDB mirror documents for the ORM models.
+
+Each mirrored model maps to a collection, a key filter and a document
+builder. ``save()``/``delete()`` queue the corresponding write on the
+outbox, so they must be called inside the transaction that changes the row.
+"""
+from datetime import datetime
+
+from .outbox import enqueue_delete, enqueue_insert, enqueue_update, insert_entry
+
+TOURS = 'tours'
+USERS = 'users'
+BOOKINGS = 'bookings'
+
+
+def _str(value):
+    return str(value) if value is not None else None
+
+
+def destination_document(instance):
+    return {
+        "name": instance.name,
+        "city": instance.city,
+        "state": instance.state,
+        "country": instance.country,
+        "rating": instance.rating,
+        "average_cost": _str(instance.average_cost),
+        "description": instance.description,
+        "attractions": instance.attractions,
+    }
+
+
+def hotel_document(instance):
+    return {
+        "name": instance.name,
+        "city": instance.city,
+        "price_per_night": _str(instance.price_per_night),
+        "rating": instance.rating,
+        "available_rooms": instance.available_rooms,
+        "total_rooms": instance.total_rooms,
+        "amenities": instance.amenities,
+        "contact": {
+            "phone": instance.phone,
+            "email": instance.email
+        },
+    }
+
+
+def cab_document(instance):
+    return {
+        "company_name": instance.company_name,
+        "vehicle_type": instance.vehicle_type,
+        "price_per_km": instance.price_per_km,
+        "price_per_hour": instance.price_per_hour,
+        "capacity": instance.capacity,
+        "rating": instance.rating,
+        "available_cars": instance.available_cars,
+        "contact": {
+            "phone": instance.phone,
+            "email": instance.email
+        },
+    }
+
+
+def booking_document(instance):
+    return {
+        "user_id": str(instance.user_id),
+        "username": instance.user.username,
+        "booking_type": instance.booking_type,
+        "total_price": _str(instance.total_price),
+        "status": instance.booking_status,
+        "payment_status": instance.payment_status,
+        "booking_date": instance.created_at,
+        "check_in_date": instance.check_in_date.isoformat() if instance.check_in_date else None,
+        "check_out_date": instance.check_out_date.isoformat() if instance.check_out_date else None,
+        "guests": instance.number_of_guests,
+        "rooms": instance.number_of_rooms,
+    }
+
+
+def user_document(instance):
+    return {
+        "username": instance.username,
+        "email": instance.email,
+        "full_name": f"{instance.first_name} {instance.last_name}".strip(),
+    }
+
+
+# model_name -> (collection, key filter, document builder)
+MIRRORS = {
+    'destination': (TOURS, lambda obj: {"type": "destination", "django_id": str(obj.pk)}, destination_document),
+    'hotel': (TOURS, lambda obj: {"type": "hotel", "django_id": str(obj.pk)}, hotel_document),
+    'cab': (TOURS, lambda obj: {"type": "cab", "django_id": str(obj.pk)}, cab_document),
+    'booking': (BOOKINGS, lambda obj: {"django_booking_id": str(obj.pk)}, booking_document),
+    'user': (USERS, lambda obj: {"user_id": obj.pk}, user_document),
+}
+
+
+def _describe(instance):
+    return MIRRORS[instance._meta.model_name]
+
+
+def save(instance, created=False):
+    """Queue the mirror insert (``created``) or ``$set`` update for ``instance``"""
+    collection, key, build = _describe(instance)
+    now = datetime.utcnow()
+    document = build(instance)
+    if created:
+        enqueue_insert(collection, {**key(instance), **document, "created_at": now, "updated_at": now})
+    else:
+        enqueue_update(collection, key(instance), {"$set": {**document, "updated_at": now}})
+
+
+def insert_entries(instances):
+    """Unsaved outbox inserts for newly created ``instances``, for ``outbox.enqueue_many()``"""
+    now = datetime.utcnow()
+    entries = []
+    for instance in instances:
+        collection, key, build = _describe(instance)
+        document = {**key(instance), **build(instance), "created_at": now, "updated_at": now}
+        entries.append(insert_entry(collection, document))
+    return entries
+
+
+def delete(instance):
+    """Queue removal of the mirror document; call before the row is deleted"""
+    collection, key, _ = _describe(instance)
+    enqueue_delete(collection, key(instance))
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator, FileExtensionValidator
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 import uuid
 
@@ -204,6 +205,9 @@ class Booking(TimeStampMixin):
     class Meta:
         db_table = 'bookings'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='bookings_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.booking_reference}"
@@ -277,6 +281,9 @@ class TourHistory(TimeStampMixin):
     class Meta:
         db_table = 'tour_histories'
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='tour_history_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.trip_name}"
@@ -340,6 +347,9 @@ class Notification(TimeStampMixin):
     class Meta:
         db_table = 'notifications'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='notifications_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
@@ -370,6 +380,9 @@ class TravelGallery(TimeStampMixin):
     class Meta:
         db_table = 'travel_gallery'
         ordering = ['-date_taken']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='gallery_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.title}"
@@ -383,4 +396,377 @@ class Review(TimeStampMixin):
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, null=True, blank=True, related_name='reviews')
     booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='review')
     tour_history = models.ForeignKey(TourHistory, on_delete=models.SET_NULL, null=True, blank=True, related_name='reviews')
-   
\ No newline at end of file
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='reviews_user_created_idx'),
+        ]
+
+
+class SavedPlace(models.Model):
+    """Places a user saved from a nearby search"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    name = models.CharField(max_length=100)
+    place_id = models.CharField(max_length=200)
+    address = models.TextField()
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    place_type = models.CharField(max_length=50)
+    distance = models.FloatField()
+    rating = models.FloatField(default=0)
+    photo_url = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['distance']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.name}"
+
+
+# ==================== WEATHER ====================
+class WeatherCache(models.Model):
+    """Last fetched conditions for a city; ``city_key`` is the normalised lookup key (see ``weather``)"""
+    city = models.CharField(max_length=100)
+    city_key = models.CharField(max_length=100, default='')
+    country = models.CharField(max_length=50)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    temperature = models.FloatField()
+    humidity = models.IntegerField()
+    description = models.CharField(max_length=200)
+    icon = models.CharField(max_length=10)
+    wind_speed = models.FloatField()
+    forecast_date = models.DateField()
+    cached_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['city_key', '-cached_at'], name='weather_city_key_cached_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.city} @ {self.cached_at}"
+
+
+# ==================== QR TICKETS ====================
+class QRTicket(models.Model):
+    """Entry ticket; ``qr_code`` is the signed token gates verify offline (see ``tickets``)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, null=True, blank=True)
+    ticket_type = models.CharField(max_length=50)
+    ticket_id = models.CharField(max_length=100, unique=True)
+    qr_code = models.TextField()
+    valid_from = models.DateTimeField()
+    valid_until = models.DateTimeField()
+    is_used = models.BooleanField(default=False)
+    used_at = models.DateTimeField(null=True, blank=True)
+    scan_count = models.IntegerField(default=0)
+    superseded_at = models.DateTimeField(null=True, blank=True)   # replaced by a ticket for the changed stay
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.ticket_type} {self.ticket_id}"
+
+
+# ==================== GPS MAP TRACKING ====================
+class TripTrack(models.Model):
+    """A recorded trip; its points are ``GPSLocation`` rows"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    name = models.CharField(max_length=100)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField(null=True, blank=True)
+    start_latitude = models.FloatField()
+    start_longitude = models.FloatField()
+    end_latitude = models.FloatField(null=True, blank=True)
+    end_longitude = models.FloatField(null=True, blank=True)
+    total_distance = models.FloatField(default=0)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.name}"
+
+
+class GPSLocation(models.Model):
+    """A single GPS fix, optionally belonging to a trip"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    trip = models.ForeignKey(TripTrack, on_delete=models.CASCADE, null=True, blank=True, related_name='points')
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    altitude = models.FloatField(null=True, blank=True)
+    accuracy = models.FloatField(null=True, blank=True)
+    location_name = models.CharField(max_length=200, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+    # Seconds between kept points after downsampling; 0 is full resolution
+    resolution = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['trip', 'timestamp'], name='gps_trip_timestamp_idx'),
+            models.Index(fields=['user', '-timestamp'], name='gps_user_timestamp_idx'),
+            models.Index(fields=['resolution', 'timestamp'], name='gps_resolution_timestamp_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} @ {self.latitude}, {self.longitude}"
+
+
+class FavoriteLocation(models.Model):
+    """A user's saved location, also used as a geofence"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    name = models.CharField(max_length=100)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    location_type = models.CharField(max_length=50)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.name}"
+
+
+class GeofenceState(models.Model):
+    """Whether a user is inside one of their geofences, with any transition still being debounced"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='geofence_states')
+    fence = models.CharField(max_length=64)
+    inside = models.BooleanField(default=False)
+    pending_since = models.DateTimeField(null=True, blank=True)
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        db_table = 'geofence_states'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'fence'], name='geofence_states_user_fence_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.fence} {'inside' if self.inside else 'outside'}"
+
+
+class TripArchive(models.Model):
+    """A finished trip's points packed into one delta-encoded, compressed blob (see ``gps_retention``)"""
+    trip = models.OneToOneField(TripTrack, on_delete=models.CASCADE, related_name='archive')
+    point_count = models.IntegerField()
+    start_time = models.DateTimeField(null=True, blank=True)
+    end_time = models.DateTimeField(null=True, blank=True)
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'trip_archives'
+
+    def __str__(self):
+        return f"Trip {self.trip_id} ({self.point_count} points)"
+
+
+class GPSBatch(models.Model):
+    """An ingested batch of trip points, remembered by idempotency key so retries are not stored twice"""
+    trip = models.ForeignKey(TripTrack, on_delete=models.CASCADE, related_name='batches')
+    key = models.CharField(max_length=64)
+    accepted = models.IntegerField(default=0)
+    rejected = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'gps_batches'
+        constraints = [
+            models.UniqueConstraint(fields=['trip', 'key'], name='gps_batches_trip_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.trip_id}:{self.key}"
+
+
+class MongoOutbox(models.Model):
+    """Pending MongoDB mirror writes, committed with the ORM change that caused them"""
+    INSERT = 'insert'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    OPERATIONS = [
+        (INSERT, 'Insert'),
+        (UPDATE, 'Update'),
+        (DELETE, 'Delete'),
+    ]
+
+    PENDING = 'pending'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (FAILED, 'Failed'),
+    ]
+
+    database = models.CharField(max_length=100, blank=True)
+    collection = models.CharField(max_length=100)
+    operation = models.CharField(max_length=10, choices=OPERATIONS)
+    filter = models.JSONField(default=dict, blank=True)
+    document = models.JSONField(default=dict, blank=True)
+    upsert = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'mongo_outbox'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='mongo_outbox_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.operation} {self.collection} #{self.pk}"
+
+
+class GeoPoint(models.Model):
+    """Spatial index entry (geohash cell) for a located destination, hotel, photo or saved place"""
+    kind = models.CharField(max_length=20)
+    object_id = models.CharField(max_length=64)
+    owner_id = models.IntegerField(null=True, blank=True)
+    is_public = models.BooleanField(default=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    geohash = models.CharField(max_length=12)
+
+    class Meta:
+        db_table = 'geo_points'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='geo_points_kind_object_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'geohash'], name='geo_points_kind_geohash_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} @ {self.geohash}"
+
+
+# ==================== HOTEL INVENTORY ====================
+class RoomInventory(models.Model):
+    """Rooms of one type at a hotel for one night; ``held + booked`` never exceeds ``total``"""
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='inventory')
+    room_type = models.CharField(max_length=50)
+    night = models.DateField()
+    total = models.PositiveIntegerField()
+    held = models.PositiveIntegerField(default=0)
+    booked = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'room_inventory'
+        indexes = [
+            models.Index(fields=['updated_at'], name='room_inventory_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['hotel', 'room_type', 'night'], name='room_inventory_night_uniq'),
+            models.CheckConstraint(check=models.Q(total__gte=models.F('held') + models.F('booked')),
+                                   name='room_inventory_not_oversold'),
+        ]
+
+    def __str__(self):
+        return f"{self.hotel_id} {self.room_type} {self.night}: {self.held + self.booked}/{self.total}"
+
+
+class RoomHold(models.Model):
+    """Rooms taken out of inventory for a stay: held until ``expires_at``, then confirmed by a booking or released"""
+    HELD = 'held'
+    CONFIRMED = 'confirmed'
+    RELEASED = 'released'
+    EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (HELD, 'Held'),
+        (CONFIRMED, 'Confirmed'),
+        (RELEASED, 'Released'),
+        (EXPIRED, 'Expired'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='room_holds')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='room_holds')
+    booking = models.OneToOneField(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='room_hold')
+    room_type = models.CharField(max_length=50)
+    check_in = models.DateField()
+    check_out = models.DateField()
+    rooms = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=HELD)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'room_holds'
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='room_holds_status_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hotel_id} {self.room_type} {self.check_in}..{self.check_out} x{self.rooms} ({self.status})"
+
+
+
+# ==================== BOOKING ARTEFACTS ====================
+class BookingArtefact(models.Model):
+    """A document generated for a booking; ``pending`` rows are the queue of ``generate_artefacts``"""
+    INVOICE = 'invoice'
+    ITINERARY = 'itinerary'
+    TICKET = 'ticket'
+    KINDS = [
+        (INVOICE, 'Invoice'),
+        (ITINERARY, 'Itinerary'),
+        (TICKET, 'QR ticket'),
+    ]
+
+    PENDING = 'pending'
+    READY = 'ready'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (READY, 'Ready'),
+        (FAILED, 'Failed'),
+    ]
+
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='artefacts')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    source_hash = models.CharField(max_length=64, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    path = models.CharField(max_length=255, blank=True)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    queued_at = models.DateTimeField(default=timezone.now)
+    generated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'booking_artefacts'
+        constraints = [
+            models.UniqueConstraint(fields=['booking', 'kind'], name='booking_artefacts_kind_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'queued_at'], name='booking_artefacts_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for {self.booking_id} ({self.status})"
+
+# ==================== IDEMPOTENCY ====================
+class IdempotencyKey(models.Model):
+    """A client's ``Idempotency-Key`` and the response it got, replayed when the request is retried"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_keys_user_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_keys_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
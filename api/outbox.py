@@ -0,0 +1,193 @@
+"""
+Transactional outbox for the MongoDB mirror.
+
+Views queue their Mongo writes here inside the same ORM transaction as the
+model save, so a request never waits on Mongo and a rolled back save never
+reaches it. ``flush()`` (run by the ``flush_outbox`` management command)
+drains the queue in id order with ordered ``bulk_write`` batches.
+
+A single flusher is expected to run at a time; ordering is only guaranteed
+per collection, which is enough because mirror keys never span collections.
+Entries without a ``database`` go to the mirror database in ``api.db``.
+"""
+import json
+import logging
+from datetime import timedelta
+
+from bson import json_util
+from django.conf import settings
+from django.utils import timezone
+from pymongo import DeleteMany, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from .db import connection
+from .models import MongoOutbox
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+MAX_BACKOFF_SECONDS = 300
+
+
+def _to_json(value):
+    """Encode a Mongo document as plain JSON (datetimes become ``{"$date": ...}``)"""
+    return json.loads(json_util.dumps(value))
+
+
+def _from_json(value):
+    return json_util.loads(json.dumps(value))
+
+
+# ==================== QUEUEING ====================
+def insert_entry(collection, document, database=''):
+    """An unsaved insert of ``document`` into ``collection``, for ``enqueue_many()``"""
+    return MongoOutbox(
+        database=database,
+        collection=collection,
+        operation=MongoOutbox.INSERT,
+        document=_to_json(document),
+    )
+
+
+def update_entry(collection, filter, update, upsert=False, database=''):
+    """An unsaved update (``$set``/``$inc`` spec) of the documents matching ``filter``"""
+    return MongoOutbox(
+        database=database,
+        collection=collection,
+        operation=MongoOutbox.UPDATE,
+        filter=_to_json(filter),
+        document=_to_json(update),
+        upsert=upsert,
+    )
+
+
+def enqueue_many(entries):
+    """Queue several entries with one INSERT; they are flushed in list order"""
+    return MongoOutbox.objects.bulk_create(entries)
+
+
+def enqueue_insert(collection, document, database=''):
+    """Queue an insert of ``document`` into ``collection``"""
+    entry = insert_entry(collection, document, database)
+    entry.save()
+    return entry
+
+
+def enqueue_update(collection, filter, update, upsert=False, database=''):
+    """Queue an update (``$set``/``$inc`` spec) of the documents matching ``filter``"""
+    entry = update_entry(collection, filter, update, upsert, database)
+    entry.save()
+    return entry
+
+
+def enqueue_delete(collection, filter, database=''):
+    """Queue a delete of the documents matching ``filter``"""
+    return MongoOutbox.objects.create(
+        database=database,
+        collection=collection,
+        operation=MongoOutbox.DELETE,
+        filter=_to_json(filter),
+    )
+
+
+# ==================== FLUSHING ====================
+def _to_operation(entry):
+    if entry.operation == MongoOutbox.INSERT:
+        return InsertOne(_from_json(entry.document))
+    if entry.operation == MongoOutbox.UPDATE:
+        return UpdateOne(_from_json(entry.filter), _from_json(entry.document), upsert=entry.upsert)
+    return DeleteMany(_from_json(entry.filter))
+
+
+def _mark_sent(entries):
+    if entries:
+        MongoOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+
+
+def _mark_failed(entry, error):
+    entry.attempts += 1
+    entry.last_error = str(error)[:2000]
+    backoff = min(2 ** entry.attempts, MAX_BACKOFF_SECONDS)
+    entry.next_attempt_at = timezone.now() + timedelta(seconds=backoff)
+    if entry.attempts >= settings.MONGO_OUTBOX_MAX_ATTEMPTS:
+        entry.status = MongoOutbox.FAILED
+        logger.error("Outbox entry %s gave up after %s attempts: %s", entry.pk, entry.attempts, error)
+    entry.save(update_fields=['attempts', 'last_error', 'next_attempt_at', 'status'])
+
+
+def _flush_collection(database, name, entries):
+    """Apply ``entries`` to one collection in order; returns how many were applied"""
+    collection = connection.database(database or None)[name]
+    applied = 0
+    while entries:
+        try:
+            collection.bulk_write([_to_operation(entry) for entry in entries], ordered=True)
+        except BulkWriteError as exc:
+            error = exc.details['writeErrors'][0]
+            index = error['index']
+            _mark_sent(entries[:index])
+            applied += index
+            failed = entries[index]
+            if error.get('code') == DUPLICATE_KEY_ERROR and failed.operation == MongoOutbox.INSERT:
+                # Already applied by an earlier flush that died before deleting the row
+                _mark_sent([failed])
+                applied += 1
+                entries = entries[index + 1:]
+                continue
+            _mark_failed(failed, error.get('errmsg', error))
+            return applied
+        except PyMongoError as exc:
+            _mark_failed(entries[0], exc)
+            return applied
+        else:
+            _mark_sent(entries)
+            return applied + len(entries)
+    return applied
+
+
+def flush(batch_size=None):
+    """
+    Drain up to ``batch_size`` pending entries.
+
+    Entries are grouped per collection and written with one ordered
+    ``bulk_write`` each. A collection whose oldest pending entry is backing
+    off is skipped entirely so later writes cannot overtake it.
+    """
+    batch_size = batch_size or settings.MONGO_OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    pending = MongoOutbox.objects.filter(status=MongoOutbox.PENDING).order_by('id')[:batch_size]
+
+    batches, blocked = {}, set()
+    for entry in pending:
+        target = (entry.database, entry.collection)
+        if target in blocked:
+            continue
+        if entry.next_attempt_at > now:
+            blocked.add(target)
+            continue
+        batches.setdefault(target, []).append(entry)
+
+    return sum(_flush_collection(database, name, entries) for (database, name), entries in batches.items())
+
+
+# ==================== METRICS ====================
+def lag_seconds():
+    """Age of the oldest pending entry, i.e. how far Mongo trails the ORM"""
+    oldest = (
+        MongoOutbox.objects.filter(status=MongoOutbox.PENDING)
+        .order_by('id')
+        .values_list('created_at', flat=True)
+        .first()
+    )
+    if oldest is None:
+        return 0.0
+    return max((timezone.now() - oldest).total_seconds(), 0.0)
+
+
+def stats():
+    """Queue depth, dead letters and lag for monitoring"""
+    return {
+        'pending': MongoOutbox.objects.filter(status=MongoOutbox.PENDING).count(),
+        'failed': MongoOutbox.objects.filter(status=MongoOutbox.FAILED).count(),
+        'lag_seconds': lag_seconds(),
+    }
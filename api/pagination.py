@@ -0,0 +1,26 @@
+"""
+Keyset (cursor) pagination for per-user listings.
+
+Pages are read with ``WHERE created_at < <cursor> ORDER BY created_at DESC,
+id DESC LIMIT n`` on a ``(user, -created_at, -id)`` index, so a deep page
+costs the same as the first and no ``COUNT(*)`` runs. Clients follow the
+opaque ``next``/``previous`` links instead of asking for a page number.
+Any other allowed ordering (``?ordering=total_price``) gets ``-id`` as a
+tiebreaker so rows with equal values are neither skipped nor repeated.
+"""
+from rest_framework.pagination import CursorPagination
+
+MAX_PAGE_SIZE = 100
+
+
+class CreatedCursorPagination(CursorPagination):
+    """Newest first on ``(created_at, id)``; ``?page_size=`` up to ``MAX_PAGE_SIZE``"""
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering += ('-id',)
+        return ordering
@@ -0,0 +1,230 @@
+"""
+Full-text search index for destinations and hotels.
+
+Documents are kept in a database-side index (SQLite FTS5, or a tsvector
+table with a GIN index on PostgreSQL) and updated from model signals in the
+same transaction as the row itself. Queries are ranked (BM25 on SQLite,
+``ts_rank_cd`` on PostgreSQL), with prefix matching on the last term so the
+endpoint can be hit per keystroke.
+
+The backend is picked from ``settings.SEARCH_BACKEND`` (a dotted path) or
+else from the database vendor; ``get_backend()`` returns ``None`` when no
+backend supports the database, and callers fall back to ``icontains``.
+"""
+import hashlib
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+# Index columns, in order, with their ranking weight
+FIELDS = ['name', 'city', 'state', 'country', 'description', 'tags']
+WEIGHTS = {'name': 10.0, 'city': 5.0, 'state': 3.0, 'country': 2.0, 'description': 1.0, 'tags': 2.0}
+KINDS = ('destination', 'hotel')
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERMS = 8
+
+
+def document_for(instance):
+    """Searchable text for a Destination or Hotel"""
+    kind = instance._meta.model_name
+    tags = instance.attractions if kind == 'destination' else instance.amenities
+    return {
+        'name': instance.name,
+        'city': instance.city,
+        'state': instance.state,
+        'country': instance.country,
+        'description': instance.description,
+        'tags': ' '.join(str(tag) for tag in tags or []),
+    }
+
+
+def query_terms(query):
+    return TOKEN_RE.findall(query.lower())[:MAX_TERMS]
+
+
+class SearchBackend:
+    """Interface for a search index backend"""
+
+    def setup(self, cursor):
+        raise NotImplementedError
+
+    def teardown(self, cursor):
+        raise NotImplementedError
+
+    def index(self, kind, object_id, document):
+        self.index_many(kind, [(object_id, document)])
+
+    def index_many(self, kind, items):
+        raise NotImplementedError
+
+    def remove(self, kind, object_id):
+        raise NotImplementedError
+
+    def clear(self, kind):
+        raise NotImplementedError
+
+    def search(self, kind, query, limit, offset=0):
+        """Return ``(object_ids, total)`` best match first"""
+        raise NotImplementedError
+
+
+class SqliteFTSBackend(SearchBackend):
+    """SQLite FTS5 table; rows are addressed by a hash of (kind, object id)"""
+    table = 'catalog_search_fts'
+
+    def setup(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            f"kind UNINDEXED, object_id UNINDEXED, {', '.join(FIELDS)}, "
+            f"tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+    def teardown(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    @staticmethod
+    def _rowid(kind, object_id):
+        digest = hashlib.blake2b(f'{kind}:{object_id}'.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') >> 1
+
+    def index_many(self, kind, items):
+        rows = [
+            (self._rowid(kind, object_id), kind, str(object_id), *(document[field] for field in FIELDS))
+            for object_id, document in items
+        ]
+        placeholders = ', '.join(['%s'] * (len(FIELDS) + 3))
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, kind, object_id, {', '.join(FIELDS)}) VALUES ({placeholders})",
+                rows
+            )
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [self._rowid(kind, object_id)])
+
+    def clear(self, kind):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE kind = %s", [kind])
+
+    @staticmethod
+    def _match(terms):
+        # Quote every term so user input can't inject FTS syntax; prefix-match the last
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def search(self, kind, query, limit, offset=0):
+        terms = query_terms(query)
+        if not terms:
+            return [], 0
+        match = self._match(terms)
+        weights = ', '.join(['0', '0'] + [str(WEIGHTS[field]) for field in FIELDS])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT object_id FROM {self.table} WHERE {self.table} MATCH %s AND kind = %s "
+                f"ORDER BY bm25({self.table}, {weights}) LIMIT %s OFFSET %s",
+                [match, kind, limit, offset]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if offset == 0 and len(ids) < limit:
+                return ids, len(ids)
+            cursor.execute(
+                f"SELECT count(*) FROM {self.table} WHERE {self.table} MATCH %s AND kind = %s",
+                [match, kind]
+            )
+            return ids, cursor.fetchone()[0]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector table with a GIN index, weighted A-D by field"""
+    table = 'catalog_search'
+    config = 'simple'
+    FIELD_WEIGHTS = {'name': 'A', 'city': 'B', 'state': 'C', 'country': 'C', 'description': 'D', 'tags': 'B'}
+
+    def setup(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            f"kind varchar(20) NOT NULL, object_id varchar(64) NOT NULL, "
+            f"document tsvector NOT NULL, PRIMARY KEY (kind, object_id))"
+        )
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_document_idx ON {self.table} USING GIN (document)")
+
+    def teardown(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    def _vector_sql(self):
+        return ' || '.join(
+            f"setweight(to_tsvector('{self.config}', %s), '{self.FIELD_WEIGHTS[field]}')" for field in FIELDS
+        )
+
+    def index_many(self, kind, items):
+        rows = [(kind, str(object_id), *(document[field] or '' for field in FIELDS)) for object_id, document in items]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.table} (kind, object_id, document) VALUES (%s, %s, {self._vector_sql()}) "
+                f"ON CONFLICT (kind, object_id) DO UPDATE SET document = EXCLUDED.document",
+                rows
+            )
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE kind = %s AND object_id = %s", [kind, str(object_id)])
+
+    def clear(self, kind):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE kind = %s", [kind])
+
+    def search(self, kind, query, limit, offset=0):
+        terms = query_terms(query)
+        if not terms:
+            return [], 0
+        tsquery = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT object_id, count(*) OVER () FROM {self.table}, to_tsquery('{self.config}', %s) query "
+                f"WHERE kind = %s AND document @@ query "
+                f"ORDER BY ts_rank_cd(document, query) DESC LIMIT %s OFFSET %s",
+                [tsquery, kind, limit, offset]
+            )
+            rows = cursor.fetchall()
+        return [row[0] for row in rows], (rows[0][1] if rows else 0)
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SqliteFTSBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+_backend = None
+
+
+def backend_for_vendor(vendor):
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    backend_class = VENDOR_BACKENDS.get(vendor)
+    return backend_class() if backend_class else None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = backend_for_vendor(connection.vendor) or False
+    return _backend or None
+
+
+# ==================== SYNC HELPERS ====================
+def index_instance(instance):
+    backend = get_backend()
+    if backend:
+        backend.index(instance._meta.model_name, instance.pk, document_for(instance))
+
+
+def remove_instance(instance):
+    backend = get_backend()
+    if backend:
+        backend.remove(instance._meta.model_name, instance.pk)
@@ -1,11 +1,14 @@
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Destination, Hotel, Booking
+from .fieldsets import SparseFieldsMixin
+from .models import Destination, Hotel, Booking, QRTicket, RoomHold, TripTrack
 
 
 # ==================== CORE MODELS ====================
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
@@ -31,22 +34,71 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 
-class DestinationSerializer(serializers.ModelSerializer):
+class DestinationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Destination
         fields = '__all__'
 
 
-class HotelSerializer(serializers.ModelSerializer):
+class HotelSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {'destination': DestinationSerializer}
+
     class Meta:
         model = Hotel
         fields = '__all__'
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    expandable_fields = {'hotel': HotelSerializer, 'destination': DestinationSerializer}
 
     class Meta:
         model = Booking
         fields = '__all__'
         read_only_fields = ['id', 'user', 'booking_date']
+
+
+class BookingLegSerializer(BookingSerializer):
+    """One booking of a bulk request; the reference is generated on create"""
+    hold_id = serializers.UUIDField(required=False, write_only=True)
+    room_type = serializers.CharField(required=False, write_only=True, max_length=50)
+
+    class Meta(BookingSerializer.Meta):
+        fields = None
+        exclude = ['booking_reference']
+
+
+class BulkBookingSerializer(serializers.Serializer):
+    bookings = BookingLegSerializer(many=True, allow_empty=False)
+
+    def validate_bookings(self, value):
+        if len(value) > settings.BOOKING_BULK_MAX_ITEMS:
+            raise serializers.ValidationError(f'At most {settings.BOOKING_BULK_MAX_ITEMS} bookings per request')
+        return value
+
+
+class RoomHoldSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RoomHold
+        fields = ['id', 'hotel', 'room_type', 'check_in', 'check_out', 'rooms', 'status', 'expires_at', 'booking']
+        read_only_fields = fields
+
+
+class QRTicketSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = QRTicket
+        fields = ['ticket_id', 'ticket_type', 'booking', 'qr_code', 'valid_from', 'valid_until',
+                  'is_used', 'used_at', 'scan_count']
+        read_only_fields = fields
+
+
+class TripTrackSerializer(serializers.ModelSerializer):
+    """A trip; its end point and distance follow the ingested GPS points"""
+    start_time = serializers.DateTimeField(default=timezone.now)
+
+    class Meta:
+        model = TripTrack
+        fields = ['id', 'name', 'start_time', 'end_time', 'start_latitude', 'start_longitude',
+                  'end_latitude', 'end_longitude', 'total_distance', 'is_active', 'created_at']
+        read_only_fields = ['id', 'end_time', 'end_latitude', 'end_longitude', 'total_distance',
+                            'is_active', 'created_at']
@@ -0,0 +1,90 @@
+"""
+Model signal handlers that keep derived data in step with catalog writes.
+
+Cache and in-memory work is deferred with ``transaction.on_commit`` so
+nothing is invalidated for a write that ends up rolled back; the search
+and spatial indexes live in the same database and are updated inside the
+transaction.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from . import artefacts, autocomplete, availability, facets, geo, geofence, home_feed, search
+
+CATALOG_MODELS = ['api.Destination', 'api.Hotel']
+
+
+def catalog_changed(sender, **kwargs):
+    transaction.on_commit(home_feed.invalidate)
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_saved_{model}')
+    post_delete.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_deleted_{model}')
+
+
+SEARCHABLE_MODELS = ['api.Destination', 'api.Hotel']
+
+
+def searchable_saved(sender, instance, **kwargs):
+    search.index_instance(instance)
+    transaction.on_commit(lambda: autocomplete.catalog_saved(instance))
+    transaction.on_commit(lambda: facets.catalog_saved(instance))
+
+
+def searchable_deleted(sender, instance, **kwargs):
+    search.remove_instance(instance)
+    kind, object_id = instance._meta.model_name, instance.pk
+    transaction.on_commit(lambda: autocomplete.catalog_deleted(kind, object_id))
+    transaction.on_commit(lambda: facets.catalog_deleted(kind, object_id))
+
+
+for model in SEARCHABLE_MODELS:
+    post_save.connect(searchable_saved, sender=model, dispatch_uid=f'search_saved_{model}')
+    post_delete.connect(searchable_deleted, sender=model, dispatch_uid=f'search_deleted_{model}')
+
+
+LOCATED_MODELS = ['api.Destination', 'api.Hotel', 'api.TravelGallery', 'api.SavedPlace']
+
+
+def located_saved(sender, instance, **kwargs):
+    geo.index_instance(instance)
+
+
+def located_deleted(sender, instance, **kwargs):
+    geo.remove_instance(instance)
+
+
+for model in LOCATED_MODELS:
+    post_save.connect(located_saved, sender=model, dispatch_uid=f'geo_saved_{model}')
+    post_delete.connect(located_deleted, sender=model, dispatch_uid=f'geo_deleted_{model}')
+
+
+FENCE_MODELS = ['api.FavoriteLocation', 'api.Wishlist']
+
+
+def fences_changed(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: geofence.invalidate(user_id))
+
+
+for model in FENCE_MODELS:
+    post_save.connect(fences_changed, sender=model, dispatch_uid=f'fences_saved_{model}')
+    post_delete.connect(fences_changed, sender=model, dispatch_uid=f'fences_deleted_{model}')
+
+
+def hotel_changed(sender, **kwargs):
+    transaction.on_commit(availability.local_index.bump_version)
+
+
+post_save.connect(hotel_changed, sender='api.Hotel', dispatch_uid='availability_hotel_saved')
+post_delete.connect(hotel_changed, sender='api.Hotel', dispatch_uid='availability_hotel_deleted')
+
+
+def booking_saved(sender, instance, **kwargs):
+    # Queued in the same transaction; generate_artefacts skips unchanged inputs
+    if instance.booking_status == 'confirmed':
+        artefacts.queue(instance)
+
+
+post_save.connect(booking_saved, sender='api.Booking', dispatch_uid='artefacts_booking_saved')
@@ -0,0 +1,264 @@
+"""
+Signed QR tickets with batched scan accounting.
+
+A ticket's QR payload is a compact token::
+
+    <ticket id>.<booking>.<valid from>.<valid until>.<signature>
+
+where the booking is its UUID in base64url (empty if none), the window is
+hex Unix seconds and the signature is a truncated HMAC-SHA256 of the
+rest under ``QR_TICKET_SECRET``. A gate scanner holding the secret checks a
+ticket without any database access, online or offline.
+
+``scan()`` refuses a ticket already admitted within ``QR_SCAN_REPLAY_SECONDS``
+(or the rest of its validity, if shorter) using a recent-scan set in this
+worker backed by the shared cache. When a booking's stay changes,
+``reissue()`` replaces its ticket; online scans refuse the superseded one,
+scanners verifying offline still accept it until its window ends. Scans are buffered in the worker and a
+background thread writes them every ``QR_SCAN_FLUSH_SECONDS`` with one
+``UPDATE`` per chunk of tickets for ``scan_count``, ``is_used`` and
+``used_at``. A worker that dies loses at most that much of the counts,
+never an admission decision.
+"""
+import atexit
+import base64
+import hashlib
+import hmac
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection as db_connection, transaction
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import QRTicket
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_BYTES = 12
+FLUSH_CHUNK_SIZE = 500
+
+Ticket = namedtuple('Ticket', ['ticket_id', 'booking_id', 'valid_from', 'valid_until'])
+
+ADMITTED = 'admitted'
+REPLAYED = 'replayed'
+INVALID = 'invalid'
+EXPIRED = 'expired'
+NOT_YET_VALID = 'not_yet_valid'
+SUPERSEDED = 'superseded'
+
+
+class InvalidTicket(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _signature(message):
+    digest = hmac.new(settings.QR_TICKET_SECRET.encode(), message.encode(), hashlib.sha256).digest()
+    return _b64(digest[:SIGNATURE_BYTES])
+
+
+def _seconds(moment):
+    return int(moment.timestamp())
+
+
+# ==================== TOKENS ====================
+def make_token(ticket_id, booking_id, valid_from, valid_until):
+    booking = _b64(uuid.UUID(str(booking_id)).bytes) if booking_id else ''
+    message = '.'.join([ticket_id, booking, format(_seconds(valid_from), 'x'), format(_seconds(valid_until), 'x')])
+    return f'{message}.{_signature(message)}'
+
+
+def verify(token, at=None):
+    """The ``Ticket`` in a token valid at ``at`` (default now); raises ``InvalidTicket``"""
+    try:
+        message, signature = token.strip().rsplit('.', 1)
+        ticket_id, booking, valid_from, valid_until = message.rsplit('.', 3)
+        if not hmac.compare_digest(signature, _signature(message)):
+            raise ValueError
+        booking_id = uuid.UUID(bytes=_unb64(booking)) if booking else None
+        valid_from = datetime.fromtimestamp(int(valid_from, 16), dt_timezone.utc)
+        valid_until = datetime.fromtimestamp(int(valid_until, 16), dt_timezone.utc)
+    except (AttributeError, ValueError):
+        raise InvalidTicket(INVALID, 'Not a valid ticket')
+    at = at or timezone.now()
+    if at < valid_from:
+        raise InvalidTicket(NOT_YET_VALID, f'Ticket is valid from {valid_from.isoformat()}')
+    if at >= valid_until:
+        raise InvalidTicket(EXPIRED, f'Ticket expired at {valid_until.isoformat()}')
+    return Ticket(ticket_id, booking_id, valid_from, valid_until)
+
+
+def _window(booking):
+    """From the start of the first day of the booking to the end of its last day"""
+    first = (booking.travel_date or booking.check_in_date) if booking else None
+    if first is None:
+        now = timezone.now()
+        return now, now + timedelta(seconds=settings.QR_TICKET_VALID_SECONDS)
+    last = booking.check_out_date or first
+    start = timezone.make_aware(datetime.combine(first, dt_time.min))
+    return start, timezone.make_aware(datetime.combine(last + timedelta(days=1), dt_time.min))
+
+
+def issue(user, booking=None, ticket_type='entry'):
+    """Create a ticket for ``booking`` (or a bare one valid for ``QR_TICKET_VALID_SECONDS``)"""
+    valid_from, valid_until = _window(booking)
+    ticket_id = uuid.uuid4().hex[:16]
+    return QRTicket.objects.create(
+        user=user, booking=booking, ticket_type=ticket_type, ticket_id=ticket_id,
+        qr_code=make_token(ticket_id, booking.pk if booking else None, valid_from, valid_until),
+        valid_from=valid_from, valid_until=valid_until,
+    )
+
+
+def ticket_for(booking):
+    """The booking's current ticket, issued on first request"""
+    ticket = QRTicket.objects.filter(booking=booking, superseded_at__isnull=True).order_by('-created_at').first()
+    return ticket or issue(booking.user, booking)
+
+
+def reissue(booking):
+    """A new ticket for the booking's current window; its earlier tickets are marked superseded"""
+    with transaction.atomic():
+        QRTicket.objects.filter(booking=booking, superseded_at__isnull=True).update(superseded_at=timezone.now())
+        return issue(booking.user, booking)
+
+
+# ==================== SCANNING ====================
+_recent = OrderedDict()   # ticket id -> monotonic time the replay window ends
+_recent_lock = threading.Lock()
+
+
+def _first_admission(ticket, at):
+    """False if the ticket was admitted within the replay window"""
+    window = min(settings.QR_SCAN_REPLAY_SECONDS, (ticket.valid_until - at).total_seconds())
+    now = time.monotonic()
+    with _recent_lock:
+        until = _recent.get(ticket.ticket_id)
+        if until is not None and until > now:
+            return False
+        _recent[ticket.ticket_id] = now + window
+        _recent.move_to_end(ticket.ticket_id)
+        while len(_recent) > settings.QR_SCAN_RECENT_ENTRIES:
+            _recent.popitem(last=False)
+    # Other workers admit through the same gate
+    return cache.add(f'ticket-scan:{ticket.ticket_id}', 1, timeout=max(int(window), 1))
+
+
+def _superseded(ticket_id):
+    """True if the ticket was replaced; an unreachable database counts as not (the offline rule)"""
+    try:
+        return QRTicket.objects.filter(ticket_id=ticket_id, superseded_at__isnull=False).exists()
+    except DatabaseError:
+        logger.warning("Could not check ticket %s for a replacement", ticket_id)
+        return False
+
+
+def scan(token, scanned_at=None):
+    """Check a token at the gate; returns ``{'status', ...}`` and buffers the scan"""
+    scanned_at = scanned_at or timezone.now()
+    try:
+        ticket = verify(token, scanned_at)
+    except InvalidTicket as e:
+        return {'status': e.status, 'error': str(e)}
+    if _superseded(ticket.ticket_id):
+        return {'status': SUPERSEDED, 'error': 'Ticket was replaced by a newer one for this booking',
+                'ticket_id': ticket.ticket_id}
+    admitted = _first_admission(ticket, scanned_at)
+    _record(ticket.ticket_id, scanned_at if admitted else None)
+    return {
+        'status': ADMITTED if admitted else REPLAYED,
+        'ticket_id': ticket.ticket_id,
+        'booking_id': ticket.booking_id,
+        'valid_until': ticket.valid_until,
+    }
+
+
+# ==================== SCAN BUFFER ====================
+_pending = {}   # ticket id -> [scans, first admission or None]
+_pending_lock = threading.Lock()
+_flusher = None
+
+
+def _record(ticket_id, admitted_at):
+    _add({ticket_id: (1, admitted_at)})
+    _ensure_flusher()
+
+
+def _add(batch):
+    with _pending_lock:
+        for ticket_id, (scans, admitted_at) in batch.items():
+            entry = _pending.setdefault(ticket_id, [0, None])
+            entry[0] += scans
+            if admitted_at is not None and (entry[1] is None or admitted_at < entry[1]):
+                entry[1] = admitted_at
+
+
+def _write(batch):
+    changes = {'scan_count': F('scan_count') + Case(
+        *[When(ticket_id=ticket_id, then=Value(scans)) for ticket_id, (scans, _) in batch.items()],
+        default=Value(0),
+    )}
+    admitted = {ticket_id: at for ticket_id, (_, at) in batch.items() if at is not None}
+    if admitted:
+        changes['used_at'] = Coalesce(F('used_at'), Case(
+            *[When(ticket_id=ticket_id, then=Value(at)) for ticket_id, at in admitted.items()],
+            default=Value(None), output_field=DateTimeField(),
+        ))
+        changes['is_used'] = Case(When(ticket_id__in=list(admitted), then=Value(True)), default=F('is_used'))
+    return QRTicket.objects.filter(ticket_id__in=list(batch)).update(**changes)
+
+
+def flush():
+    """Write the buffered scans, one ``UPDATE`` per chunk of tickets; returns how many tickets were updated"""
+    global _pending
+    with _pending_lock:
+        pending, _pending = _pending, {}
+    items = list(pending.items())
+    updated = 0
+    for start in range(0, len(items), FLUSH_CHUNK_SIZE):
+        batch = dict(items[start:start + FLUSH_CHUNK_SIZE])
+        try:
+            with transaction.atomic():
+                updated += _write(batch)
+        except DatabaseError:
+            logger.exception("Writing %s ticket scans failed; will retry", len(batch))
+            _add(dict(items[start:]))
+            break
+    return updated
+
+
+def _flush_forever():
+    while True:
+        time.sleep(settings.QR_SCAN_FLUSH_SECONDS)
+        try:
+            flush()
+        finally:
+            db_connection.close()
+
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _pending_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_forever, name='ticket-scan-flush', daemon=True)
+            _flusher.start()
+            atexit.register(flush)
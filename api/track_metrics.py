@@ -0,0 +1,120 @@
+"""
+Distance, speed and idle time for GPS tracks, computed with NumPy.
+
+A track is three arrays sorted by time: epoch seconds, latitudes and
+longitudes. Segment lengths come from a vectorised haversine, so a
+100k-point trip is summarised in a few milliseconds once it is loaded.
+
+Segments slower than ``IDLE_SPEED_MPS`` are idle (GPS jitter while
+standing still) and are excluded from the distance, as are segments faster
+than ``MAX_SPEED_MPS``, which are position glitches and count as neither
+moving nor idle time. ``append_distance()``
+applies the same rule to a new batch so ``TripTrack.total_distance`` can be
+kept up to date without reloading the trip.
+"""
+import numpy as np
+
+from . import gps_retention
+from .models import GPSLocation
+
+EARTH_RADIUS_M = 6371008.8
+IDLE_SPEED_MPS = 0.5
+MAX_SPEED_MPS = 340.0
+MIN_IDLE_SECONDS = 60
+MAX_IDLE_PERIODS = 100
+
+
+def load_track(trip_id):
+    """``(seconds, lat, lon)`` arrays for a trip's points in time order"""
+    archived = gps_retention.archived_track(trip_id)
+    if archived is not None:
+        return archived
+    queryset = GPSLocation.objects.filter(trip_id=trip_id).order_by('timestamp')
+    rows = list(queryset.values_list('timestamp', 'latitude', 'longitude').iterator(chunk_size=10000))
+    return (
+        np.fromiter((row[0].timestamp() for row in rows), dtype=np.float64, count=len(rows)),
+        np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows)),
+        np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows)),
+    )
+
+
+def segment_lengths(lat, lon):
+    """Haversine length in metres of each consecutive segment"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    dlat, dlon = np.diff(lat), np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def segments(seconds, lat, lon):
+    """``(lengths, durations, speeds, moving)`` per segment"""
+    lengths = segment_lengths(lat, lon)
+    durations = np.diff(seconds)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speeds = np.where(durations > 0, lengths / durations, 0.0)
+    moving = (speeds >= IDLE_SPEED_MPS) & (speeds <= MAX_SPEED_MPS)
+    return lengths, durations, speeds, moving
+
+
+def _idle_periods(seconds, idle):
+    """Runs of idle segments lasting at least ``MIN_IDLE_SECONDS`` as ``[(start, end)]`` epoch seconds"""
+    idle = np.concatenate(([0], idle.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(idle))
+    starts, ends = edges[::2], edges[1::2]
+    periods = [
+        (float(seconds[start]), float(seconds[end]))
+        for start, end in zip(starts, ends)
+        if seconds[end] - seconds[start] >= MIN_IDLE_SECONDS
+    ]
+    return periods[:MAX_IDLE_PERIODS]
+
+
+def summarize(seconds, lat, lon):
+    """Distance, moving/idle time and speeds for a whole track"""
+    if len(seconds) < 2:
+        return {
+            'points': int(len(seconds)), 'distance_km': 0.0, 'duration_seconds': 0.0,
+            'moving_seconds': 0.0, 'idle_seconds': 0.0, 'glitch_seconds': 0.0, 'max_speed_kmh': 0.0,
+            'average_moving_speed_kmh': 0.0, 'idle_periods': [],
+        }
+    lengths, durations, speeds, moving = segments(seconds, lat, lon)
+    idle = speeds < IDLE_SPEED_MPS
+    distance = float(lengths[moving].sum())
+    moving_seconds = float(durations[moving].sum())
+    return {
+        'points': int(len(seconds)),
+        'distance_km': distance / 1000,
+        'duration_seconds': float(seconds[-1] - seconds[0]),
+        'moving_seconds': moving_seconds,
+        'idle_seconds': float(durations[idle].sum()),
+        'glitch_seconds': float(durations[speeds > MAX_SPEED_MPS].sum()),
+        'max_speed_kmh': float(speeds[moving].max() * 3.6) if moving.any() else 0.0,
+        'average_moving_speed_kmh': distance / moving_seconds * 3.6 if moving_seconds else 0.0,
+        'idle_periods': _idle_periods(seconds, idle),
+    }
+
+
+def track_distance_km(seconds, lat, lon):
+    if len(seconds) < 2:
+        return 0.0
+    lengths, _, _, moving = segments(seconds, lat, lon)
+    return float(lengths[moving].sum()) / 1000
+
+
+def append_distance(previous, rows):
+    """
+    Distance in km added by ``rows`` (``(datetime, lat, lon, ...)`` tuples,
+    all later than the trip's last stored point) joined onto ``previous``,
+    that point's ``(datetime, lat, lon)`` or ``None`` for a new trip.
+    """
+    rows = sorted(rows, key=lambda row: row[0])
+    if previous is not None:
+        rows.insert(0, previous)
+    seconds = np.array([row[0].timestamp() for row in rows], dtype=np.float64)
+    lat = np.array([row[1] for row in rows], dtype=np.float64)
+    lon = np.array([row[2] for row in rows], dtype=np.float64)
+    return track_distance_km(seconds, lat, lon)
+
+
+def recompute_distance(trip_id):
+    return track_distance_km(*load_track(trip_id))
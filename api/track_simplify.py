@@ -0,0 +1,120 @@
+"""
+Simplified, polyline-encoded trip tracks for the map.
+
+Tracks are simplified with Douglas-Peucker at a tolerance of about one
+screen pixel for the requested zoom level, then encoded with the Google
+encoded-polyline algorithm (1e-5 degree precision), which most map
+libraries decode natively. The result for each ``(trip, zoom)`` is cached;
+appending points to a trip bumps its version, which orphans the old
+entries.
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from . import track_metrics
+
+EARTH_RADIUS_M = track_metrics.EARTH_RADIUS_M
+METRES_PER_PIXEL_Z0 = 156543.03392
+MIN_ZOOM, MAX_ZOOM = 0, 20
+MIN_TOLERANCE_M = 1.0
+
+
+def tolerance_for_zoom(zoom, latitude=0.0):
+    """Ground size in metres of one screen pixel at ``zoom`` (Web Mercator)"""
+    return max(METRES_PER_PIXEL_Z0 * np.cos(np.radians(latitude)) / 2 ** zoom, MIN_TOLERANCE_M)
+
+
+def _project(lat, lon):
+    """Equirectangular metres around the track's mean latitude; accurate enough at trip scale"""
+    lat0 = np.radians(lat.mean())
+    return (
+        np.radians(lon) * EARTH_RADIUS_M * np.cos(lat0),
+        np.radians(lat) * EARTH_RADIUS_M,
+    )
+
+
+def douglas_peucker(x, y, tolerance):
+    """Indices of the points kept, in order"""
+    n = len(x)
+    if n < 3:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(px, py)
+        else:
+            distances = np.abs(dx * py - dy * px) / length
+        offset = int(distances.argmax())
+        if distances[offset] > tolerance:
+            split = start + 1 + offset
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return np.flatnonzero(keep)
+
+
+def encode_polyline(lat, lon, precision=5):
+    """Google encoded polyline for the given coordinate arrays"""
+    factor = 10 ** precision
+    points = np.column_stack((np.round(lat * factor), np.round(lon * factor))).astype(np.int64)
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    chunks = []
+    for value in ((deltas << 1) ^ (deltas >> 63)).tolist():
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return ''.join(chunks)
+
+
+def simplify(lat, lon, zoom):
+    """``(polyline, kept points, tolerance in metres)`` for arrays of a track in time order"""
+    if not len(lat):
+        return '', 0, 0.0
+    tolerance = tolerance_for_zoom(zoom, float(lat.mean()))
+    x, y = _project(lat, lon)
+    kept = douglas_peucker(x, y, tolerance)
+    return encode_polyline(lat[kept], lon[kept]), len(kept), float(tolerance)
+
+
+# ==================== CACHE ====================
+def _version_key(trip_id):
+    return f'track:{trip_id}:version'
+
+
+def simplified_track(trip_id, zoom):
+    """The cached simplified track for ``trip_id`` at ``zoom``, built on a miss"""
+    version = cache.get(_version_key(trip_id), 0)
+    key = f'track:{trip_id}:v{version}:z{zoom}'
+    track = cache.get(key)
+    if track is None:
+        _, lat, lon = track_metrics.load_track(trip_id)
+        polyline, kept, tolerance = simplify(lat, lon, zoom)
+        track = {
+            'zoom': zoom,
+            'tolerance_m': round(tolerance, 2),
+            'points': len(lat),
+            'simplified_points': kept,
+            'polyline': polyline,
+        }
+        cache.set(key, track, timeout=settings.TRACK_CACHE_SECONDS)
+    return track
+
+
+def invalidate(trip_id):
+    """Drop every cached zoom level of a trip (call after its points change)"""
+    key = _version_key(trip_id)
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
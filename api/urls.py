@@ -1,6 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserViewSet, DestinationViewSet, HotelViewSet, BookingViewSet
+from .views import (
+    UserViewSet, DestinationViewSet, HotelViewSet, BookingViewSet, TripTrackViewSet, booking_analytics, health,
+    gallery_nearby, saved_places_nearby, release_room_hold, scan_tickets, weather_info, forecast,
+    weather_batch
+)
 
 # ----------------------
 # API Router
@@ -10,10 +14,20 @@ router.register(r'users', UserViewSet, basename='user')
 router.register(r'destinations', DestinationViewSet)
 router.register(r'hotels', HotelViewSet)
 router.register(r'bookings', BookingViewSet, basename='booking')
+router.register(r'trips', TripTrackViewSet, basename='trips')
 
 # ----------------------
 # URL Patterns
 # ----------------------
 urlpatterns = [
     path('', include(router.urls)),
+    path('analytics/bookings/', booking_analytics, name='booking-analytics'),
+    path('health/', health, name='health'),
+    path('gallery/nearby/', gallery_nearby, name='gallery-nearby'),
+    path('saved-places/nearby/', saved_places_nearby, name='saved-places-nearby'),
+    path('room-holds/<uuid:hold_id>/', release_room_hold, name='room-hold'),
+    path('tickets/scan/', scan_tickets, name='ticket-scan'),
+    path('weather/', weather_info, name='weather-info'),
+    path('weather/forecast/', forecast, name='weather-forecast'),
+    path('weather/batch/', weather_batch, name='weather-batch'),
 ]
@@ -7,7 +7,7 @@ from .views_extended import (
     ExpenseCategoryViewSet, ExpenseViewSet, ExpenseBudgetViewSet,
     TravelChecklistViewSet, ChecklistItemViewSet,
     ReferralCodeViewSet, ReferralViewSet,
-    weather_info, forecast,
+    weather_info, forecast, weather_batch,
     expense_tracker, checklist_view, referral_view, map_tracking_view, weather_view
 )
 
@@ -31,6 +31,7 @@ urlpatterns = [
     # Weather endpoints
     path('weather/', weather_info, name='weather-info'),
     path('weather/forecast/', forecast, name='weather-forecast'),
+    path('weather/batch/', weather_batch, name='weather-batch'),
     
     # Page views
     path('expense-tracker/', expense_tracker, name='expense-tracker'),
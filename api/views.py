@@ -1,32 +1,178 @@
-from datetime import datetime
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
 
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.db.models import Q
 from django.shortcuts import render, redirect
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from pymongo.errors import PyMongoError
 
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
 from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.authtoken.models import Token as AuthToken
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
+from . import (
+    analytics, autocomplete, availability, bookings, facets, geo, gps, home_feed, idempotency, inventory, mirror,
+    search, tickets, track_metrics, track_simplify, weather,
+)
 from .models import Booking
+from .fast_list import FastListMixin
+from .fieldsets import SparseQuerysetMixin
+from .pagination import CreatedCursorPagination
 
-from .db import (
-    db, tours_collection, users_collection, bookings_collection, 
-    reviews_collection
-)
-from .models import Destination, Hotel
+from .db import connection
+from .models import Destination, Hotel, TripTrack
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, DestinationSerializer,
-    HotelSerializer, BookingSerializer
+    HotelSerializer, BookingSerializer, BulkBookingSerializer, QRTicketSerializer, RoomHoldSerializer,
+    TripTrackSerializer,
 )
 
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+AUTOCOMPLETE_MAX_LIMIT = 20
+NEARBY_DEFAULT_K = 10
+NEARBY_MAX_RESULTS = 100
+NEARBY_MAX_RADIUS_KM = 500
+
+
+def _page_params(request):
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = min(max(int(request.query_params.get('page_size', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError:
+        page, page_size = 1, SEARCH_PAGE_SIZE
+    return page, page_size
+
+
+def _page_response(viewset, request, ids, total, page, page_size, **extra):
+    """Serialize the objects for ``ids`` in that order, with page links"""
+    found = {str(pk): obj for pk, obj in viewset.get_queryset().in_bulk(ids).items()}
+    results = [found[object_id] for object_id in ids if object_id in found]
+
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) if page * page_size < total else None
+    if page <= 1:
+        previous_url = None
+    elif page == 2:
+        previous_url = remove_query_param(url, 'page')
+    else:
+        previous_url = replace_query_param(url, 'page', page - 1)
+
+    return Response({
+        'count': total,
+        'next': next_url,
+        'previous': previous_url,
+        'results': viewset.get_serializer(results, many=True).data,
+        **extra,
+    })
+
+
+def ranked_search_response(viewset, request, query):
+    """
+    Paginated, relevance-ordered results from the full-text index, or
+    ``None`` when the database has no search backend.
+    """
+    backend = search.get_backend()
+    if backend is None:
+        return None
+
+    page, page_size = _page_params(request)
+    model = viewset.get_queryset().model
+    ids, total = backend.search(model._meta.model_name, query, page_size, (page - 1) * page_size)
+    return _page_response(viewset, request, ids, total, page, page_size)
+
+
+def faceted_response(viewset, request):
+    """Filter by facet values (``?country=india&rating=4%2B``) and return the facet counts"""
+    kind = viewset.get_queryset().model._meta.model_name
+    filters = {facet: request.query_params.getlist(facet) for facet in facets.KINDS[kind].facets}
+    ordering = request.query_params.get('ordering', '-rating')
+    if ordering not in facets.orderings(kind):
+        return Response(
+            {'error': f"ordering must be one of: {', '.join(facets.orderings(kind))}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    page, page_size = _page_params(request)
+    ids, total, counts = facets.search(kind, filters, ordering, (page - 1) * page_size, page_size)
+    return _page_response(viewset, request, ids, total, page, page_size, facets=counts)
+
+
+def available_response(viewset, request):
+    """
+    Hotels with ``rooms`` rooms free on every night from ``check_in`` to
+    ``check_out`` for ``guests``, optionally in a ``city`` or ``destination``,
+    with the free rooms per room type.
+    """
+    params = request.query_params
+    check_in, check_out = parse_date(params.get('check_in') or ''), parse_date(params.get('check_out') or '')
+    if check_in is None or check_out is None:
+        return Response(
+            {'error': 'check_in and check_out dates (YYYY-MM-DD) are required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    page, page_size = _page_params(request)
+    try:
+        ids, total, rooms = availability.search(
+            check_in, check_out, int(params.get('rooms', 1)), int(params.get('guests', 1)),
+            city=params.get('city'), destination_id=params.get('destination'),
+            offset=(page - 1) * page_size, limit=page_size,
+        )
+    except (inventory.InventoryError, ValueError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return _page_response(viewset, request, ids, total, page, page_size, rooms=rooms)
+
+
+def nearby_response(request, kind, serialize, visible=Q(is_public=True), queryset=None):
+    """
+    Points of ``kind`` within ``radius_km`` of ``lat``/``lng``, or the ``k``
+    nearest (default 10), nearest first with ``distance_km`` on each result.
+    """
+    try:
+        latitude = float(request.query_params['lat'])
+        longitude = float(request.query_params['lng'])
+        radius = request.query_params.get('radius_km')
+        radius = float(radius) if radius else None
+        k = int(request.query_params.get('k', 0)) or None
+    except (KeyError, ValueError):
+        return Response(
+            {'error': 'lat and lng are required; radius_km and k must be numbers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return Response({'error': 'lat/lng out of range'}, status=status.HTTP_400_BAD_REQUEST)
+    if radius is not None and not 0 < radius <= NEARBY_MAX_RADIUS_KM:
+        return Response(
+            {'error': f'radius_km must be between 0 and {NEARBY_MAX_RADIUS_KM}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if radius is None and k is None:
+        k = NEARBY_DEFAULT_K
+    k = min(max(k or NEARBY_MAX_RESULTS, 1), NEARBY_MAX_RESULTS)
+
+    found = geo.nearby(kind, latitude, longitude, radius_km=radius, k=k, visible=visible)
+    distances = dict(found)
+    model = geo.SOURCES[kind][0]
+    queryset = model.objects.all() if queryset is None else queryset
+    objects = {str(pk): obj for pk, obj in queryset.in_bulk(list(distances)).items()}
+    ordered = [objects[object_id] for object_id, _ in found if object_id in objects]
+    results = serialize(ordered)
+    for item, obj in zip(results, ordered):
+        item['distance_km'] = round(distances[str(obj.pk)], 3)
+    return Response({'count': len(results), 'results': results})
+
 
 # ==================== AUTHENTICATION VIEWSETS ====================
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """User authentication and profile management"""
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -37,15 +183,9 @@ class UserViewSet(viewsets.ModelViewSet):
         """Register new user"""
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-            users_collection.insert_one({
-                "user_id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "full_name": f"{user.first_name} {user.last_name}".strip(),
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            })
+            with transaction.atomic():
+                user = serializer.save()
+                mirror.save(user, created=True)
             return Response(
                 {
                     'message': 'User registered successfully',
@@ -106,7 +246,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
 
 # ==================== DESTINATION VIEWSETS ====================
-class DestinationViewSet(viewsets.ModelViewSet):
+class DestinationViewSet(FastListMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """CRUD operations for Destinations"""
     queryset = Destination.objects.all()
     serializer_class = DestinationSerializer
@@ -115,45 +255,85 @@ class DestinationViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'rating', 'average_cost']
     ordering = ['-created_at']
     permission_classes = [AllowAny]
+    throttle_scope = None  # set by the autocomplete action
 
     def create(self, request, *args, **kwargs):
         """Create new destination - stores in both Django and MongoDB"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        instance = serializer.save()
-        
-        tours_collection.insert_one({
-            "type": "destination",
-            "django_id": str(instance.id),
-            "name": instance.name,
-            "city": instance.city,
-            "state": instance.state,
-            "country": instance.country,
-            "rating": instance.rating,
-            "average_cost": str(instance.average_cost),
-            "created_at": datetime.utcnow(),
-        })
+        with transaction.atomic():
+            instance = serializer.save()
+            mirror.save(instance, created=True)
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            instance = serializer.save()
+            mirror.save(instance)
+
     def destroy(self, request, *args, **kwargs):
         """Delete destination"""
         instance = self.get_object()
-        id_to_delete = instance.id
-        self.perform_destroy(instance)
-        tours_collection.delete_one({"django_id": str(id_to_delete), "type": "destination"})
+        with transaction.atomic():
+            mirror.delete(instance)
+            self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Full-text search over destinations, best match first"""
+        query = request.query_params.get('q', '')
+        if not query:
+            return Response(
+                {'error': 'Please provide a search query'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response = ranked_search_response(self, request, query)
+        if response is not None:
+            return response
+
+        destinations = self.get_queryset().filter(
+            Q(name__icontains=query) |
+            Q(city__icontains=query) |
+            Q(state__icontains=query) |
+            Q(country__icontains=query)
+        )
+        serializer = self.get_serializer(destinations, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], throttle_classes=[ScopedRateThrottle],
+            throttle_scope='autocomplete')
+    def autocomplete(self, request):
+        """Per-keystroke suggestions over destination, hotel and city names"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), AUTOCOMPLETE_MAX_LIMIT)
+        except ValueError:
+            limit = 10
+        return Response({'results': autocomplete.suggest(request.query_params.get('q', ''), limit)})
+
+    @action(detail=False, methods=['get'], url_path='facets')
+    def faceted(self, request):
+        """Filter destinations by country, state, price and rating with facet counts"""
+        return faceted_response(self, request)
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """Destinations within radius_km of lat/lng, or the k nearest"""
+        return nearby_response(request, 'destination', lambda objects: self.get_serializer(objects, many=True).data,
+                               queryset=self.get_queryset())
+
     @action(detail=False, methods=['get'])
     def popular(self, request):
         """Get most popular destinations by rating"""
-        destinations = Destination.objects.filter(rating__gte=4).order_by('-rating')[:10]
+        destinations = self.get_queryset().filter(rating__gte=4).order_by('-rating')[:10]
         serializer = self.get_serializer(destinations, many=True)
         return Response(serializer.data)
 
 
 # ==================== HOTEL VIEWSETS ====================
-class HotelViewSet(viewsets.ModelViewSet):
+class HotelViewSet(FastListMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """CRUD operations for Hotels"""
     queryset = Hotel.objects.all()
     serializer_class = HotelSerializer
@@ -167,72 +347,497 @@ class HotelViewSet(viewsets.ModelViewSet):
         """Create new hotel"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        instance = serializer.save()
-        
-        tours_collection.insert_one({
-            "type": "hotel",
-            "django_id": str(instance.id),
-            "name": instance.name,
-            "city": instance.city,
-            "price_per_night": str(instance.price_per_night),
-            "rating": instance.rating,
-            "created_at": datetime.utcnow(),
-        })
+        with transaction.atomic():
+            instance = serializer.save()
+            mirror.save(instance, created=True)
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            instance = serializer.save()
+            mirror.save(instance)
+
     def destroy(self, request, *args, **kwargs):
         """Delete hotel"""
         instance = self.get_object()
-        id_to_delete = instance.id
-        self.perform_destroy(instance)
-        tours_collection.delete_one({"django_id": str(id_to_delete), "type": "hotel"})
+        with transaction.atomic():
+            mirror.delete(instance)
+            self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Full-text search over hotels, best match first"""
+        query = request.query_params.get('q', '')
+        if not query:
+            return Response(
+                {'error': 'Please provide a search query'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response = ranked_search_response(self, request, query)
+        if response is not None:
+            return response
+
+        hotels = self.get_queryset().filter(
+            Q(name__icontains=query) | Q(city__icontains=query)
+        )
+        serializer = self.get_serializer(hotels, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """Hotels within radius_km of lat/lng, or the k nearest"""
+        return nearby_response(request, 'hotel', lambda objects: self.get_serializer(objects, many=True).data,
+                               queryset=self.get_queryset())
+
+    @action(detail=False, methods=['get'], url_path='facets')
+    def faceted(self, request):
+        """Filter hotels by city, price, rating, amenities and availability with facet counts"""
+        return faceted_response(self, request)
+
     @action(detail=False, methods=['get'])
     def available(self, request):
-        """Get hotels with available rooms"""
-        hotels = Hotel.objects.filter(available_rooms__gt=0).order_by('-rating')
+        """Hotels with rooms free for a stay when check_in/check_out are given, else any available rooms"""
+        if 'check_in' in request.query_params or 'check_out' in request.query_params:
+            return available_response(self, request)
+        hotels = self.get_queryset().filter(available_rooms__gt=0).order_by('-rating')
         serializer = self.get_serializer(hotels, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def availability(self, request, pk=None):
+        """Rooms free on every night from check_in to check_out, per room type"""
+        hotel = self.get_object()
+        try:
+            check_in, check_out = _stay_params(request.query_params)
+            rooms = inventory.available(hotel, check_in, check_out)
+        except (inventory.InventoryError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'check_in': check_in, 'check_out': check_out, 'rooms': rooms})
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def hold(self, request, pk=None):
+        """Hold rooms while the user checks out; pass the hold's id as hold_id when booking"""
+        hotel = self.get_object()
+        try:
+            check_in, check_out = _stay_params(request.data)
+            rooms = int(request.data.get('rooms', 1))
+            held = inventory.hold(hotel, request.data.get('room_type') or inventory.DEFAULT_ROOM_TYPE,
+                                  check_in, check_out, rooms, request.user)
+        except inventory.Unavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except (inventory.InventoryError, TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(RoomHoldSerializer(held).data, status=status.HTTP_201_CREATED)
+
+
+def _stay_params(params):
+    check_in, check_out = parse_date(params.get('check_in') or ''), parse_date(params.get('check_out') or '')
+    if check_in is None or check_out is None:
+        raise ValueError('check_in and check_out dates (YYYY-MM-DD) are required')
+    return check_in, check_out
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+def release_room_hold(request, hold_id):
+    """Give back rooms held for a checkout that was abandoned"""
+    if not inventory.release(hold_id, user=request.user):
+        return Response({'error': 'No active hold with that id'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 # ==================== BOOKING VIEWSETS ====================
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """CRUD operations for Bookings"""
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [OrderingFilter]
     ordering_fields = ['created_at', 'total_price']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    pagination_class = CreatedCursorPagination
 
     def get_queryset(self):
-        return Booking.objects.filter(user=self.request.user)
+        return self.narrow(Booking.objects.filter(user=self.request.user))
+
+    def _page(self, queryset):
+        page = self.paginate_queryset(self.filter_queryset(queryset))
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
 
     def create(self, request, *args, **kwargs):
-        """Create new booking"""
+        """Create new booking; hotel bookings take their rooms from a hold_id or straight from inventory"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        instance = serializer.save(user=request.user)
-        
-        booking_data = {
-            "user_id": str(request.user.id),
-            "booking_type": instance.booking_type,
-            "django_booking_id": str(instance.id),
-            "total_price": str(instance.total_price),
-            "status": instance.booking_status,
-            "booking_date": datetime.utcnow(),
-        }
-        bookings_collection.insert_one(booking_data)
+        try:
+            with transaction.atomic():
+                instance = serializer.save(user=request.user)
+                inventory.take_for_booking(instance, request.data.get('hold_id'), request.data.get('room_type'))
+                mirror.save(instance, created=True)
+                analytics.record_booking(None, analytics.snapshot(instance))
+        except inventory.Unavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except inventory.InventoryError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create several bookings (e.g. a trip's hotel, cab and guide) all or
+        nothing; a retry with the same Idempotency-Key replays the response.
+        """
+        key = request.headers.get(idempotency.HEADER)
+        if key is not None and not 0 < len(key) <= idempotency.MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{idempotency.HEADER} must be 1-{idempotency.MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            with transaction.atomic():
+                record, replay = idempotency.claim(request, key) if key else (None, None)
+                if replay is not None:
+                    return replay
+                serializer = BulkBookingSerializer(data=request.data, context=self.get_serializer_context())
+                serializer.is_valid(raise_exception=True)
+                created = bookings.create_many(request.user, serializer.validated_data['bookings'])
+                response = Response({'bookings': BookingSerializer(created, many=True).data},
+                                    status=status.HTTP_201_CREATED)
+                if record is not None:
+                    idempotency.remember(record, response)
+        except idempotency.KeyReused as e:
+            return Response({'error': str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        except inventory.Unavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except inventory.InventoryError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return response
+
+    def update(self, request, *args, **kwargs):
+        """Update a booking; a changed stay moves its rooms, 409 if the new nights are full"""
+        try:
+            return super().update(request, *args, **kwargs)
+        except inventory.Unavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except inventory.InventoryError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    def perform_update(self, serializer):
+        before = analytics.snapshot(serializer.instance)
+        was_cancelled = serializer.instance.booking_status == 'cancelled'
+        stay = inventory.stay(serializer.instance)
+        room_type = self.request.data.get('room_type')
+        with transaction.atomic():
+            instance = serializer.save()
+            if instance.booking_status == 'cancelled':
+                if not was_cancelled:
+                    inventory.cancel(instance)
+            elif was_cancelled or room_type or inventory.stay(instance) != stay:
+                inventory.rebook(instance, room_type)
+            mirror.save(instance)
+            analytics.record_booking(before, analytics.snapshot(instance))
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            inventory.cancel(instance)
+            mirror.delete(instance)
+            analytics.record_booking(analytics.snapshot(instance), None)
+            instance.delete()
+
+    @action(detail=True, methods=['get'])
+    def ticket(self, request, pk=None):
+        """The booking's QR ticket; its qr_code is a signed token gates verify offline"""
+        return Response(QRTicketSerializer(tickets.ticket_for(self.get_object())).data)
+
     @action(detail=False, methods=['get'])
     def my_bookings(self, request):
         """Get all bookings for current user"""
-        bookings = self.get_queryset()
-        serializer = self.get_serializer(bookings, many=True)
-        return Response(serializer.data)
+        return self._page(self.get_queryset())
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def scan_tickets(request):
+    """
+    Gate scans: ``{"token": ...}``, or ``{"scans": [{"token", "scanned_at"}]}``
+    uploaded by a scanner that verified them offline. Each result's status is
+    admitted, replayed, invalid, expired, not_yet_valid or superseded.
+    """
+    scans = request.data.get('scans')
+    if scans is None:
+        scans = [request.data]
+    if not isinstance(scans, list) or len(scans) > settings.QR_SCAN_MAX_BATCH:
+        return Response(
+            {'error': f'scans must be a list of at most {settings.QR_SCAN_MAX_BATCH} items'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    results = []
+    for item in scans:
+        try:
+            token = item['token']
+            scanned_at = _parse_moment(item['scanned_at']) if item.get('scanned_at') else None
+        except (KeyError, TypeError, ValueError):
+            results.append({'status': tickets.INVALID, 'error': 'Each scan needs a token and an ISO scanned_at'})
+            continue
+        results.append(tickets.scan(token, scanned_at))
+    if 'scans' not in request.data:
+        return Response(results[0])
+    return Response({'results': results})
+
+
+# ==================== ANALYTICS ====================
+def _parse_moment(value):
+    """Accept an ISO date or datetime query parameter"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value}')
+        moment = datetime.combine(day, datetime.min.time())
+    if timezone.is_naive(moment):
+        moment = moment.replace(tzinfo=dt_timezone.utc)
+    return moment
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def booking_analytics(request):
+    """Booking counts and revenue per hour/day, served from the Mongo rollups"""
+    granularity = request.query_params.get('granularity', 'day')
+    if granularity not in analytics.GRANULARITIES:
+        return Response(
+            {'error': 'granularity must be hour or day'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    now = timezone.now()
+    try:
+        end = _parse_moment(request.query_params['end']) if 'end' in request.query_params else now
+        start = (_parse_moment(request.query_params['start']) if 'start' in request.query_params
+                 else end - timedelta(days=7))
+        if start >= end:
+            raise ValueError('start must be before end')
+        data = analytics.booking_rollups(start, end, granularity)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except PyMongoError as e:
+        return Response(
+            {'mongo': 'unavailable', 'error': str(e)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    return Response(data)
+
+
+# ==================== HEALTH CHECK ====================
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def health(request):
+    """Liveness probe for the MongoDB connection"""
+    ok, latency_ms, error = connection.ping()
+    if not ok:
+        return Response(
+            {'mongo': 'unavailable', 'error': error},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    return Response({'mongo': 'ok', 'latency_ms': round(latency_ms, 2)})
+
+
+# ==================== NEARBY ====================
+def _located(objects, fields):
+    return [{field: getattr(obj, field) for field in fields} for obj in objects]
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def gallery_nearby(request):
+    """Public gallery photos (and the caller's own) near a point"""
+    visible = Q(is_public=True)
+    if request.user.is_authenticated:
+        visible |= Q(owner_id=request.user.id)
+    fields = ['id', 'user_id', 'title', 'location', 'latitude', 'longitude',
+              'image_url', 'thumbnail_url', 'date_taken']
+    return nearby_response(request, 'gallery', lambda objects: _located(objects, fields), visible)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def saved_places_nearby(request):
+    """The caller's saved places near a point"""
+    fields = ['id', 'name', 'place_id', 'address', 'latitude', 'longitude', 'place_type', 'rating', 'photo_url']
+    return nearby_response(request, 'savedplace', lambda objects: _located(objects, fields),
+                           Q(owner_id=request.user.id))
+
+
+# ==================== TRIP TRACKS ====================
+class TripTrackViewSet(viewsets.ModelViewSet):
+    """The user's trips: start, end, GPS point ingestion, stats and map tracks"""
+    serializer_class = TripTrackSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return TripTrack.objects.filter(user=self.request.user).order_by('-start_time')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def end(self, request, pk=None):
+        """Stop the trip; a trip with no points ends where and when it started"""
+        trip = self.get_object()
+        if not trip.is_active:
+            return Response({'error': 'Trip has already ended'}, status=status.HTTP_409_CONFLICT)
+        trip.is_active = False
+        if trip.end_time is None:
+            trip.end_time = timezone.now()
+            trip.end_latitude, trip.end_longitude = trip.start_latitude, trip.start_longitude
+        trip.save(update_fields=['is_active', 'end_time', 'end_latitude', 'end_longitude'])
+        return Response(self.get_serializer(trip).data)
+
+    @action(detail=True, methods=['post'], parser_classes=[gps.GzipJSONParser])
+    def points(self, request, pk=None):
+        """Ingest a batch of columnar GPS points (optionally gzip-encoded) for this trip"""
+        trip = self.get_object()
+        if not trip.is_active:
+            return Response({'error': 'Trip has ended'}, status=status.HTTP_409_CONFLICT)
+        try:
+            result = gps.ingest(trip, request.data, request.headers.get('Idempotency-Key'))
+        except gps.BatchError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        code = status.HTTP_200_OK if result['duplicate'] else status.HTTP_201_CREATED
+        return Response(result, status=code)
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """Distance, moving/idle time and speeds; ?segments=1 adds per-segment speeds"""
+        trip = self.get_object()
+        seconds, lat, lon = track_metrics.load_track(trip.pk)
+        summary = track_metrics.summarize(seconds, lat, lon)
+        summary['idle_periods'] = [
+            {
+                'start': datetime.fromtimestamp(start, tz=dt_timezone.utc),
+                'end': datetime.fromtimestamp(end, tz=dt_timezone.utc),
+            }
+            for start, end in summary['idle_periods']
+        ]
+        if request.query_params.get('segments') and len(seconds) > 1:
+            _, _, speeds, moving = track_metrics.segments(seconds, lat, lon)
+            summary['segment_speeds_kmh'] = (speeds * 3.6).round(2).tolist()
+            summary['segment_moving'] = moving.tolist()
+        return Response(summary)
+
+    @action(detail=True, methods=['get'])
+    def track(self, request, pk=None):
+        """The trip simplified for a map zoom level (?zoom=0-20) as an encoded polyline"""
+        trip = self.get_object()
+        try:
+            zoom = int(request.query_params.get('zoom', 14))
+        except ValueError:
+            return Response({'error': 'zoom must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        zoom = min(max(zoom, track_simplify.MIN_ZOOM), track_simplify.MAX_ZOOM)
+        return Response({'trip': trip.pk, **track_simplify.simplified_track(trip.pk, zoom)})
+
+
+# ==================== WEATHER ====================
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def weather_info(request):
+    city = request.query_params.get('city')
+    destination_id = request.query_params.get('destination_id')
+    
+    if destination_id:
+        try:
+            destination_id = uuid.UUID(destination_id)
+        except ValueError:
+            return Response({'error': 'destination_id must be a UUID'}, status=status.HTTP_400_BAD_REQUEST)
+        destination = Destination.objects.filter(id=destination_id).first()
+        if destination:
+            city = destination.city
+    
+    if not city or not weather.city_key(city):
+        return Response({'error': 'City parameter required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(weather.get_current(city))
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def forecast(request):
+    """Get weather forecast for destination"""
+    city = request.query_params.get('city')
+    try:
+        days = int(request.query_params.get('days', 7))
+    except ValueError:
+        return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    days = max(1, min(days, settings.WEATHER_FORECAST_DAYS))
+    
+    if not city or not weather.city_key(city):
+        return Response({'error': 'City parameter required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'city': city,
+        'forecast': weather.get_forecast(city, days)
+    })
+
+
+def _batch_list(request, name):
+    """A list from a JSON body (POST) or a comma-separated query parameter (GET)"""
+    if request.method == 'POST':
+        value = request.data.get(name) or []
+        if not isinstance(value, list):
+            raise ValueError(f'{name} must be a list')
+        return value
+    return [part for part in request.query_params.get(name, '').split(',') if part.strip()]
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def weather_batch(request):
+    """
+    Current weather, and ``days`` of forecast, for several cities and/or
+    destinations in one call: ``?cities=Goa,Jaipur&destination_ids=<uuid>,<uuid>&days=5``
+    or the same keys in a JSON body. ``days=0`` (the default) skips forecasts.
+    """
+    params = request.data if request.method == 'POST' else request.query_params
+    try:
+        cities = [str(city) for city in _batch_list(request, 'cities')]
+        destination_ids = [uuid.UUID(str(pk)) for pk in _batch_list(request, 'destination_ids')]
+        days = int(params.get('days', 0))
+    except (TypeError, ValueError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    days = max(0, min(days, settings.WEATHER_FORECAST_DAYS))
+    if not cities and not destination_ids:
+        return Response({'error': 'cities or destination_ids required'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(cities) + len(destination_ids) > weather.MAX_BATCH_CITIES:
+        return Response({'error': f'At most {weather.MAX_BATCH_CITIES} cities and destinations per request'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    destination_cities = dict(Destination.objects.filter(id__in=destination_ids).values_list('id', 'city'))
+    requested = [(None, city) for city in cities]
+    requested += [(pk, destination_cities[pk]) for pk in destination_ids if pk in destination_cities]
+    kinds = weather.KINDS if days else (weather.CURRENT,)
+    found = weather.get_many([city for _, city in requested], kinds)
+
+    results, unavailable = [], []
+    for destination_id, city in requested:
+        data = found.get(weather.city_key(city))
+        if not data or len(data) < len(kinds):
+            unavailable.append(city)
+            continue
+        item = {'city': city, 'current': data[weather.CURRENT]}
+        if destination_id is not None:
+            item['destination_id'] = destination_id
+        if days:
+            item['forecast'] = data[weather.FORECAST][:days]
+        results.append(item)
+    return Response({
+        'days': days,
+        'results': results,
+        'unavailable': unavailable,
+        'not_found': [pk for pk in destination_ids if pk not in destination_cities],
+    })
 
 
 # ==================== BOOK HOTEL PAGE ====================
@@ -255,25 +860,12 @@ def booking_success(request):
 
 # ==================== HOME PAGE ====================
 def home(request):
-    """Home page with MongoDB tour data"""
+    """Home page with MongoDB tour data (served from the cached feed)"""
     try:
-        tours = list(tours_collection.find({}, {"_id": 0}).limit(10))
-        try:
-            destinations_count = Destination.objects.count()
-        except:
-            destinations_count = 0
-        try:
-            hotels_count = Hotel.objects.count()
-        except:
-            hotels_count = 0
-        
+        feed = home_feed.get_feed()
         context = {
-            "tours": tours,
-            "stats": {
-                "destinations": destinations_count,
-                "hotels": hotels_count,
-                "cabs": 0
-            }
+            "tours": feed["tours"],
+            "stats": feed["stats"]
         }
         return render(request, "Home.html", context)
     except Exception as e:
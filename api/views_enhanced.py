@@ -7,10 +7,12 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404, render
+from django.db import transaction
 from django.db.models import Q
 from bson import ObjectId
 from datetime import datetime
@@ -20,15 +22,22 @@ from .db import (
     db, tours_collection, users_collection, bookings_collection, 
     reviews_collection, sanitize_document, sanitize_list, get_object_id
 )
+from . import analytics, autocomplete, bookings, home_feed, idempotency, inventory, mirror, tickets
 from .models import Destination, Hotel, Cab, Booking, Contact
+from .fast_list import FastListMixin
+from .fieldsets import SparseQuerysetMixin
+from .pagination import CreatedCursorPagination
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, DestinationSerializer,
-    HotelSerializer, CabSerializer, BookingSerializer, ContactSerializer
+    HotelSerializer, CabSerializer, BookingSerializer, BulkBookingSerializer, ContactSerializer, QRTicketSerializer
+)
+from .views import (
+    AUTOCOMPLETE_MAX_LIMIT, available_response, faceted_response, nearby_response, ranked_search_response,
 )
 
 
 # ==================== AUTHENTICATION VIEWSETS ====================
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """User authentication and profile management"""
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -39,16 +48,10 @@ class UserViewSet(viewsets.ModelViewSet):
         """Register new user"""
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-            # Also save to MongoDB for reference
-            users_collection.insert_one({
-                "user_id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "full_name": f"{user.first_name} {user.last_name}".strip(),
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            })
+            with transaction.atomic():
+                user = serializer.save()
+                # Also mirror to MongoDB for reference
+                mirror.save(user, created=True)
             return Response(
                 {
                     'message': 'User registered successfully',
@@ -120,17 +123,9 @@ class UserViewSet(viewsets.ModelViewSet):
         user.first_name = request.data.get('first_name', user.first_name)
         user.last_name = request.data.get('last_name', user.last_name)
         user.email = request.data.get('email', user.email)
-        user.save()
-        
-        # Update in MongoDB
-        users_collection.update_one(
-            {"user_id": user.id},
-            {"$set": {
-                "email": user.email,
-                "full_name": f"{user.first_name} {user.last_name}".strip(),
-                "updated_at": datetime.utcnow()
-            }}
-        )
+        with transaction.atomic():
+            user.save()
+            mirror.save(user)
         
         return Response(
             {'message': 'Profile updated successfully', 'user': UserSerializer(user).data},
@@ -139,7 +134,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
 
 # ==================== DESTINATION VIEWSETS ====================
-class DestinationViewSet(viewsets.ModelViewSet):
+class DestinationViewSet(FastListMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """CRUD operations for Destinations"""
     queryset = Destination.objects.all()
     serializer_class = DestinationSerializer
@@ -148,28 +143,16 @@ class DestinationViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'rating', 'average_cost']
     ordering = ['-created_at']
     permission_classes = [AllowAny]
+    throttle_scope = None  # set by the autocomplete action
 
     def create(self, request, *args, **kwargs):
         """Create new destination - stores in both Django and MongoDB"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        instance = serializer.save()
-        
-        # Also save to MongoDB for analytics
-        tours_collection.insert_one({
-            "type": "destination",
-            "django_id": instance.id,
-            "name": instance.name,
-            "city": instance.city,
-            "state": instance.state,
-            "country": instance.country,
-            "rating": instance.rating,
-            "average_cost": instance.average_cost,
-            "description": instance.description,
-            "attractions": instance.attractions,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        })
+        with transaction.atomic():
+            instance = serializer.save()
+            # Mirrored to MongoDB by the outbox flusher
+            mirror.save(instance, created=True)
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -178,35 +161,24 @@ class DestinationViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        instance = serializer.save()
-        
-        # Update in MongoDB
-        tours_collection.update_one(
-            {"django_id": instance.id, "type": "destination"},
-            {"$set": {
-                "name": instance.name,
-                "rating": instance.rating,
-                "average_cost": instance.average_cost,
-                "updated_at": datetime.utcnow()
-            }}
-        )
+        with transaction.atomic():
+            instance = serializer.save()
+            mirror.save(instance)
         
         return Response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
         """Delete destination"""
         instance = self.get_object()
-        id_to_delete = instance.id
-        self.perform_destroy(instance)
-        
-        # Delete from MongoDB
-        tours_collection.delete_one({"django_id": id_to_delete, "type": "destination"})
+        with transaction.atomic():
+            mirror.delete(instance)
+            self.perform_destroy(instance)
         
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=['get'])
     def search(self, request):
-        """Search destinations by name, city, or country"""
+        """Full-text search over destinations, best match first"""
         query = request.query_params.get('q', '')
         if not query:
             return Response(
@@ -214,7 +186,11 @@ class DestinationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        destinations = Destination.objects.filter(
+        response = ranked_search_response(self, request, query)
+        if response is not None:
+            return response
+
+        destinations = self.get_queryset().filter(
             Q(name__icontains=query) |
             Q(city__icontains=query) |
             Q(state__icontains=query) |
@@ -223,10 +199,31 @@ class DestinationViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(destinations, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], throttle_classes=[ScopedRateThrottle],
+            throttle_scope='autocomplete')
+    def autocomplete(self, request):
+        """Per-keystroke suggestions over destination, hotel and city names"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), AUTOCOMPLETE_MAX_LIMIT)
+        except ValueError:
+            limit = 10
+        return Response({'results': autocomplete.suggest(request.query_params.get('q', ''), limit)})
+
+    @action(detail=False, methods=['get'], url_path='facets')
+    def faceted(self, request):
+        """Filter destinations by country, state, price and rating with facet counts"""
+        return faceted_response(self, request)
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """Destinations within radius_km of lat/lng, or the k nearest"""
+        return nearby_response(request, 'destination', lambda objects: self.get_serializer(objects, many=True).data,
+                               queryset=self.get_queryset())
+
     @action(detail=False, methods=['get'])
     def popular(self, request):
         """Get most popular destinations by rating"""
-        destinations = Destination.objects.filter(rating__gte=4).order_by('-rating')[:10]
+        destinations = self.get_queryset().filter(rating__gte=4).order_by('-rating')[:10]
         serializer = self.get_serializer(destinations, many=True)
         return Response(serializer.data)
 
@@ -239,13 +236,13 @@ class DestinationViewSet(viewsets.ModelViewSet):
                 {'error': 'Please provide a country name'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        destinations = Destination.objects.filter(country__icontains=country)
+        destinations = self.get_queryset().filter(country__icontains=country)
         serializer = self.get_serializer(destinations, many=True)
         return Response(serializer.data)
 
 
 # ==================== HOTEL VIEWSETS ====================
-class HotelViewSet(viewsets.ModelViewSet):
+class HotelViewSet(FastListMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """CRUD operations for Hotels"""
     queryset = Hotel.objects.all()
     serializer_class = HotelSerializer
@@ -259,26 +256,10 @@ class HotelViewSet(viewsets.ModelViewSet):
         """Create new hotel"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        instance = serializer.save()
-        
-        # Save to MongoDB
-        tours_collection.insert_one({
-            "type": "hotel",
-            "django_id": instance.id,
-            "name": instance.name,
-            "location": instance.location,
-            "price_per_night": instance.price_per_night,
-            "rating": instance.rating,
-            "available_rooms": instance.available_rooms,
-            "total_rooms": instance.total_rooms,
-            "amenities": instance.amenities,
-            "contact": {
-                "phone": instance.phone,
-                "email": instance.email
-            },
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        })
+        with transaction.atomic():
+            instance = serializer.save()
+            # Mirrored to MongoDB by the outbox flusher
+            mirror.save(instance, created=True)
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -287,35 +268,24 @@ class HotelViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        instance = serializer.save()
-        
-        # Update in MongoDB
-        tours_collection.update_one(
-            {"django_id": instance.id, "type": "hotel"},
-            {"$set": {
-                "name": instance.name,
-                "price_per_night": instance.price_per_night,
-                "rating": instance.rating,
-                "available_rooms": instance.available_rooms,
-                "updated_at": datetime.utcnow()
-            }}
-        )
+        with transaction.atomic():
+            instance = serializer.save()
+            mirror.save(instance)
         
         return Response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
         """Delete hotel"""
         instance = self.get_object()
-        id_to_delete = instance.id
-        self.perform_destroy(instance)
-        
-        tours_collection.delete_one({"django_id": id_to_delete, "type": "hotel"})
+        with transaction.atomic():
+            mirror.delete(instance)
+            self.perform_destroy(instance)
         
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=['get'])
     def search(self, request):
-        """Search hotels by location or name"""
+        """Full-text search over hotels, best match first"""
         query = request.query_params.get('q', '')
         if not query:
             return Response(
@@ -323,12 +293,27 @@ class HotelViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        hotels = Hotel.objects.filter(
-            Q(name__icontains=query) | Q(location__icontains=query)
+        response = ranked_search_response(self, request, query)
+        if response is not None:
+            return response
+
+        hotels = self.get_queryset().filter(
+            Q(name__icontains=query) | Q(city__icontains=query)
         )
         serializer = self.get_serializer(hotels, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """Hotels within radius_km of lat/lng, or the k nearest"""
+        return nearby_response(request, 'hotel', lambda objects: self.get_serializer(objects, many=True).data,
+                               queryset=self.get_queryset())
+
+    @action(detail=False, methods=['get'], url_path='facets')
+    def faceted(self, request):
+        """Filter hotels by city, price, rating, amenities and availability with facet counts"""
+        return faceted_response(self, request)
+
     @action(detail=False, methods=['get'])
     def by_price_range(self, request):
         """Filter hotels by price range"""
@@ -336,7 +321,7 @@ class HotelViewSet(viewsets.ModelViewSet):
         max_price = request.query_params.get('max_price', 999999)
         
         try:
-            hotels = Hotel.objects.filter(
+            hotels = self.get_queryset().filter(
                 price_per_night__gte=int(min_price),
                 price_per_night__lte=int(max_price)
             )
@@ -350,14 +335,16 @@ class HotelViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def available(self, request):
-        """Get hotels with available rooms"""
-        hotels = Hotel.objects.filter(available_rooms__gt=0).order_by('-rating')
+        """Hotels with rooms free for a stay when check_in/check_out are given, else any available rooms"""
+        if 'check_in' in request.query_params or 'check_out' in request.query_params:
+            return available_response(self, request)
+        hotels = self.get_queryset().filter(available_rooms__gt=0).order_by('-rating')
         serializer = self.get_serializer(hotels, many=True)
         return Response(serializer.data)
 
 
 # ==================== CAB VIEWSETS ====================
-class CabViewSet(viewsets.ModelViewSet):
+class CabViewSet(FastListMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """CRUD operations for Cabs"""
     queryset = Cab.objects.all()
     serializer_class = CabSerializer
@@ -371,26 +358,10 @@ class CabViewSet(viewsets.ModelViewSet):
         """Create new cab service"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        instance = serializer.save()
-        
-        # Save to MongoDB
-        tours_collection.insert_one({
-            "type": "cab",
-            "django_id": instance.id,
-            "company_name": instance.company_name,
-            "vehicle_type": instance.vehicle_type,
-            "price_per_km": instance.price_per_km,
-            "price_per_hour": instance.price_per_hour,
-            "capacity": instance.capacity,
-            "rating": instance.rating,
-            "available_cars": instance.available_cars,
-            "contact": {
-                "phone": instance.phone,
-                "email": instance.email
-            },
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        })
+        with transaction.atomic():
+            instance = serializer.save()
+            # Mirrored to MongoDB by the outbox flusher
+            mirror.save(instance, created=True)
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -399,28 +370,18 @@ class CabViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        instance = serializer.save()
-        
-        tours_collection.update_one(
-            {"django_id": instance.id, "type": "cab"},
-            {"$set": {
-                "company_name": instance.company_name,
-                "price_per_km": instance.price_per_km,
-                "rating": instance.rating,
-                "available_cars": instance.available_cars,
-                "updated_at": datetime.utcnow()
-            }}
-        )
+        with transaction.atomic():
+            instance = serializer.save()
+            mirror.save(instance)
         
         return Response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
         """Delete cab service"""
         instance = self.get_object()
-        id_to_delete = instance.id
-        self.perform_destroy(instance)
-        
-        tours_collection.delete_one({"django_id": id_to_delete, "type": "cab"})
+        with transaction.atomic():
+            mirror.delete(instance)
+            self.perform_destroy(instance)
         
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -431,7 +392,7 @@ class CabViewSet(viewsets.ModelViewSet):
         min_price = request.query_params.get('min_price', 0)
         max_price = request.query_params.get('max_price', 999999)
 
-        cabs = Cab.objects.all()
+        cabs = self.get_queryset()
 
         if vehicle_type:
             cabs = cabs.filter(vehicle_type=vehicle_type)
@@ -460,55 +421,85 @@ class CabViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        cabs = Cab.objects.filter(company_name__icontains=company)
+        cabs = self.get_queryset().filter(company_name__icontains=company)
         serializer = self.get_serializer(cabs, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def available(self, request):
         """Get available cabs"""
-        cabs = Cab.objects.filter(available_cars__gt=0).order_by('-rating')
+        cabs = self.get_queryset().filter(available_cars__gt=0).order_by('-rating')
         serializer = self.get_serializer(cabs, many=True)
         return Response(serializer.data)
 
 
 # ==================== BOOKING VIEWSETS ====================
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """CRUD operations for Bookings"""
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [OrderingFilter]
-    ordering_fields = ['booking_date', 'total_price']
-    ordering = ['-booking_date']
+    ordering_fields = ['created_at', 'total_price']
+    ordering = ['-created_at', '-id']
+    pagination_class = CreatedCursorPagination
 
     def get_queryset(self):
-        return Booking.objects.filter(user=self.request.user)
+        return self.narrow(Booking.objects.filter(user=self.request.user))
+
+    def _page(self, queryset):
+        page = self.paginate_queryset(self.filter_queryset(queryset))
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
 
     def create(self, request, *args, **kwargs):
         """Create new booking"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        instance = serializer.save(user=request.user)
-        
-        # Save to MongoDB for analytics
-        booking_data = {
-            "user_id": str(request.user.id),
-            "username": request.user.username,
-            "booking_type": instance.booking_type,
-            "django_booking_id": instance.id,
-            "total_price": instance.total_price,
-            "status": instance.booking_status,
-            "payment_status": instance.payment_status,
-            "booking_date": datetime.utcnow(),
-            "check_in_date": instance.check_in_date.isoformat() if instance.check_in_date else None,
-            "check_out_date": instance.check_out_date.isoformat() if instance.check_out_date else None,
-            "guests": instance.number_of_guests,
-            "rooms": instance.number_of_rooms
-        }
-        bookings_collection.insert_one(booking_data)
+        try:
+            with transaction.atomic():
+                instance = serializer.save(user=request.user)
+                inventory.take_for_booking(instance, request.data.get('hold_id'), request.data.get('room_type'))
+                # Mirrored to MongoDB for analytics by the outbox flusher
+                mirror.save(instance, created=True)
+                analytics.record_booking(None, analytics.snapshot(instance))
+        except inventory.Unavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except inventory.InventoryError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create several bookings (e.g. a trip's hotel, cab and guide) all or
+        nothing; a retry with the same Idempotency-Key replays the response.
+        """
+        key = request.headers.get(idempotency.HEADER)
+        if key is not None and not 0 < len(key) <= idempotency.MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{idempotency.HEADER} must be 1-{idempotency.MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            with transaction.atomic():
+                record, replay = idempotency.claim(request, key) if key else (None, None)
+                if replay is not None:
+                    return replay
+                serializer = BulkBookingSerializer(data=request.data, context=self.get_serializer_context())
+                serializer.is_valid(raise_exception=True)
+                created = bookings.create_many(request.user, serializer.validated_data['bookings'])
+                response = Response({'bookings': BookingSerializer(created, many=True).data},
+                                    status=status.HTTP_201_CREATED)
+                if record is not None:
+                    idempotency.remember(record, response)
+        except idempotency.KeyReused as e:
+            return Response({'error': str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        except inventory.Unavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except inventory.InventoryError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return response
+
     def update(self, request, *args, **kwargs):
         """Update booking"""
         instance = self.get_object()
@@ -518,18 +509,26 @@ class BookingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
+        before = analytics.snapshot(instance)
+        was_cancelled = instance.booking_status == 'cancelled'
+        stay = inventory.stay(instance)
+        room_type = request.data.get('room_type')
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        instance = serializer.save()
-        
-        bookings_collection.update_one(
-            {"django_booking_id": instance.id},
-            {"$set": {
-                "status": instance.booking_status,
-                "payment_status": instance.payment_status,
-                "updated_at": datetime.utcnow()
-            }}
-        )
+        try:
+            with transaction.atomic():
+                instance = serializer.save()
+                if instance.booking_status == 'cancelled':
+                    if not was_cancelled:
+                        inventory.cancel(instance)
+                elif was_cancelled or room_type or inventory.stay(instance) != stay:
+                    inventory.rebook(instance, room_type)
+                mirror.save(instance)
+                analytics.record_booking(before, analytics.snapshot(instance))
+        except inventory.Unavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except inventory.InventoryError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(serializer.data)
 
@@ -548,10 +547,11 @@ class BookingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        id_to_delete = instance.id
-        self.perform_destroy(instance)
-        
-        bookings_collection.delete_one({"django_booking_id": id_to_delete})
+        with transaction.atomic():
+            inventory.cancel(instance)
+            mirror.delete(instance)
+            analytics.record_booking(analytics.snapshot(instance), None)
+            self.perform_destroy(instance)
         
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -571,37 +571,36 @@ class BookingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        before = analytics.snapshot(booking)
         booking.booking_status = 'cancelled'
-        booking.save()
-        
-        bookings_collection.update_one(
-            {"django_booking_id": booking.id},
-            {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}}
-        )
+        with transaction.atomic():
+            booking.save()
+            inventory.cancel(booking)
+            mirror.save(booking)
+            analytics.record_booking(before, analytics.snapshot(booking))
         
         serializer = self.get_serializer(booking)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def ticket(self, request, pk=None):
+        """The booking's QR ticket; its qr_code is a signed token gates verify offline"""
+        return Response(QRTicketSerializer(tickets.ticket_for(self.get_object())).data)
+
     @action(detail=False, methods=['get'])
     def my_bookings(self, request):
         """Get all bookings for current user"""
-        bookings = self.get_queryset()
-        serializer = self.get_serializer(bookings, many=True)
-        return Response(serializer.data)
+        return self._page(self.get_queryset())
 
     @action(detail=False, methods=['get'])
     def pending(self, request):
         """Get pending bookings"""
-        bookings = self.get_queryset().filter(booking_status='pending')
-        serializer = self.get_serializer(bookings, many=True)
-        return Response(serializer.data)
+        return self._page(self.get_queryset().filter(booking_status='pending'))
 
     @action(detail=False, methods=['get'])
     def confirmed(self, request):
         """Get confirmed bookings"""
-        bookings = self.get_queryset().filter(booking_status='confirmed')
-        serializer = self.get_serializer(bookings, many=True)
-        return Response(serializer.data)
+        return self._page(self.get_queryset().filter(booking_status='confirmed'))
 
 
 # ==================== CONTACT VIEWSETS ====================
@@ -662,20 +661,12 @@ class ContactViewSet(viewsets.ModelViewSet):
 
 # ==================== HOME PAGE ====================
 def home(request):
-    """Home page with MongoDB tour data"""
+    """Home page with MongoDB tour data (served from the cached feed)"""
     try:
-        tours = list(tours_collection.find({}, {"_id": 0}).limit(10))
-        destinations_count = Destination.objects.count()
-        hotels_count = Hotel.objects.count()
-        cabs_count = Cab.objects.count()
-        
+        feed = home_feed.get_feed()
         context = {
-            "tours": tours,
-            "stats": {
-                "destinations": destinations_count,
-                "hotels": hotels_count,
-                "cabs": cabs_count
-            }
+            "tours": feed["tours"],
+            "stats": feed["stats"]
         }
         return render(request, "Home.html", context)
     except Exception as e:
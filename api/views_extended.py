@@ -1,7 +1,6 @@
 from datetime import datetime, timedelta
 from decimal import Decimal
 import math
-import random
 import string
 
 from django.contrib.auth.models import User
@@ -15,12 +14,13 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .views import TripTrackViewSet, forecast, weather_batch, weather_info
 from .models import (
     Destination, Hotel, Cab, Booking, Contact,
     GPSLocation, TripTrack, FavoriteLocation,
     Expense, ExpenseCategory, ExpenseBudget,
     TravelChecklist, ChecklistItem, ChecklistTemplate,
-    ReferralCode, Referral, WeatherCache,
+    ReferralCode, Referral,
     TripPlan
 )
 
@@ -34,13 +34,6 @@ class GPSLocationViewSet(viewsets.ModelViewSet):
         return GPSLocation.objects.filter(user=self.request.user)
 
 
-class TripTrackViewSet(viewsets.ModelViewSet):
-    permission_classes = [IsAuthenticated]
-    
-    def get_queryset(self):
-        return TripTrack.objects.filter(user=self.request.user)
-
-
 class FavoriteLocationViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
@@ -105,79 +98,6 @@ class ReferralViewSet(viewsets.ModelViewSet):
         return Referral.objects.none()
 
 
-# ==================== WEATHER API VIEWS ====================
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def weather_info(request):
-    city = request.query_params.get('city')
-    destination_id = request.query_params.get('destination_id')
-    
-    if destination_id:
-        destination = Destination.objects.filter(id=destination_id).first()
-        if destination:
-            city = destination.city
-    
-    if not city:
-        return Response({'error': 'City parameter required'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Try to get cached weather
-    cached = WeatherCache.objects.filter(city__icontains=city).order_by('-cached_at').first()
-    if cached and (timezone.now() - cached.cached_at) < timedelta(hours=1):
-        return Response({
-            'city': cached.city,
-            'country': cached.country,
-            'temperature': cached.temperature,
-            'humidity': cached.humidity,
-            'description': cached.description,
-            'icon': cached.icon,
-            'wind_speed': cached.wind_speed
-        })
-    
-    # Mock weather data (integrate with OpenWeatherMap API in production)
-    weather_data = {
-        'city': city,
-        'country': 'India',
-        'temperature': 25 + random.randint(-5, 10),
-        'humidity': random.randint(40, 80),
-        'description': ['Sunny', 'Partly Cloudy', 'Clear', 'Light Rain'][random.randint(0, 3)],
-        'icon': ['01d', '02d', '03d', '10d'][random.randint(0, 3)],
-        'wind_speed': random.randint(5, 25),
-        'forecast_date': timezone.now().date().isoformat()
-    }
-    
-    # Cache the weather data
-    WeatherCache.objects.create(**weather_data)
-    
-    return Response(weather_data)
-
-
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def forecast(request):
-    """Get weather forecast for destination"""
-    city = request.query_params.get('city')
-    days = int(request.query_params.get('days', 7))
-    
-    if not city:
-        return Response({'error': 'City parameter required'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    forecast_data = []
-    for i in range(days):
-        date = timezone.now().date() + timedelta(days=i)
-        forecast_data.append({
-            'date': date.isoformat(),
-            'temperature': 22 + random.randint(-8, 12),
-            'humidity': random.randint(40, 85),
-            'description': ['Sunny', 'Cloudy', 'Rainy', 'Partly Cloudy'][random.randint(0, 3)],
-            'icon': ['01d', '02d', '03d', '10d'][random.randint(0, 3)]
-        })
-    
-    return Response({
-        'city': city,
-        'forecast': forecast_data
-    })
-
-
 # ==================== PAGE VIEWS ====================
 def expense_tracker(request):
     return render(request, 'expense_tracker.html')
@@ -0,0 +1,466 @@
+"""
+Current weather and forecasts per city behind a two-level cache.
+
+Lookups are keyed by ``city_key()`` (case- and whitespace-insensitive).
+Each worker keeps an LRU of up to ``WEATHER_LOCAL_ENTRIES`` entries in
+front of the shared Django cache, and ``WeatherCache`` holds the latest
+current conditions per city so a cold shared cache does not mean an
+upstream call.
+
+An entry is fresh for ``WEATHER_TTL_SECONDS`` (``WEATHER_FORECAST_TTL_SECONDS``
+for forecasts) after it was fetched and is then served stale for up to
+``WEATHER_STALE_SECONDS`` more while a background thread refreshes it.
+``prefetch()`` (``manage.py prefetch_weather --loop``) refreshes every
+active destination's city shortly before it goes stale, so requests rarely
+reach the provider at all.
+
+Misses are single-flight: concurrent requests in a worker wait for one
+load, and across workers a short cache lock lets one of them fetch while
+the others poll the shared cache; ``get_many()`` resolves a whole list of
+cities with one lookup per layer and fetches the rest concurrently.
+``prune()`` (``manage.py prune_weather_cache``) deletes all but the newest
+row per city.
+
+Data comes from ``WEATHER_PROVIDER`` (dotted path to a class with
+``current(city)`` and ``forecast(city, days)``); ``LocalProvider`` is the
+built-in stand-in. Returned payloads are shared between requests and must
+not be mutated.
+"""
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection as db_connection
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Destination, WeatherCache
+
+logger = logging.getLogger(__name__)
+
+CURRENT, FORECAST = 'current', 'forecast'
+KINDS = (CURRENT, FORECAST)
+FIELDS = ('city', 'country', 'temperature', 'humidity', 'description', 'icon', 'wind_speed')
+LOCK_TIMEOUT = 10
+LOCK_POLL_SECONDS = 0.05
+PRUNE_CHUNK_SIZE = 1000
+MAX_BATCH_CITIES = 50
+BATCH_FETCH_CONCURRENCY = 8
+
+
+def city_key(city):
+    return ' '.join(city.split()).casefold()[:100]
+
+
+def _cache_key(kind, key):
+    return f'weather:{kind}:{key}'
+
+
+# ==================== PROVIDERS ====================
+class LocalProvider:
+    """
+    Stand-in for a weather API (integrate with OpenWeatherMap in production).
+    Values are pseudo-random but stable per city and hour, so tests can
+    compare them.
+    """
+
+    def _random(self, city, *parts):
+        return random.Random(':'.join([city_key(city), *map(str, parts)]))
+
+    def current(self, city):
+        now = timezone.now()
+        rng = self._random(city, now.date(), now.hour)
+        return {
+            'city': city,
+            'country': 'India',
+            'temperature': 25 + rng.randint(-5, 10),
+            'humidity': rng.randint(40, 80),
+            'description': rng.choice(['Sunny', 'Partly Cloudy', 'Clear', 'Light Rain']),
+            'icon': rng.choice(['01d', '02d', '03d', '10d']),
+            'wind_speed': rng.randint(5, 25),
+            'forecast_date': now.date().isoformat(),
+        }
+
+    def forecast(self, city, days):
+        today = timezone.now().date()
+        forecast = []
+        for offset in range(days):
+            date = today + timedelta(days=offset)
+            rng = self._random(city, date)
+            forecast.append({
+                'date': date.isoformat(),
+                'temperature': 22 + rng.randint(-8, 12),
+                'humidity': rng.randint(40, 85),
+                'description': rng.choice(['Sunny', 'Cloudy', 'Rainy', 'Partly Cloudy']),
+                'icon': rng.choice(['01d', '02d', '03d', '10d']),
+            })
+        return forecast
+
+
+_provider = None
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        _provider = import_string(settings.WEATHER_PROVIDER)()
+    return _provider
+
+
+# ==================== LOCAL LRU ====================
+class _LocalCache:
+    """Thread-safe LRU of ``key -> (monotonic expiry, entry)``"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.WEATHER_LOCAL_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_local = _LocalCache()
+
+
+# ==================== SINGLE FLIGHT ====================
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _single_flight(key, load):
+    """Run ``load()`` once for concurrent callers with the same key"""
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        if not flight.done.wait(LOCK_TIMEOUT):
+            return load()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+    try:
+        flight.result = load()
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+# ==================== ENTRIES ====================
+# An entry is ``{'data': payload, 'fetched': epoch seconds}``
+def _ttl(kind):
+    return settings.WEATHER_TTL_SECONDS if kind == CURRENT else settings.WEATHER_FORECAST_TTL_SECONDS
+
+
+def _fresh_until(kind, entry):
+    return entry['fetched'] + _ttl(kind)
+
+
+def _usable_until(kind, entry):
+    return _fresh_until(kind, entry) + settings.WEATHER_STALE_SECONDS
+
+
+def _share(kind, key, entry):
+    """Put an entry in the shared cache and this worker's LRU for as long as it may be served"""
+    ttl = _usable_until(kind, entry) - time.time()
+    if ttl > 0:
+        cache.set(_cache_key(kind, key), entry, timeout=ttl)
+        _local.set((kind, key), entry, ttl)
+
+
+def _payload(row):
+    data = {field: getattr(row, field) for field in FIELDS}
+    data['forecast_date'] = row.forecast_date.isoformat()
+    return data
+
+
+def _many_from_database(keys):
+    """Usable entries for current conditions from ``WeatherCache``, one query for all ``keys``"""
+    entries = {}
+    now = time.time()
+    for row in WeatherCache.objects.filter(city_key__in=keys).order_by('city_key', '-cached_at'):
+        if row.city_key in entries:
+            continue
+        entry = {'data': _payload(row), 'fetched': row.cached_at.timestamp()}
+        if _usable_until(CURRENT, entry) > now:
+            _share(CURRENT, row.city_key, entry)
+            entries[row.city_key] = entry
+    return entries
+
+
+def _from_database(kind, key):
+    if kind != CURRENT:
+        return None
+    return _many_from_database([key]).get(key)
+
+
+def store(kind, key, data):
+    """Save fetched data in the shared cache (and current conditions as the city's row)"""
+    fetched = timezone.now()
+    if kind == CURRENT:
+        row = WeatherCache.objects.filter(city_key=key).order_by('-cached_at').first() or WeatherCache(city_key=key)
+        for field in FIELDS:
+            setattr(row, field, data[field])
+        row.forecast_date = data['forecast_date']
+        row.save()
+        fetched = row.cached_at
+    entry = {'data': data, 'fetched': fetched.timestamp()}
+    _share(kind, key, entry)
+    return entry
+
+
+def _fetch(kind, key, city):
+    """Fetch from the provider, unless another worker does it first"""
+    lock = f'weather:{kind}:{key}:lock'
+    locked = cache.add(lock, 1, timeout=LOCK_TIMEOUT)
+    if not locked:
+        # Another worker is fetching this city; its result lands in the shared cache
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_SECONDS)
+            entry = cache.get(_cache_key(kind, key))
+            if entry is not None and _fresh_until(kind, entry) > time.time():
+                _local.set((kind, key), entry, _usable_until(kind, entry) - time.time())
+                return entry
+            if cache.get(lock) is None:
+                break
+    try:
+        provider = get_provider()
+        if kind == CURRENT:
+            data = provider.current(city)
+        else:
+            data = provider.forecast(city, settings.WEATHER_FORECAST_DAYS)
+        return store(kind, key, data)
+    finally:
+        if locked:
+            cache.delete(lock)
+
+
+def _load(kind, key, city):
+    entry = cache.get(_cache_key(kind, key))
+    if entry is not None:
+        _local.set((kind, key), entry, _usable_until(kind, entry) - time.time())
+        return entry
+    return _from_database(kind, key) or _fetch(kind, key, city)
+
+
+def _revalidate(kind, key, city):
+    """A fresh entry: another worker's if it already refreshed, else a new fetch"""
+    entry = cache.get(_cache_key(kind, key))
+    if entry is not None and _fresh_until(kind, entry) > time.time():
+        _local.set((kind, key), entry, _usable_until(kind, entry) - time.time())
+        return entry
+    return _fetch(kind, key, city)
+
+
+def refresh(kind, city):
+    key = city_key(city)
+    return _single_flight((kind, key), lambda: _revalidate(kind, key, city))
+
+
+# ==================== BACKGROUND REFRESH ====================
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _refresh_in_background(kind, key, city):
+    try:
+        refresh(kind, city)
+    except Exception:
+        logger.exception("Weather refresh failed for %s %r", kind, city)
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard((kind, key))
+        db_connection.close()
+
+
+def _schedule_refresh(kind, key, city):
+    with _refreshing_lock:
+        if (kind, key) in _refreshing:
+            return
+        _refreshing.add((kind, key))
+    threading.Thread(target=_refresh_in_background, args=(kind, key, city),
+                     name='weather-refresh', daemon=True).start()
+
+
+# ==================== LOOKUP ====================
+def _get(kind, city):
+    key = city_key(city)
+    entry = _local.get((kind, key))
+    if entry is None:
+        entry = _single_flight((kind, key), lambda: _load(kind, key, city))
+    if _fresh_until(kind, entry) <= time.time():
+        _schedule_refresh(kind, key, city)
+    return entry['data']
+
+
+def get_current(city):
+    """Current weather for ``city``; a hit in the local LRU touches neither cache nor database"""
+    return _get(CURRENT, city)
+
+
+def get_forecast(city, days):
+    """The next ``days`` (at most ``WEATHER_FORECAST_DAYS``) daily forecasts for ``city``"""
+    return _get(FORECAST, city)[:days]
+
+
+def get_many(cities, kinds=KINDS):
+    """
+    ``{city_key: {kind: payload}}`` for many cities in one pass: the local
+    LRU, one shared-cache ``get_many``, one ``WeatherCache`` query, then the
+    remaining misses fetched concurrently. Cities that could not be fetched
+    are left out.
+    """
+    names = {}
+    for city in cities:
+        key = city_key(city)
+        if key:
+            names.setdefault(key, city)
+    found, missing = {}, []
+    for key in names:
+        for kind in kinds:
+            entry = _local.get((kind, key))
+            if entry is None:
+                missing.append((kind, key))
+            else:
+                found[kind, key] = entry
+
+    if missing:
+        shared = cache.get_many([_cache_key(kind, key) for kind, key in missing])
+        for kind, key in missing:
+            entry = shared.get(_cache_key(kind, key))
+            if entry is not None:
+                _local.set((kind, key), entry, _usable_until(kind, entry) - time.time())
+                found[kind, key] = entry
+        keys = [key for kind, key in missing if kind == CURRENT and (kind, key) not in found]
+        if keys:
+            for key, entry in _many_from_database(keys).items():
+                found[CURRENT, key] = entry
+        missing = [item for item in missing if item not in found]
+
+    if missing:
+        workers = min(BATCH_FETCH_CONCURRENCY, len(missing))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='weather-batch') as pool:
+            futures = {pool.submit(_fetch_in_thread, kind, key, names[key]): (kind, key) for kind, key in missing}
+        for future, (kind, key) in futures.items():
+            try:
+                found[kind, key] = future.result()
+            except Exception:
+                logger.exception("Weather fetch failed for %s %r", kind, names[key])
+
+    now = time.time()
+    results = {}
+    for (kind, key), entry in found.items():
+        if _fresh_until(kind, entry) <= now:
+            _schedule_refresh(kind, key, names[key])
+        results.setdefault(key, {})[kind] = entry['data']
+    return results
+
+
+# ==================== PREFETCH ====================
+def due(ahead):
+    """``(kind, city)`` pairs for active destinations that go stale within ``ahead`` seconds, soonest first"""
+    cities = {}
+    for city in (Destination.objects.filter(is_active=True).exclude(city='')
+                 .values_list('city', flat=True).distinct()):
+        cities.setdefault(city_key(city), city)
+    wanted = {_cache_key(kind, key): (kind, key) for key in cities for kind in KINDS}
+    entries = cache.get_many(list(wanted))
+    deadline = time.time() + ahead
+    pending = []
+    for cache_key, (kind, key) in wanted.items():
+        entry = entries.get(cache_key)
+        fresh_until = _fresh_until(kind, entry) if entry is not None else 0
+        if fresh_until <= deadline:
+            pending.append((fresh_until, kind, cities[key]))
+    pending.sort(key=lambda item: item[0])
+    return [(kind, city) for _, kind, city in pending]
+
+
+def _fetch_in_thread(kind, key, city):
+    try:
+        return _single_flight((kind, key), lambda: _fetch(kind, key, city))
+    finally:
+        db_connection.close()
+
+
+def _prefetch_one(item):
+    kind, city = item
+    try:
+        _fetch_in_thread(kind, city_key(city), city)
+        return True
+    except Exception:
+        logger.exception("Weather prefetch failed for %s %r", kind, city)
+        return False
+
+
+def prefetch(ahead=None, concurrency=None):
+    """Refresh every active destination's weather due within ``ahead`` seconds, ``concurrency`` at a time"""
+    ahead = settings.WEATHER_PREFETCH_AHEAD_SECONDS if ahead is None else ahead
+    items = due(ahead)
+    if not items:
+        return {'due': 0, 'refreshed': 0, 'failed': 0}
+    workers = max(1, min(concurrency or settings.WEATHER_PREFETCH_CONCURRENCY, len(items)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='weather-prefetch') as pool:
+        results = list(pool.map(_prefetch_one, items))
+    refreshed = sum(results)
+    return {'due': len(items), 'refreshed': refreshed, 'failed': len(items) - refreshed}
+
+
+# ==================== PRUNING ====================
+def prune():
+    """Delete every ``WeatherCache`` row but the newest per city; returns how many went"""
+    latest = (WeatherCache.objects.filter(city_key=OuterRef('city_key'))
+              .order_by('-cached_at', '-pk').values('pk')[:1])
+    stale = WeatherCache.objects.exclude(pk=Subquery(latest)).order_by().values_list('pk', flat=True)
+    deleted = 0
+    while True:
+        ids = list(stale[:PRUNE_CHUNK_SIZE])
+        if not ids:
+            return deleted
+        WeatherCache.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
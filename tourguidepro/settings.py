@@ -80,6 +80,95 @@ DATABASES = {
 MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost:27017')
 MONGODB_NAME = os.environ.get('MONGODB_NAME', 'tourguidepro_analytics')
 
+# MongoDB mirror outbox (drained by `manage.py flush_outbox`)
+MONGO_OUTBOX_BATCH_SIZE = int(os.environ.get('MONGO_OUTBOX_BATCH_SIZE', 500))
+MONGO_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('MONGO_OUTBOX_MAX_ATTEMPTS', 10))
+MONGO_OUTBOX_POLL_INTERVAL = float(os.environ.get('MONGO_OUTBOX_POLL_INTERVAL', 1.0))
+
+# Home page feed snapshot: rebuilt in the background once older than this
+HOME_FEED_REFRESH_SECONDS = int(os.environ.get('HOME_FEED_REFRESH_SECONDS', 60))
+
+# Full-text search backend (dotted path); defaults to SQLite FTS5 / PostgreSQL tsvector
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND') or None
+
+# In-process catalog indexes (autocomplete, facets): how often workers pick up
+# each other's writes, and how often an index is rebuilt from scratch
+LOCAL_INDEX_SYNC_SECONDS = float(os.environ.get('LOCAL_INDEX_SYNC_SECONDS', 2))
+LOCAL_INDEX_REBUILD_SECONDS = int(os.environ.get('LOCAL_INDEX_REBUILD_SECONDS', 600))
+AUTOCOMPLETE_MAX_ENTRIES = int(os.environ.get('AUTOCOMPLETE_MAX_ENTRIES', 200000))
+
+# Simplified trip tracks per zoom level (invalidated when points are appended)
+TRACK_CACHE_SECONDS = int(os.environ.get('TRACK_CACHE_SECONDS', 24 * 3600))
+
+# GPS retention (manage.py compact_gps): finished trips move to archive blobs,
+# older points are thinned to one per interval: (age in days, seconds)
+GPS_ARCHIVE_AFTER_DAYS = int(os.environ.get('GPS_ARCHIVE_AFTER_DAYS', 2))
+GPS_DOWNSAMPLE_TIERS = [(7, 30), (30, 300)]
+GPS_RETENTION_DAYS = int(os.environ.get('GPS_RETENTION_DAYS', 365))
+GPS_COMPACTION_INTERVAL = float(os.environ.get('GPS_COMPACTION_INTERVAL', 300))
+
+# Geofence alerts around favourite locations and wishlisted places; a side
+# must be seen for GEOFENCE_DEBOUNCE_SECONDS, fixes less accurate than
+# GEOFENCE_MAX_ACCURACY_M are ignored, and a worker's cached fences are
+# rebuilt at least every GEOFENCE_GRID_MAX_AGE_SECONDS
+GEOFENCE_FAVORITE_RADIUS_M = float(os.environ.get('GEOFENCE_FAVORITE_RADIUS_M', 200))
+GEOFENCE_DESTINATION_RADIUS_M = float(os.environ.get('GEOFENCE_DESTINATION_RADIUS_M', 2000))
+GEOFENCE_DEBOUNCE_SECONDS = int(os.environ.get('GEOFENCE_DEBOUNCE_SECONDS', 30))
+GEOFENCE_MAX_ACCURACY_M = float(os.environ.get('GEOFENCE_MAX_ACCURACY_M', 100))
+GEOFENCE_CACHED_USERS = int(os.environ.get('GEOFENCE_CACHED_USERS', 10000))
+GEOFENCE_GRID_MAX_AGE_SECONDS = int(os.environ.get('GEOFENCE_GRID_MAX_AGE_SECONDS', 300))
+GEOFENCE_NOTIFY_EXIT = os.environ.get('GEOFENCE_NOTIFY_EXIT', 'False') == 'True'
+
+# Weather: per-worker LRU in front of the shared cache and WeatherCache. Entries
+# are served stale for WEATHER_STALE_SECONDS past their TTL while refreshing;
+# manage.py prefetch_weather --loop refreshes active destinations ahead of time
+WEATHER_PROVIDER = os.environ.get('WEATHER_PROVIDER', 'api.weather.LocalProvider')
+WEATHER_TTL_SECONDS = int(os.environ.get('WEATHER_TTL_SECONDS', 3600))
+WEATHER_FORECAST_TTL_SECONDS = int(os.environ.get('WEATHER_FORECAST_TTL_SECONDS', 3 * 3600))
+WEATHER_FORECAST_DAYS = int(os.environ.get('WEATHER_FORECAST_DAYS', 14))
+WEATHER_STALE_SECONDS = int(os.environ.get('WEATHER_STALE_SECONDS', 2 * 3600))
+WEATHER_LOCAL_ENTRIES = int(os.environ.get('WEATHER_LOCAL_ENTRIES', 5000))
+WEATHER_PREFETCH_INTERVAL = float(os.environ.get('WEATHER_PREFETCH_INTERVAL', 300))
+WEATHER_PREFETCH_AHEAD_SECONDS = int(os.environ.get('WEATHER_PREFETCH_AHEAD_SECONDS', 900))
+WEATHER_PREFETCH_CONCURRENCY = int(os.environ.get('WEATHER_PREFETCH_CONCURRENCY', 8))
+
+# Hotel room inventory: how long a checkout holds rooms before they return to
+# sale (manage.py expire_room_holds --loop), and the longest bookable stay
+INVENTORY_HOLD_SECONDS = int(os.environ.get('INVENTORY_HOLD_SECONDS', 600))
+INVENTORY_MAX_NIGHTS = int(os.environ.get('INVENTORY_MAX_NIGHTS', 30))
+INVENTORY_EXPIRY_INTERVAL = float(os.environ.get('INVENTORY_EXPIRY_INTERVAL', 30))
+
+# How many nights ahead the hotel availability search covers
+AVAILABILITY_HORIZON_DAYS = int(os.environ.get('AVAILABILITY_HORIZON_DAYS', 365))
+
+# Bulk bookings: most legs per request, and how long an Idempotency-Key is
+# remembered (manage.py prune_idempotency_keys)
+BOOKING_BULK_MAX_ITEMS = int(os.environ.get('BOOKING_BULK_MAX_ITEMS', 20))
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_SECONDS', 24 * 3600))
+
+# Signed QR tickets: the HMAC secret shared with gate scanners, validity of a
+# ticket whose booking has no dates, how long an admitted ticket is refused
+# as a replay, and how often each worker writes its buffered scans
+QR_TICKET_SECRET = os.environ.get('QR_TICKET_SECRET', SECRET_KEY)
+QR_TICKET_VALID_SECONDS = int(os.environ.get('QR_TICKET_VALID_SECONDS', 24 * 3600))
+QR_SCAN_REPLAY_SECONDS = int(os.environ.get('QR_SCAN_REPLAY_SECONDS', 24 * 3600))
+QR_SCAN_RECENT_ENTRIES = int(os.environ.get('QR_SCAN_RECENT_ENTRIES', 100000))
+QR_SCAN_FLUSH_SECONDS = float(os.environ.get('QR_SCAN_FLUSH_SECONDS', 5))
+QR_SCAN_MAX_BATCH = int(os.environ.get('QR_SCAN_MAX_BATCH', 500))
+
+# Booking artefacts (manage.py generate_artefacts --loop): where PDFs are
+# stored (raw files; the default storage only takes images), the TrueType
+# font to render with (Pillow's built-in one if empty), and the render pool
+ARTEFACT_STORAGE = os.environ.get('ARTEFACT_STORAGE', 'cloudinary_storage.storage.RawMediaCloudinaryStorage')
+ARTEFACT_FONT = os.environ.get('ARTEFACT_FONT', '')
+ARTEFACT_WORKERS = int(os.environ.get('ARTEFACT_WORKERS', 2))
+ARTEFACT_BATCH_SIZE = int(os.environ.get('ARTEFACT_BATCH_SIZE', 100))
+ARTEFACT_MAX_ATTEMPTS = int(os.environ.get('ARTEFACT_MAX_ATTEMPTS', 5))
+ARTEFACT_INTERVAL = float(os.environ.get('ARTEFACT_INTERVAL', 5))
+
+# Serve catalogue list pages from values_list() rows and orjson (api/fast_list.py)
+FAST_LISTS = os.environ.get('FAST_LISTS', 'True').lower() in ('true', '1', 'yes')
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -152,6 +241,7 @@ REST_FRAMEWORK = {
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
         'user': '1000/hour',
+        'autocomplete': '6000/hour',
     },
     'EXCEPTION_HANDLER': 'api.exceptions.custom_exception_handler',
     'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning',